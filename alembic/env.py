@@ -24,6 +24,7 @@ from app.models.base import Base
 from app.models.device_model import Device
 from app.models.client_model import Client
 from app.models.message_model import Message
+from app.models.message_rollup_model import MessageRollupHour, MessageRollupMinute, RollupWatermark
 
 config = context.config
 if config.config_file_name is not None:
@@ -0,0 +1,59 @@
+"""add message query indexes
+
+Composite (device_id, timestamp, id) B-tree for the per-device /messages
+pages, a BRIN index on timestamp for time-range scans over the whole
+(append-only, time-ordered) table, and a client_id index.
+
+Indexes are built CONCURRENTLY so the migration does not block ingestion;
+that cannot run inside a transaction, hence the autocommit block.
+
+Revision ID: 3f1c9a7d2b64
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_device_ts_id",
+            "messages",
+            ["device_id", "timestamp", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_messages_timestamp_brin",
+            "messages",
+            ["timestamp"],
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_messages_client_id",
+            "messages",
+            ["client_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in ("ix_messages_client_id", "ix_messages_timestamp_brin", "ix_messages_device_ts_id"):
+            op.drop_index(name, table_name="messages", postgresql_concurrently=True, if_exists=True)
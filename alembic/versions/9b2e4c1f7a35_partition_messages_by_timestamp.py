@@ -0,0 +1,109 @@
+"""partition messages by timestamp
+
+Turns `messages` into a table range-partitioned by `timestamp`:
+
+- the old table is renamed to messages_legacy;
+- the new parent keeps the same columns and id sequence, with primary key
+  (id, timestamp) because a partitioned table's unique keys must include
+  the partition key (id alone stays unique through the sequence);
+- monthly partitions cover the existing data up to two months ahead, plus
+  messages_default for anything outside them;
+- rows are copied over, the sequence is handed to the new table and the
+  legacy table is dropped;
+- the query indexes of 3f1c9a7d2b64 are recreated on the parent, so every
+  partition gets them.
+
+Later partitions are created by the `ensure_message_partitions` beat task
+(celery_service/partition_tasks.py). The copy rewrites the table, so run it
+in a maintenance window on large databases.
+
+Revision ID: 9b2e4c1f7a35
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2e4c1f7a35'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('messages_id_seq'),
+    device_id integer NOT NULL,
+    client_id integer NOT NULL,
+    sensor text,
+    value text,
+    unit text,
+    timestamp timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    payload text NOT NULL
+"""
+
+_INDEX_NAMES = ("ix_messages_id", "ix_messages_device_ts_id", "ix_messages_timestamp_brin", "ix_messages_client_id")
+
+
+def _create_query_indexes() -> None:
+    op.create_index("ix_messages_device_ts_id", "messages", ["device_id", "timestamp", "id"])
+    op.create_index("ix_messages_timestamp_brin", "messages", ["timestamp"], postgresql_using="brin")
+    op.create_index("ix_messages_client_id", "messages", ["client_id"])
+
+
+def _retire_old_table() -> None:
+    """Rename `messages` out of the way, freeing its index and constraint names."""
+    op.rename_table("messages", "messages_legacy")
+    for name in _INDEX_NAMES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_pkey TO messages_legacy_pkey")
+
+
+def _adopt_rows() -> None:
+    """Copy the legacy rows, move the id sequence to the new table and drop the legacy one."""
+    op.execute(
+        "INSERT INTO messages (id, device_id, client_id, sensor, value, unit, timestamp, payload) "
+        "SELECT id, device_id, client_id, sensor, value, unit, timestamp, payload FROM messages_legacy"
+    )
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+    op.drop_table("messages_legacy")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _retire_old_table()
+    op.execute(f"CREATE TABLE messages ({_COLUMNS}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+    # month boundaries in UTC, matching app/helpers/partitions.py
+    op.execute("SET LOCAL TimeZone = 'UTC'")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            start_at timestamptz := date_trunc('month', coalesce((SELECT min(timestamp) FROM messages_legacy), now()));
+            last_at timestamptz := date_trunc('month', now()) + interval '2 months';
+        BEGIN
+            WHILE start_at <= last_at LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                    'messages_p' || to_char(start_at, 'YYYY_MM'), start_at, start_at + interval '1 month'
+                );
+                start_at := start_at + interval '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+    _adopt_rows()
+    _create_query_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _retire_old_table()
+    op.execute(f"CREATE TABLE messages ({_COLUMNS}, PRIMARY KEY (id))")
+    op.create_index("ix_messages_id", "messages", ["id"])
+    _adopt_rows()
+    _create_query_indexes()
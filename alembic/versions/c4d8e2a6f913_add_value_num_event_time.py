@@ -0,0 +1,46 @@
+"""add value_num and event_time to messages
+
+Two typed columns next to the text ones:
+
+- value_num (double precision): `value` when it is a plain number, else NULL;
+- event_time (timestamptz): the device's own time of the reading (`timestamp`
+  stays the ingest time and the partition key).
+
+Both are nullable, so adding them is a catalog-only change. Existing rows are
+filled in afterwards, in batches, by the `backfill_message_columns` task
+(app/helpers/message_backfill.py); legacy rows get event_time = timestamp,
+as the device time was never stored for them. The indexes mirror the
+timestamp ones and are created on the partitioned parent.
+
+Revision ID: c4d8e2a6f913
+Revises: 9b2e4c1f7a35
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2a6f913'
+down_revision: Union[str, Sequence[str], None] = '9b2e4c1f7a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("messages", sa.Column("value_num", sa.Float(), nullable=True))
+    op.add_column("messages", sa.Column("event_time", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_messages_device_event_time_id", "messages", ["device_id", "event_time", "id"])
+    op.create_index("ix_messages_event_time_brin", "messages", ["event_time"], postgresql_using="brin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_messages_event_time_brin", table_name="messages")
+    op.drop_index("ix_messages_device_event_time_id", table_name="messages")
+    op.drop_column("messages", "event_time")
+    op.drop_column("messages", "value_num")
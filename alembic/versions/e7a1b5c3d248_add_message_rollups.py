@@ -0,0 +1,60 @@
+"""add message rollup tables
+
+Per-minute (message_rollups_1m) and per-hour (message_rollups_1h) count /
+sum / min / max / last of value_num per (device_id, sensor, bucket_start),
+plus the watermark row the `refresh_message_rollups` beat task advances.
+
+The tables start empty; the first refresh runs fold the existing messages
+in, MESSAGES_ROLLUP_BATCH_SIZE at a time. Leave MESSAGES_ROLLUPS_ENABLED off
+until they have caught up (queries stay correct before that, only slower).
+
+Revision ID: e7a1b5c3d248
+Revises: c4d8e2a6f913
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1b5c3d248'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e2a6f913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ROLLUP_TABLES = ("message_rollups_1m", "message_rollups_1h")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in _ROLLUP_TABLES:
+        op.create_table(
+            name,
+            sa.Column("device_id", sa.Integer(), nullable=False),
+            sa.Column("sensor", sa.Text(), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("count", sa.BigInteger(), nullable=False),
+            sa.Column("sum", sa.Float(), nullable=False),
+            sa.Column("min", sa.Float(), nullable=False),
+            sa.Column("max", sa.Float(), nullable=False),
+            sa.Column("last_value", sa.Float(), nullable=False),
+            sa.Column("last_event_time", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("device_id", "sensor", "bucket_start"),
+        )
+    op.create_table(
+        "message_rollup_watermarks",
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("message_rollup_watermarks")
+    for name in reversed(_ROLLUP_TABLES):
+        op.drop_table(name)
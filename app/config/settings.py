@@ -1,7 +1,8 @@
 # app/config/settings.py
 from __future__ import annotations
+import importlib.util
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import Field, AnyUrl, ValidationError, model_validator
 from pydantic_settings import BaseSettings
 
@@ -37,8 +38,65 @@ class Settings(BaseSettings):
     SQS_THREAD_POOL_SIZE: int = Field(..., ge=1)
     SQS_VISIBILITY_TIMEOUT: int = Field(..., ge=1)
 
+    SQS_BATCH_MODE: bool = Field(False, description="Persist received messages in one DB transaction per batch")
+    SQS_BATCH_SIZE: int = Field(10, ge=1, le=1000, description="Flush a batch once it holds this many messages")
+    SQS_BATCH_WINDOW_MS: int = Field(0, ge=0, description="Max time to accumulate a batch; 0 = one batch per receive")
+    SQS_BATCH_COPY: bool = Field(False, description="Batch mode: write rows with COPY instead of a multi-row INSERT")
+    SQS_ACK_MAX_DELAY_MS: int = Field(200, ge=1, description="Max time a receipt waits before its delete batch is flushed")
+    SQS_ACK_MAX_RETRIES: int = Field(3, ge=0, description="Retries for delete_message_batch entries that failed")
+    SQS_MAX_IN_FLIGHT: int = Field(100, ge=1, description="Pause polling once this many messages are unfinished")
+    SQS_IN_FLIGHT_LOW_WATERMARK: int = Field(50, ge=0, description="Resume polling at or below this many in flight")
+
+    SQS_POLLERS: int = Field(1, ge=1, description="Parallel receive loops at startup")
+    SQS_AUTOSCALE: bool = Field(False, description="Resize the poller set from queue depth / empty receives")
+    SQS_POLLERS_MIN: int = Field(1, ge=1, description="Autoscaling lower bound")
+    SQS_POLLERS_MAX: int = Field(4, ge=1, description="Autoscaling upper bound")
+    SQS_AUTOSCALE_INTERVAL: float = Field(15.0, gt=0, description="Seconds between autoscaling decisions")
+    SQS_AUTOSCALE_MESSAGES_PER_POLLER: int = Field(100, ge=1, description="Backlog one poller is expected to drain")
+    SQS_AUTOSCALE_EMPTY_RATE: float = Field(0.5, gt=0, le=1, description="Retire a poller above this empty-receive rate")
+
+    SQS_HEARTBEAT: bool = Field(True, description="Extend the visibility of messages still being processed")
+    SQS_HEARTBEAT_INTERVAL: Optional[float] = Field(None, gt=0, description="Seconds between heartbeats; default a third of SQS_VISIBILITY_TIMEOUT")
+    SQS_MAX_PROCESSING_TIME: int = Field(300, ge=1, description="Release a message for redelivery after processing this long")
+
+    ENTITY_CACHE_SIZE: int = Field(10_000, ge=1, description="Max client ids (and device ids) kept in the entity registry")
+    ENTITY_CACHE_TTL: float = Field(600.0, gt=0, description="Seconds a cached client/device id is trusted")
+
+    SQS_ENGINE: Literal["threaded", "asyncio"] = Field("threaded", description="SQS consumer engine")
+    SQS_ASYNC_CONCURRENCY: int = Field(16, ge=1, description="asyncio engine: max messages/batches processed at once")
+    SQS_ASYNC_IO_THREADS: int = Field(2, ge=1, description="asyncio engine: boto3 fallback threads")
+
     REDIS_URL: str = Field(..., description="Redis connection URL")
     REDIS_MAX_MESSAGES: int = Field(..., ge=1, description="Maximum number of messages to keep in Redis")
+    REDIS_MAX_CONNECTIONS: int = Field(50, ge=1, description="Size of the shared Redis connection pool")
+    REDIS_POOL_TIMEOUT: float = Field(5.0, gt=0, description="Seconds to wait for a free pooled connection")
+    REDIS_HEALTH_CHECK_INTERVAL: int = Field(30, ge=0, description="PING idle connections older than this before reuse; 0 = off")
+    REDIS_LATEST_BACKEND: Literal["list", "stream"] = Field(
+        "list", description="Latest-message store: capped list (default), or opt-in global/per-device/per-client streams"
+    )
+    REDIS_MIRROR_CODEC: Literal["json", "tuple", "msgpack"] = Field(
+        "json", description="Encoding of mirrored messages; readers decode every codec"
+    )
+    REDIS_MIRROR_BUFFERED: bool = Field(False, description="Coalesce mirrored messages in a write-behind buffer instead of one pipeline per ingest")
+    REDIS_MIRROR_DELAY_MS: int = Field(5, ge=1, description="Max time a message waits in the mirror buffer before its pipeline is sent")
+    REDIS_MIRROR_MAX_BATCH: int = Field(500, ge=1, description="Max messages per mirror pipeline")
+
+    MESSAGES_TOTAL_MODE: Literal["exact", "estimated", "cached", "none"] = Field(
+        "exact", description="Default way GET /messages computes `total`"
+    )
+    MESSAGES_TOTAL_CACHE_TTL: int = Field(30, ge=1, description="Seconds a cached /messages total is reused")
+    MESSAGES_PARTITION_INTERVAL: Literal["day", "month"] = Field("month", description="Size of new messages partitions")
+    MESSAGES_PARTITIONS_AHEAD: int = Field(2, ge=0, description="Future partitions kept ready")
+    MESSAGES_RETENTION_DAYS: int = Field(0, ge=0, description="Retire partitions older than this; 0 keeps everything")
+    MESSAGES_RETENTION_MODE: Literal["drop", "detach"] = Field("drop", description="Drop expired partitions or only detach them")
+    MESSAGES_BACKFILL_BATCH_SIZE: int = Field(10000, ge=1, description="Ids per committed batch of the value_num/event_time backfill")
+    MESSAGES_AGGREGATE_MAX_BUCKETS: int = Field(5000, ge=1, description="Most buckets one /messages/aggregate request may span")
+    MESSAGES_AGGREGATE_CLOSE_DELAY: int = Field(60, ge=0, description="Seconds after its end before a bucket counts as closed and is cached")
+    MESSAGES_AGGREGATE_CACHE_TTL: int = Field(86400, ge=1, description="Seconds cached closed aggregate buckets are kept in Redis")
+    MESSAGES_AGGREGATE_MAX_CLOCK_SKEW: int = Field(3600, ge=0, description="How far a device clock may run ahead of ingest; bounds aggregate queries on timestamp")
+    MESSAGES_ROLLUPS_ENABLED: bool = Field(False, description="Serve coarse /messages/aggregate buckets from the rollup tables (needs the refresh beat task)")
+    MESSAGES_ROLLUP_BATCH_SIZE: int = Field(50000, ge=1, description="Messages folded into the rollups per refresh run")
+    MESSAGES_ROLLUP_SETTLE_SECONDS: int = Field(30, ge=0, description="Only roll up messages ingested at least this long ago")
 
     @model_validator(mode="after")
     def _post_validate(self) -> "Settings":
@@ -48,6 +106,11 @@ class Settings(BaseSettings):
           `SQS_ENDPOINT_URL` must be provided.
         - Builds `DATABASE_URL` dynamically from DB parameters and the password
           file, if it is not already provided.
+        - Ensures the in-flight low watermark is below the in-flight limit.
+        - Ensures a full batch fits under the low watermark in batch mode.
+        - Ensures SQS_POLLERS_MIN <= SQS_POLLERS <= SQS_POLLERS_MAX when autoscaling.
+        - Ensures a heartbeat fires at least twice per SQS_VISIBILITY_TIMEOUT.
+        - Ensures the msgpack package is installed when REDIS_MIRROR_CODEC=msgpack.
 
         """
         if str(self.SQS_QUEUE_URL).startswith(("http://localhost:4566", "https://localhost:4566")) \
@@ -57,6 +120,29 @@ class Settings(BaseSettings):
                 "Set SQS_ENDPOINT_URL=http://localhost:4566"
             )
 
+        if self.SQS_IN_FLIGHT_LOW_WATERMARK >= self.SQS_MAX_IN_FLIGHT:
+            raise ValueError(
+                "SQS_IN_FLIGHT_LOW_WATERMARK must be lower than SQS_MAX_IN_FLIGHT"
+            )
+
+        if self.SQS_BATCH_MODE and self.SQS_BATCH_SIZE > self.SQS_IN_FLIGHT_LOW_WATERMARK:
+            raise ValueError(
+                "SQS_BATCH_SIZE must not exceed SQS_IN_FLIGHT_LOW_WATERMARK in batch mode"
+            )
+
+        if self.SQS_AUTOSCALE and not (self.SQS_POLLERS_MIN <= self.SQS_POLLERS <= self.SQS_POLLERS_MAX):
+            raise ValueError(
+                "SQS_POLLERS must be within [SQS_POLLERS_MIN, SQS_POLLERS_MAX] when SQS_AUTOSCALE is on"
+            )
+
+        if self.SQS_HEARTBEAT_INTERVAL is not None and self.SQS_HEARTBEAT_INTERVAL * 2 >= self.SQS_VISIBILITY_TIMEOUT:
+            raise ValueError(
+                "SQS_HEARTBEAT_INTERVAL must be lower than half of SQS_VISIBILITY_TIMEOUT"
+            )
+
+        if self.REDIS_MIRROR_CODEC == "msgpack" and importlib.util.find_spec("msgpack") is None:
+            raise ValueError("REDIS_MIRROR_CODEC=msgpack requires the msgpack package")
+
         if not self.DATABASE_URL:
             pw_path = Path(self.DB_PASS_FILE)
             if not pw_path.exists():
@@ -67,6 +153,11 @@ class Settings(BaseSettings):
             )
         return self
 
+    @property
+    def sqs_effective_endpoint(self) -> Optional[str]:
+        """Endpoint URL to hand to boto3 (None lets boto3 resolve the AWS default)."""
+        return str(self.SQS_ENDPOINT_URL) if self.SQS_ENDPOINT_URL else None
+
 
 def get_settings() -> Settings:
     """
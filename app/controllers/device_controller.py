@@ -1,18 +1,25 @@
 """
 This module provides API endpoints for managing devices in the system.
 
+- GET /devices/{device_id}/state and GET /devices/state?device_id=..: latest
+  reading of every sensor, served from the Redis state hashes kept by the consumer
+
 """
 
 import json
 import logging
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import redis.asyncio as redis
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.device_model import Device
-from app.models.device_schema import DeviceCreate, DeviceRead
+from app.models.device_schema import DeviceCreate, DeviceRead, DeviceState, DeviceStates
 from app.helpers.database import get_db
+from app.helpers.device_state import get_device_state, get_device_states
+from app.helpers.redis_client import get_redis
 from logging_config import setup_logging
 
 setup_logging()
@@ -96,3 +103,57 @@ async def create_device(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal error while creating the device."
         ) from e
+
+
+@router.get(
+    "/state",
+    response_model=DeviceStates,
+    summary="Latest sensor readings of many devices",
+    responses={
+        200: {"description": "Snapshots of the devices that have state; unknown ones are left out"},
+        500: {"description": "Server error while reading from Redis"},
+    },
+)
+async def get_devices_state(
+    device_id: List[int] = Query(..., max_length=500, description="Repeat for each device"),
+    r: redis.Redis = Depends(get_redis),
+) -> DeviceStates:
+    """Read every requested device's state hash in one pipelined round trip."""
+    try:
+        states = await get_device_states(r, device_id)
+    except Exception as e:
+        logger.error("Failed to read device states: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to read device states."
+        ) from e
+    items = [DeviceState(device_id=d, sensors=sensors) for d, sensors in states.items()]
+    return DeviceStates(count=len(items), items=items)
+
+
+@router.get(
+    "/{device_id}/state",
+    response_model=DeviceState,
+    summary="Latest sensor readings of one device",
+    responses={
+        200: {"description": "Latest reading per sensor"},
+        404: {"description": "No state recorded for this device"},
+        500: {"description": "Server error while reading from Redis"},
+    },
+)
+async def get_device_state_snapshot(
+    device_id: int,
+    r: redis.Redis = Depends(get_redis),
+) -> DeviceState:
+    """Return the device's state hash (one HGETALL)."""
+    try:
+        sensors = await get_device_state(r, device_id)
+    except Exception as e:
+        logger.error("Failed to read state of device %s: %s", device_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to read device state."
+        ) from e
+    if sensors is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No state recorded for this device.")
+    return DeviceState(device_id=device_id, sensors=sensors)
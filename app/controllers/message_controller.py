@@ -5,29 +5,66 @@ Accepts an ISO 8601 timestamp and returns all messages newer than that
 timestamp as a JSON list (id, timestamp, payload).
 
 Supports:
-- pagination: limit, offset
-- filters: device_id, from_ts/to_ts (ISO 8601; inclusive)
+- pagination: limit + offset, or limit + an opaque `cursor` (keyset on timestamp, id)
+- GET /messages/export: the same filters, streamed as NDJSON or CSV (optionally gzipped)
+- list pages are built from plain column rows and encoded straight to JSON bytes
+  (same bytes as the PaginatedMessages model would produce)
+- total_mode: exact | estimated | cached | none (how `total` is computed); `has_more`
+  always comes from fetching limit+1 rows
+- filters: device_id, since (exclusive) / until (inclusive); both bounds are plain
+  timestamp predicates so PostgreSQL prunes the partitions outside them
+- event_since / event_until on the device's event_time and value_min / value_max on
+  the numeric value_num (typed columns, no per-row casts)
+- GET /messages/aggregate: per-bucket count/min/max/avg/last of a sensor's numeric
+  values, computed in SQL; closed buckets are cached in Redis (see
+  app/helpers/message_aggregate.py). Its floats are written the way orjson writes
+  them (1e16, 1e-7, 0.00001), not like FastAPI's JSONResponse (1e+16, 1e-07, 1e-05);
+  see app/helpers/fast_json.py
+- GET /messages/latest: device_id / client_id / after_id, served from the matching
+  Redis stream (see app/helpers/latest_store.py)
 
 """
-import json
 import logging
-from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy import select, func
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 import redis.asyncio as redis
 
 from app.helpers.database import get_db
+from app.helpers.fast_json import dumps
+from app.helpers.message_aggregate import BUCKET_WIDTHS, EPOCH, AggregateFilter, Bucket, aggregate, bucket_range
+from app.helpers.message_export import EXPORT_FORMATS, ExportFormat, export_stream
+from app.helpers.message_query import TotalMode, after_cursor, apply_filters, count_total, encode_cursor, keyset_order
+from app.helpers.latest_store import read_latest
 from app.helpers.redis_client import get_redis, settings
 from app.models.message_model import Message
-from app.models.message_schema import MessageResponse, PaginatedMessages, LatestMessages
+from app.models.message_schema import MessageResponse, PaginatedMessages, LatestMessages, SensorAggregates
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Column order == MessageResponse field order, so each row zips straight into an item.
+_ITEM_COLUMNS = [getattr(Message, name) for name in MessageResponse.model_fields]
+_ITEM_FIELDS = list(MessageResponse.model_fields)
+
+def _latest_item(message: dict) -> dict:
+    """A decoded mirror entry in RedisMessageResponse shape (legacy JSON entries carry ids as strings)."""
+    return {
+        "id": int(message["id"]),
+        "device_id": int(message["device_id"]),
+        "client_id": int(message["client_id"]),
+        "sensor": message.get("sensor"),
+        "value": message.get("value"),
+        "unit": message.get("unit"),
+        "timestamp": message["timestamp"],
+        "payload": message["payload"],
+    }
+
 def _parse_european_timestamp(ts: str) -> datetime:
     """
         Parse ONLY European date formats:
@@ -73,40 +110,73 @@ def _parse_european_timestamp(ts: str) -> datetime:
 )
 async def get_messages(
     since: str = Query(..., description="Format: DD.MM.YYYY[ HH:MM:SS]"),
+    until: Optional[str] = Query(None, description="Upper bound (inclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
     device_id: Optional[int]=Query(None, description="Filter by device_id") ,
+    event_since: Optional[str] = Query(None, description="Device event time lower bound (exclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
+    event_until: Optional[str] = Query(None, description="Device event time upper bound (inclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
+    value_min: Optional[float] = Query(None, description="Minimum numeric value (inclusive)"),
+    value_max: Optional[float] = Query(None, description="Maximum numeric value (inclusive)"),
     limit: int = Query(50, ge=1, le=500, description="page size(1..500"),
     offset: int =Query(0, ge=0, description="Row offset"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page; replaces offset"),
+    total_mode: Optional[TotalMode] = Query(
+        None, description="How to compute `total`: exact, estimated, cached or none (default: MESSAGES_TOTAL_MODE)"
+    ),
     db: AsyncSession = Depends(get_db),
-) -> PaginatedMessages:
+) -> Response:
     """
     Return all messages with `timestamp` strictly greater than the provided timestamp.
+
+    Pages are ordered by (timestamp, id). Every page carries `next_cursor`; passing it
+    back as `cursor` seeks straight to the following page, so deep pages cost the
+    same as the first one (unlike `offset`). `total` is computed per `total_mode`;
+    `has_more` is always exact and free (one extra row is fetched).
+
+    Rows are selected as plain column tuples (no ORM objects, no per-row model
+    validation) and encoded directly; the body matches `PaginatedMessages`.
     """
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
     logger.info("Fetching messages since timestamp: %s", since)
     since_dt = _parse_european_timestamp(since)
+    until_dt = _parse_european_timestamp(until) if until is not None else None
+    filters = dict(
+        since=since_dt,
+        until=until_dt,
+        device_id=device_id,
+        event_since=_parse_european_timestamp(event_since) if event_since is not None else None,
+        event_until=_parse_european_timestamp(event_until) if event_until is not None else None,
+        value_min=value_min,
+        value_max=value_max,
+    )
 
     try:
-        base_stmt = select(Message).where(Message.timestamp > since_dt).order_by(Message.timestamp)
-
-        if device_id is not None:
-            base_stmt=base_stmt.where(Message.device_id==device_id)
+        base_stmt = apply_filters(select(*_ITEM_COLUMNS), **filters)
 
-        total_querry=await db.execute(select(func.count()).select_from(base_stmt.subquery()))
-        total=total_querry.scalar_one()
+        mode = total_mode or settings.MESSAGES_TOTAL_MODE
+        total = await count_total(db, base_stmt, mode, filter_key="|".join(str(v) for v in filters.values()))
 
-        paged_stmt = (
-            base_stmt.order_by(Message.timestamp.asc())
-            .offset(offset).limit(limit)
-        )
+        if cursor is not None:
+            paged_stmt = keyset_order(after_cursor(base_stmt, cursor)).limit(limit + 1)
+        else:
+            paged_stmt = keyset_order(base_stmt).offset(offset).limit(limit + 1)
 
         result = await db.execute(paged_stmt)
-        rows = result.scalars().all()
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-        return PaginatedMessages(
-            total=total,
-            limit=limit,
-            offset=offset,
-            items=[MessageResponse.model_validate(m) for m in rows]
-        )
+        # Same keys, order and types as PaginatedMessages.
+        body = {
+            "total": total,
+            "total_mode": mode,
+            "limit": limit,
+            "offset": offset,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None,
+            "items": [dict(zip(_ITEM_FIELDS, row)) for row in rows],
+        }
+        return Response(content=dumps(body), media_type="application/json")
     except HTTPException:
         raise
     except SQLAlchemyError as e:
@@ -116,6 +186,130 @@ async def get_messages(
             detail="Database error while fetching messages",
         ) from e
 
+@router.get(
+    "/export",
+    tags=["Messages"],
+    summary="Stream every message of a range as NDJSON or CSV",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Streamed messages, ordered by (timestamp, id)"},
+        400: {"description": "Invalid timestamp"},
+    },
+)
+async def export_messages(
+    since: str = Query(..., description="Format: DD.MM.YYYY[ HH:MM:SS]"),
+    until: Optional[str] = Query(None, description="Upper bound (inclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
+    device_id: Optional[int] = Query(None, description="Filter by device_id"),
+    event_since: Optional[str] = Query(None, description="Device event time lower bound (exclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
+    event_until: Optional[str] = Query(None, description="Device event time upper bound (inclusive), format: DD.MM.YYYY[ HH:MM:SS]"),
+    value_min: Optional[float] = Query(None, description="Minimum numeric value (inclusive)"),
+    value_max: Optional[float] = Query(None, description="Maximum numeric value (inclusive)"),
+    format: ExportFormat = Query("ndjson", description="ndjson or csv"),
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Stream all matching messages without pagination, COUNT or an in-memory page.
+
+    Rows are read through a server-side cursor in chunks, so memory stays flat
+    whatever the size of the range.
+    """
+    since_dt = _parse_european_timestamp(since)
+    until_dt = _parse_european_timestamp(until) if until is not None else None
+    logger.info("Exporting messages since=%s until=%s device=%s as %s", since, until, device_id, format)
+
+    stmt = keyset_order(apply_filters(
+        select(Message),
+        since=since_dt,
+        until=until_dt,
+        device_id=device_id,
+        event_since=_parse_european_timestamp(event_since) if event_since is not None else None,
+        event_until=_parse_european_timestamp(event_until) if event_until is not None else None,
+        value_min=value_min,
+        value_max=value_max,
+    ))
+    media_type, extension = EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="messages.{extension}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    # The request's session is closed before the body is streamed, so the stream opens its own on the same engine.
+    return StreamingResponse(
+        export_stream(db.bind, stmt, format, compress=gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get(
+    "/aggregate",
+    tags=["Messages"],
+    summary="Per-bucket count/min/max/avg/last of numeric sensor values",
+    response_model=SensorAggregates,
+    responses={
+        200: {"description": "Non-empty buckets, oldest first; floats use orjson's format (1e16, 1e-7, 0.00001)"},
+        400: {"description": "Invalid timestamp or too many buckets"},
+        500: {"description": "Database error while aggregating messages"},
+    },
+)
+async def aggregate_messages(
+    since: str = Query(..., description="Device event time lower bound, format: DD.MM.YYYY[ HH:MM:SS]"),
+    until: Optional[str] = Query(None, description="Device event time upper bound (default: now), format: DD.MM.YYYY[ HH:MM:SS]"),
+    bucket: Bucket = Query("1h", description="Bucket width: 1m, 5m, 15m, 1h, 6h or 1d"),
+    device_id: Optional[int] = Query(None, description="Filter by device_id"),
+    client_id: Optional[int] = Query(None, description="Filter by client_id"),
+    sensor: Optional[str] = Query(None, description="Filter by sensor"),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """
+    Aggregate `value_num` per `event_time` bucket, so clients no longer page raw
+    messages to compute statistics. The range is widened to whole buckets
+    (epoch-aligned); `since`/`until` in the response are the widened bounds.
+    `cached` counts the buckets served from Redis. min/max/avg/last are
+    encoded with orjson's float format on every deployment: exponents without
+    "+" or leading zeros and 1e-5 written positionally. The values equal
+    JSONResponse's but the bytes can differ, so compare parsed numbers, not bodies.
+    """
+    since_dt = _parse_european_timestamp(since)
+    until_dt = _parse_european_timestamp(until) if until is not None else datetime.now(timezone.utc)
+    if until_dt < since_dt:
+        raise HTTPException(status_code=400, detail="until must not be before since")
+    where = AggregateFilter(device_id=device_id, client_id=client_id, sensor=sensor)
+
+    try:
+        stats, cached = await aggregate(db, where, since=since_dt, until=until_dt, bucket=bucket)
+    except SQLAlchemyError as e:
+        logger.error("Database error while aggregating messages: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error while aggregating messages",
+        ) from e
+
+    width = int(BUCKET_WIDTHS[bucket].total_seconds())
+    starts = bucket_range(since_dt, until_dt, width)
+    # Same keys, order and types as SensorAggregates.
+    body = {
+        "bucket": bucket,
+        "since": EPOCH + timedelta(seconds=starts[0]),
+        "until": EPOCH + timedelta(seconds=starts[-1] + width),
+        "device_id": device_id,
+        "client_id": client_id,
+        "sensor": sensor,
+        "cached": cached,
+        "items": [
+            {
+                "bucket_start": EPOCH + timedelta(seconds=start),
+                "count": n,
+                "min": lo,
+                "max": hi,
+                "avg": avg,
+                "last": last_value,
+            }
+            for start, n, lo, hi, avg, last_value in stats
+        ],
+    }
+    return Response(content=dumps(body), media_type="application/json")
+
+
 @router.get(
     "/latest",
     tags=["Messages"],
@@ -133,23 +327,37 @@ async def get_latest_messages(
             ge=1,
             description=" Max items to return "
         ),
+        device_id: Optional[int] = Query(None, description="Only this device's messages"),
+        client_id: Optional[int] = Query(None, description="Only this client's messages"),
+        after_id: Optional[str] = Query(None, description="`last_id` of a previous response: only newer messages"),
         r: redis.Redis = Depends(get_redis),
 ):
-    "return the most recent mirrored messages from Redis"
+    "return the most recent mirrored messages from Redis (entries of any mirror codec)"
 
     try:
         max_n = settings.REDIS_MAX_MESSAGES
-        n= min(limit,max_n)
-
-        redis_messages: List[str] = await r.lrange("latest:messages", 0, n-1)
-        messages: List[Dict[str, Any]]=[json.loads(x) for x in redis_messages]
+        n= min(limit or max_n,max_n)
 
-        return LatestMessages(
-            count=len(messages),
+        messages, last_id = await read_latest(
+            r,
+            backend=settings.REDIS_LATEST_BACKEND,
             limit=n,
-            items=messages,
+            device_id=device_id,
+            client_id=client_id,
+            after_id=after_id,
         )
 
+        # Same keys, order and types as LatestMessages, without per-item validation.
+        body = {
+            "count": len(messages),
+            "limit": n,
+            "last_id": last_id,
+            "items": [_latest_item(m) for m in messages],
+        }
+        return Response(content=dumps(body), media_type="application/json")
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,33 @@
+"""
+Runtime metrics for the in-process background components.
+
+- GET /metrics: counters and gauges of the SQS consumer (acknowledgement
+  batches, latency, ...) and of the shared Redis pool. Values are
+  process-local and reset on restart.
+"""
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Request
+from app.helpers.redis_client import redis_pool_metrics
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "",
+    summary="Get runtime metrics",
+    responses={
+        200: {"description": "Metrics snapshot"},
+    },
+)
+async def get_metrics(request: Request) -> Dict[str, Any]:
+    """
+    Return a snapshot of the SQS consumer and Redis pool metrics (null when not running).
+    """
+    consumer = getattr(request.app.state, "sqs_consumer", None)
+    return {
+        "sqs": consumer.metrics() if consumer is not None else None,
+        "redis": redis_pool_metrics(),
+    }
@@ -0,0 +1,170 @@
+"""COPY-based bulk loader for the `messages` table.
+
+Batched INSERTs still pay per-row statement overhead, which dominates
+backfills and backlog catch-up. On PostgreSQL this loader streams rows with
+asyncpg's binary COPY protocol (`copy_records_to_table`) inside the session's
+transaction. Ids are taken from the table's sequence up front, so callers get
+them back just like with `save_messages`. Other dialects (SQLite in tests)
+fall back to `save_messages`.
+
+Usage:
+    python -m app.helpers.bulk_loader messages.xml [--batch-size 5000] [--database-url URL]
+
+The input file holds one message body per line, XML or JSON, exactly as it
+arrives on SQS; lines are decoded by the consumer's codecs (app.sqs.codecs).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.helpers.message_helper import CONSUMER_PAYLOAD, save_messages
+from app.models.messageSummary import MessageSummary
+from app.models.message_model import Message
+from app.sqs.codecs import DecodeError, IngestDecoder
+
+logger = logging.getLogger(__name__)
+
+_COPY_COLUMNS = ["id", "device_id", "client_id", "sensor", "value", "unit", "timestamp", "payload", "value_num", "event_time"]
+
+# One round trip for the ids; now() is the transaction timestamp, i.e. what the server default would store.
+_ALLOCATE_IDS = (
+    f"SELECT nextval(pg_get_serial_sequence('{Message.__tablename__}', 'id')) AS id, now() AS ts "
+    "FROM generate_series(1, $1)"
+)
+
+
+class SavedMessage(NamedTuple):
+    id: int
+    timestamp: object
+
+
+@dataclass
+class LoadReport:
+    """Outcome of a bulk load."""
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+
+async def copy_messages(
+    session: AsyncSession,
+    summaries: Iterable[MessageSummary],
+    *,
+    commit: bool = True,
+) -> List[SavedMessage]:
+    """
+    Write messages with binary COPY (PostgreSQL) or a multi-row INSERT (other dialects).
+
+    Returns one (id, timestamp) row per summary, in the order given.
+    """
+    summaries = list(summaries)
+    if not summaries:
+        return []
+
+    if session.get_bind().dialect.name != "postgresql":
+        rows = await save_messages(session, summaries, commit=commit)
+        return [SavedMessage(row.id, row.timestamp) for row in rows]
+
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection
+
+    allocated = await pg.fetch(_ALLOCATE_IDS, len(summaries))
+    saved = [SavedMessage(r["id"], r["ts"]) for r in allocated]
+    await pg.copy_records_to_table(
+        Message.__tablename__,
+        columns=_COPY_COLUMNS,
+        records=[
+            (
+                row.id,
+                int(s.device_id),
+                int(s.client_id),
+                s.sensor or None,
+                s.value or None,
+                s.unit or None,
+                row.timestamp,
+                CONSUMER_PAYLOAD,
+                s.value_num,
+                s.event_time or row.timestamp,
+            )
+            for row, s in zip(saved, summaries)
+        ],
+    )
+    if commit:
+        await session.commit()
+    return saved
+
+
+def _chunks(items: Iterable[MessageSummary], size: int) -> Iterator[List[MessageSummary]]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+async def load_messages(
+    sessionmaker: async_sessionmaker,
+    summaries: Iterable[MessageSummary],
+    *,
+    batch_size: int = 5000,
+) -> LoadReport:
+    """Load `summaries` in batches of `batch_size`, one transaction per batch."""
+    report = LoadReport()
+    started = time.perf_counter()
+    for chunk in _chunks(summaries, batch_size):
+        async with sessionmaker() as session:
+            await copy_messages(session, chunk)
+        report.rows += len(chunk)
+        report.batches += 1
+        report.seconds = time.perf_counter() - started
+        logger.info("Loaded %d rows (%.1f rows/sec)", report.rows, report.rows_per_sec)
+    return report
+
+
+def read_summaries(path: str) -> Iterator[MessageSummary]:
+    """
+    Yield a MessageSummary for every XML or JSON line of `path`, decoded like an
+    SQS body; a line no codec accepts raises DecodeError with its line number.
+    """
+    decoder = IngestDecoder()
+    with open(path, encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                summary = decoder.decode({"Body": line})
+            except DecodeError as e:
+                raise DecodeError(f"{path}:{lineno}: {e}") from e
+            yield summary
+
+
+async def _main(args: argparse.Namespace) -> LoadReport:
+    if args.database_url:
+        engine = create_async_engine(args.database_url)
+        sessionmaker = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    else:
+        from app.helpers.database import SessionLocal, engine
+        sessionmaker = SessionLocal
+    try:
+        return await load_messages(sessionmaker, read_summaries(args.path), batch_size=args.batch_size)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load messages into the messages table with COPY.")
+    parser.add_argument("path", help="file with one XML body or JSON object per line")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per COPY / transaction")
+    parser.add_argument("--database-url", help="SQLAlchemy async URL; defaults to the app database")
+    report = asyncio.run(_main(parser.parse_args()))
+    print(f"{report.rows} rows in {report.batches} batches, {report.seconds:.2f}s ({report.rows_per_sec} rows/sec)")
@@ -0,0 +1,114 @@
+"""
+Latest reading of every sensor of every device, kept in Redis.
+
+One hash per device (`device:state:<device_id>`), one field per sensor. Each
+field holds the JSON of the newest reading (value, unit, timestamp,
+message_id, ts). `ts` is the device time in epoch milliseconds, taken from
+the `event_ms` the consumer adds to each mirrored message (the aware event
+time, so readings sent with different UTC offsets order correctly); entries
+without it fall back to the display timestamp read as UTC.
+Updates go through a Lua script that only overwrites a field with a newer
+(ts, message_id), so redelivered or out-of-order messages never roll a sensor
+back. Reading one device is an HGETALL; reading many is one pipeline of them.
+"""
+from __future__ import annotations
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+DEVICE_STATE_KEY = "device:state:{}"
+UNKNOWN_SENSOR = "unknown"
+
+# KEYS[i] = device hash; ARGV[4i-3..4i] = sensor, ts, message id, reading JSON.
+# The message id breaks ties between equal timestamps.
+_UPDATE_STATE = """
+local updated = 0
+for i, key in ipairs(KEYS) do
+    local sensor = ARGV[4 * i - 3]
+    local ts = tonumber(ARGV[4 * i - 2])
+    local id = tonumber(ARGV[4 * i - 1]) or 0
+    local reading = ARGV[4 * i]
+    local current = redis.call('HGET', key, sensor)
+    local newer = true
+    if current then
+        local old = cjson.decode(current)
+        local old_ts = tonumber(old.ts) or 0
+        newer = ts > old_ts or (ts == old_ts and id > (tonumber(old.message_id) or 0))
+    end
+    if newer then
+        redis.call('HSET', key, sensor, reading)
+        updated = updated + 1
+    end
+end
+return updated
+"""
+
+
+def event_ms(event_time: Optional[datetime]) -> int:
+    """Aware event time in epoch ms; 0 when the device sent none."""
+    return int(event_time.timestamp() * 1000) if event_time else 0
+
+
+def _epoch_ms(timestamp: str) -> int:
+    """Device timestamp (DD.MM.YYYY HH:MM:SS, UTC) in epoch ms; 0 when missing or unparsable."""
+    try:
+        dt = datetime.strptime(timestamp, "%d.%m.%Y %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return 0
+    return int(dt.timestamp() * 1000)
+
+
+async def queue_device_state(pipe: redis.client.Pipeline, messages: List[dict]) -> None:
+    """
+    Queue one monotonic state update (EVALSHA) for a batch of mirrored messages on
+    `pipe`; messages without a device_id have no device state and are skipped.
+    """
+    keys: List[str] = []
+    args: List[Any] = []
+    for message in messages:
+        if message.get("device_id") is None:
+            continue
+        ts = message.get("event_ms")
+        if ts is None:
+            ts = _epoch_ms(message.get("timestamp"))
+        reading = {
+            "value": message.get("value"),
+            "unit": message.get("unit"),
+            "timestamp": message.get("timestamp"),
+            "message_id": message.get("id"),
+            "ts": ts,
+        }
+        keys.append(DEVICE_STATE_KEY.format(message["device_id"]))
+        args.extend([
+            message.get("sensor") or UNKNOWN_SENSOR, ts, message.get("id") or 0,
+            json.dumps(reading, separators=(",", ":")),
+        ])
+    if keys:
+        # On a pipeline this only queues the EVALSHA; execute() loads the script first if needed.
+        await pipe.register_script(_UPDATE_STATE)(keys=keys, args=args, client=pipe)
+
+
+def _decode(raw: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    sensors = {}
+    for sensor, encoded in raw.items():
+        reading = json.loads(encoded)
+        reading.pop("ts", None)
+        sensors[sensor] = reading
+    return sensors
+
+
+async def get_device_state(r: redis.Redis, device_id: int) -> Optional[Dict[str, Dict[str, Any]]]:
+    """sensor -> latest reading for one device, or None if nothing was ingested for it."""
+    raw = await r.hgetall(DEVICE_STATE_KEY.format(device_id))
+    return _decode(raw) if raw else None
+
+
+async def get_device_states(r: redis.Redis, device_ids: List[int]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """Snapshots of many devices with one pipelined round trip; devices without state are left out."""
+    pipe = r.pipeline(transaction=False)
+    for device_id in device_ids:
+        pipe.hgetall(DEVICE_STATE_KEY.format(device_id))
+    results = await pipe.execute()
+    return {device_id: _decode(raw) for device_id, raw in zip(device_ids, results) if raw}
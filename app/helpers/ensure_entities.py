@@ -5,7 +5,24 @@ from app.models.client_model import Client
 from app.models.device_model import Device
 from app.enum.status import Status
 
-async def ensure_client(session: AsyncSession, client_id: int) -> Client:
+async def _persist(session: AsyncSession, obj, *, commit: bool) -> None:
+    """
+    Add `obj` and either commit it, or (commit=False) flush it inside a SAVEPOINT
+    so a conflict only rolls back this insert and not the caller's transaction.
+    """
+    if not commit:
+        async with session.begin_nested():
+            session.add(obj)
+        return
+
+    session.add(obj)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise
+
+async def ensure_client(session: AsyncSession, client_id: int, *, commit: bool = True) -> Client:
     """Return client if exists, else create it."""
     res = await session.execute(select(Client).where(Client.client_id == client_id))
     c = res.scalar_one_or_none()
@@ -13,23 +30,21 @@ async def ensure_client(session: AsyncSession, client_id: int) -> Client:
         return c
 
     c = Client(client_id=client_id, name=f"AUTO-{client_id}")
-    session.add(c)
     try:
-        await session.commit()
+        await _persist(session, c, commit=commit)
     except IntegrityError:
-        await session.rollback()
         res = await session.execute(select(Client).where(Client.client_id == client_id))
         c = res.scalar_one()
     return c
 
-async def ensure_device(session: AsyncSession, device_id: int, client_id: int) -> Device:
+async def ensure_device(session: AsyncSession, device_id: int, client_id: int, *, commit: bool = True) -> Device:
     """Return device if exists, else ensure client and create it."""
     res = await session.execute(select(Device).where(Device.device_id == device_id))
     d = res.scalar_one_or_none()
     if d:
         return d
 
-    await ensure_client(session, client_id)
+    await ensure_client(session, client_id, commit=commit)
 
     d = Device(
         device_id=device_id,
@@ -37,11 +52,9 @@ async def ensure_device(session: AsyncSession, device_id: int, client_id: int) -
         name=f"AUTO-{device_id}",
         status=Status.DISCONNECTED,
     )
-    session.add(d)
     try:
-        await session.commit()
+        await _persist(session, d, commit=commit)
     except IntegrityError:
-        await session.rollback()
         res = await session.execute(select(Device).where(Device.device_id == device_id))
         d = res.scalar_one()
     return d
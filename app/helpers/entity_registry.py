@@ -0,0 +1,157 @@
+"""In-process registry of known clients/devices for the ingestion path.
+
+The device fleet is almost static, so checking `clients`/`devices` with a
+SELECT for every ingested message is wasted work. The registry keeps the ids
+that are known to exist in a bounded LRU with a TTL, warmed from both tables
+at consumer start. A miss is resolved with one `INSERT ... ON CONFLICT DO
+NOTHING` per table instead of select → insert → rollback → select.
+"""
+from __future__ import annotations
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.enum.status import Status
+from app.helpers.ensure_entities import ensure_device
+from app.models.client_model import Client
+from app.models.device_model import Device
+
+logger = logging.getLogger(__name__)
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+@dataclass
+class RegistryStats:
+    """Counters for the entity registry."""
+    hits: int = 0
+    misses: int = 0
+    upserts: int = 0
+    evictions: int = 0
+    warmed: int = 0
+
+
+class _TTLCache:
+    """Bounded LRU of ids, each valid for `ttl` seconds after it was last confirmed."""
+
+    def __init__(self, maxsize: int, ttl: float, stats: RegistryStats) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._stats = stats
+        self._expires: "OrderedDict[int, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def __contains__(self, key: int) -> bool:
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._expires[key]
+            return False
+        self._expires.move_to_end(key)
+        return True
+
+    def add(self, key: int) -> None:
+        self._expires[key] = time.monotonic() + self.ttl
+        self._expires.move_to_end(key)
+        while len(self._expires) > self.maxsize:
+            self._expires.popitem(last=False)
+            self._stats.evictions += 1
+
+    def discard(self, key: int) -> None:
+        self._expires.pop(key, None)
+
+
+class EntityRegistry:
+    """
+    Known client/device ids, shared by every message a consumer ingests
+    - ensure() costs no round trip when both ids are cached
+    - on a miss, the missing rows are upserted with ON CONFLICT DO NOTHING inside a SAVEPOINT
+      (PostgreSQL/SQLite; other dialects fall back to ensure_client/ensure_device)
+    - ids are cached as soon as they are upserted; callers discard() them if the
+      surrounding transaction is rolled back
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.stats = RegistryStats()
+        self._clients = _TTLCache(maxsize, ttl, self.stats)
+        self._devices = _TTLCache(maxsize, ttl, self.stats)
+
+    async def warm(self, session: AsyncSession) -> None:
+        """Load the most recent `maxsize` clients and devices."""
+        clients = await session.scalars(
+            select(Client.client_id).order_by(Client.client_id.desc()).limit(self._clients.maxsize)
+        )
+        devices = await session.scalars(
+            select(Device.device_id).order_by(Device.device_id.desc()).limit(self._devices.maxsize)
+        )
+        for client_id in reversed(clients.all()):
+            self._clients.add(client_id)
+        for device_id in reversed(devices.all()):
+            self._devices.add(device_id)
+        self.stats.warmed = len(self._clients) + len(self._devices)
+        logger.info("Entity registry warmed with %d clients and %d devices", len(self._clients), len(self._devices))
+
+    async def ensure(self, session: AsyncSession, device_id: int, client_id: int) -> None:
+        """Make sure the client and device exist, inside the caller's transaction (no commit)."""
+        client_known = client_id in self._clients
+        device_known = device_id in self._devices
+        if client_known and device_known:
+            self.stats.hits += 1
+            return
+        self.stats.misses += 1
+
+        insert = _INSERTS.get(session.get_bind().dialect.name)
+        if insert is None:
+            await ensure_device(session, device_id, client_id, commit=False)
+        else:
+            # SAVEPOINT: a failing upsert must not abort the caller's transaction.
+            async with session.begin_nested():
+                if not client_known:
+                    await session.execute(
+                        insert(Client)
+                        .values(client_id=client_id, name=f"AUTO-{client_id}")
+                        .on_conflict_do_nothing()
+                    )
+                    self.stats.upserts += 1
+                if not device_known:
+                    await session.execute(
+                        insert(Device)
+                        .values(
+                            device_id=device_id,
+                            client_id=client_id,
+                            name=f"AUTO-{device_id}",
+                            status=Status.DISCONNECTED,
+                        )
+                        .on_conflict_do_nothing()
+                    )
+                    self.stats.upserts += 1
+
+        self._clients.add(client_id)
+        self._devices.add(device_id)
+
+    def discard(self, pairs: Iterable[tuple[int, int]]) -> None:
+        """Forget (device_id, client_id) pairs whose upsert was rolled back."""
+        for device_id, client_id in pairs:
+            self._devices.discard(device_id)
+            self._clients.discard(client_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_rate": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            "upserts": self.stats.upserts,
+            "evictions": self.stats.evictions,
+            "warmed": self.stats.warmed,
+            "clients": len(self._clients),
+            "devices": len(self._devices),
+        }
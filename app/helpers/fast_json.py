@@ -0,0 +1,75 @@
+"""Fast JSON encoding (and decoding) for hot API responses.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both produce the same bytes FastAPI's default JSONResponse would
+for the equivalent pydantic model: compact separators, UTF-8 (no \\u escapes
+for non-ASCII) and datetimes rendered like pydantic does (ISO 8601, UTC as "Z").
+
+Floats are the exception: they are written the way orjson writes them, on
+both paths. Exponents carry no "+" or leading zeros (1e16, 1e-7 where the
+standard library writes 1e+16, 1e-07), values down to 1e-5 stay positional
+(0.00001) and NaN/Infinity become null. The fallback formats floats itself
+so its bytes stay identical to orjson's.
+"""
+import json
+import math
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _float(value: float) -> str:
+    """`value` as orjson writes it (see the module docstring)."""
+    if not math.isfinite(value):
+        return "null"
+    text = repr(value)
+    mantissa, exp, exponent = text.partition("e")
+    if not exp:
+        return text
+    if int(exponent) == -5:
+        sign, digits = ("-", mantissa[1:]) if mantissa.startswith("-") else ("", mantissa)
+        return f"{sign}0.0000{digits.replace('.', '')}"
+    return f"{mantissa}e{int(exponent)}"
+
+
+def _encode(value: Any) -> str:
+    """Fallback encoder: the standard library for everything but floats."""
+    if isinstance(value, float):
+        return _float(value)
+    if isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Dict key must be str, not {type(key).__name__}")
+            items.append(f"{json.dumps(key, ensure_ascii=False)}:{_encode(item)}")
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_encode(item) for item in value) + "]"
+    if value is None or isinstance(value, (str, int)):
+        return json.dumps(value, ensure_ascii=False)
+    return _encode(_default(value))
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize `value` (dicts, lists, str, int, float, None, datetime) to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return _encode(value).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
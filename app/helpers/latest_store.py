@@ -0,0 +1,141 @@
+"""
+Redis store behind mirror_messages_to_redis() and GET /messages/latest.
+
+Two backends (REDIS_LATEST_BACKEND, "list" by default):
+- "stream" (opt-in): every message is XADDed to a global stream plus one stream per
+  device and one per client, each trimmed with `MAXLEN ~ REDIS_MAX_MESSAGES`
+  (approximate trimming only drops whole radix-tree nodes, so it is cheap).
+  A device/client read goes straight to its own stream and costs O(limit)
+  however busy the others are; `after_id` (a stream entry id) returns only
+  the entries added after it.
+- "list": the original capped LIST `latest:messages`; device/client filters
+  scan it (at most REDIS_MAX_MESSAGES entries) and `after_id` is not supported.
+
+Switching to "stream" does not carry the list over: the streams fill from the
+next mirrored message on, and `latest:messages` is no longer read.
+
+Entries are encoded with REDIS_MIRROR_CODEC (see app/helpers/mirror_codec.py)
+and read back as raw bytes, so every codec can be decoded whatever the
+client's decode_responses setting.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+from redis.client import NEVER_DECODE
+
+from app.helpers.mirror_codec import MirrorCodecName, decode_message, encode_message
+
+LatestBackend = Literal["list", "stream"]
+
+LATEST_MESSAGES_KEY = "latest:messages"
+LATEST_STREAM_KEY = "latest:stream"
+DEVICE_STREAM_KEY = "latest:stream:device:{}"
+CLIENT_STREAM_KEY = "latest:stream:client:{}"
+STREAM_FIELD = "data"
+_FIELD_RAW = STREAM_FIELD.encode()
+_RAW = {NEVER_DECODE: True}
+
+_STREAM_ID = re.compile(r"^\d+(-\d+)?$")
+
+
+def stream_keys(message: Dict[str, Any]) -> List[str]:
+    """Streams a message is appended to: global, plus its device's and its client's when it has them."""
+    keys = [LATEST_STREAM_KEY]
+    if message.get("device_id") is not None:
+        keys.append(DEVICE_STREAM_KEY.format(message["device_id"]))
+    if message.get("client_id") is not None:
+        keys.append(CLIENT_STREAM_KEY.format(message["client_id"]))
+    return keys
+
+
+def read_key(device_id: Optional[int], client_id: Optional[int]) -> str:
+    """The narrowest stream holding every entry that matches the filters."""
+    if device_id is not None:
+        return DEVICE_STREAM_KEY.format(device_id)
+    if client_id is not None:
+        return CLIENT_STREAM_KEY.format(client_id)
+    return LATEST_STREAM_KEY
+
+
+def _matches(message: Dict[str, Any], device_id: Optional[int], client_id: Optional[int]) -> bool:
+    return (
+        (device_id is None or str(message.get("device_id")) == str(device_id))
+        and (client_id is None or str(message.get("client_id")) == str(client_id))
+    )
+
+
+def queue_latest(
+    pipe: redis.client.Pipeline,
+    messages: List[dict],
+    *,
+    backend: LatestBackend,
+    max_len: int,
+    codec: MirrorCodecName = "json",
+) -> None:
+    """Queue the writes of a batch of messages on `pipe`."""
+    data = [encode_message(message, codec) for message in messages]
+    if backend == "stream":
+        for message, encoded in zip(messages, data):
+            for key in stream_keys(message):
+                pipe.xadd(key, {STREAM_FIELD: encoded}, maxlen=max_len, approximate=True)
+    else:
+        pipe.lpush(LATEST_MESSAGES_KEY, *data)
+        pipe.ltrim(LATEST_MESSAGES_KEY, 0, max_len - 1)
+
+
+async def push_latest(
+    r: redis.Redis,
+    messages: List[dict],
+    *,
+    backend: LatestBackend,
+    max_len: int,
+    codec: MirrorCodecName = "json",
+) -> None:
+    """Append a batch of messages with one MULTI pipeline."""
+    if not messages:
+        return
+    pipe = r.pipeline(transaction=True)
+    queue_latest(pipe, messages, backend=backend, max_len=max_len, codec=codec)
+    await pipe.execute()
+
+
+async def read_latest(
+    r: redis.Redis,
+    *,
+    backend: LatestBackend,
+    limit: int,
+    device_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    after_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return (messages newest first, stream id of the newest one).
+
+    With `after_id` the `limit` entries right after it are returned (still newest
+    first), so a poller passing back the returned id never skips entries.
+    Raises HTTPException(400) for an `after_id` that is malformed or unsupported by the backend.
+    """
+    if backend == "list":
+        if after_id is not None:
+            raise HTTPException(status_code=400, detail="after_id requires the stream backend")
+        filtered = device_id is not None or client_id is not None
+        raw = await r.execute_command("LRANGE", LATEST_MESSAGES_KEY, 0, -1 if filtered else limit - 1, **_RAW)
+        messages = [m for m in map(decode_message, raw) if _matches(m, device_id, client_id)]
+        return messages[:limit], None
+
+    key = read_key(device_id, client_id)
+    if after_id is not None:
+        if not _STREAM_ID.match(after_id):
+            raise HTTPException(status_code=400, detail="Invalid after_id")
+        entries = await r.execute_command("XRANGE", key, f"({after_id}", "+", "COUNT", limit, **_RAW)
+        entries.reverse()
+    else:
+        entries = await r.execute_command("XREVRANGE", key, "+", "-", "COUNT", limit, **_RAW)
+
+    messages = [decode_message(fields[_FIELD_RAW]) for _, fields in entries]
+    if device_id is not None and client_id is not None:
+        messages = [m for m in messages if _matches(m, None, client_id)]
+    return messages, entries[0][0].decode() if entries else after_id
@@ -0,0 +1,360 @@
+"""Per-bucket statistics of a sensor's numeric readings (GET /messages/aggregate).
+
+Readings are bucketed on `event_time` (device time) into fixed-width buckets
+aligned to the Unix epoch, and each bucket reports count / min / max / avg /
+last over `value_num` (rows without a numeric value are skipped; `last` is
+the reading with the greatest (event_time, id)). The requested range is
+widened to whole buckets, so a bucket's numbers never depend on where a
+query happened to start or stop.
+
+- PostgreSQL: one GROUP BY over date_bin(width, event_time, epoch).
+- Other dialects (SQLite in tests): the rows are read in (event_time, id)
+  order and reduced per bucket with NumPy when it is installed, plain Python
+  otherwise.
+
+With MESSAGES_ROLLUPS_ENABLED, buckets coarser than a minute that are a
+multiple of a rollup width (app/helpers/message_rollups.py) are served from
+the coarsest such rollup table instead, plus the raw messages after the
+rollup watermark. Per-client queries always read `messages` (rollups are
+per device).
+
+Closed buckets (ending at least MESSAGES_AGGREGATE_CLOSE_DELAY seconds ago)
+are memoized in a Redis hash per filter, one field per bucket (empty buckets
+included, so they are not recomputed), stamped with the time they were last
+known current. Late or backlogged readings can still land in a closed bucket,
+so before cached buckets are used, the rows ingested since their stamp are
+checked (a scan of the newest end of the `timestamp` partitions); buckets
+they fall into are recomputed. Only the span from the first uncached bucket
+onwards is queried.
+
+Every query also bounds the partition key: a reading is ingested after it
+happened (up to MESSAGES_AGGREGATE_MAX_CLOCK_SKEW of device clock error), so
+`timestamp >= start - skew` lets PostgreSQL skip older partitions.
+"""
+from __future__ import annotations
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import get_settings
+from app.helpers.fast_json import dumps, loads
+from app.helpers.message_rollups import ROLLUPS, bucket_sql, read_watermark
+from app.helpers.redis_client import get_redis
+from app.models.message_model import Message
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency; the fallback reduces in plain Python
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Bucket = Literal["1m", "5m", "15m", "1h", "6h", "1d"]
+BUCKET_WIDTHS: Dict[str, timedelta] = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "1d": timedelta(days=1),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# (bucket start as epoch seconds, count, min, max, avg, last)
+Stats = Tuple[int, int, float, float, float, float]
+
+
+@dataclass(frozen=True)
+class AggregateFilter:
+    device_id: Optional[int] = None
+    client_id: Optional[int] = None
+    sensor: Optional[str] = None
+
+    def apply(self, stmt: Select) -> Select:
+        stmt = stmt.where(Message.value_num.is_not(None))
+        if self.device_id is not None:
+            stmt = stmt.where(Message.device_id == self.device_id)
+        if self.client_id is not None:
+            stmt = stmt.where(Message.client_id == self.client_id)
+        if self.sensor is not None:
+            stmt = stmt.where(Message.sensor == self.sensor)
+        return stmt
+
+    def cache_key(self, bucket: str) -> str:
+        raw = f"{self.device_id}|{self.client_id}|{self.sensor}|{bucket}"
+        return "messages:agg:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _epoch(ts: datetime) -> float:
+    # SQLite hands back naive datetimes; they are UTC.
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def event_range(start: datetime, end: datetime) -> list:
+    """
+    event_time in [start, end), plus the implied bound on the partition key: a reading
+    is ingested after it happened, give or take MESSAGES_AGGREGATE_MAX_CLOCK_SKEW, so
+    partitions ending before that are pruned.
+    """
+    skew = timedelta(seconds=get_settings().MESSAGES_AGGREGATE_MAX_CLOCK_SKEW)
+    return [Message.event_time >= start, Message.event_time < end, Message.timestamp >= start - skew]
+
+
+def bucket_range(since: datetime, until: datetime, width: int) -> range:
+    """Epoch starts of the buckets covering [since, until]."""
+    first = int(_epoch(since) // width) * width
+    return range(first, int(_epoch(until) // width) * width + 1, width)
+
+
+def reduce_series(times: Sequence[float], values: Sequence[float], width: int) -> List[Stats]:
+    """
+    Per-bucket stats of readings sorted by (time, id); `times` are epoch seconds.
+    Vectorized with NumPy when available.
+    """
+    if not len(times):
+        return []
+    if np is None:
+        stats = []
+        for start, group in groupby(zip(times, values), key=lambda tv: int(tv[0] // width) * width):
+            v = [value for _, value in group]
+            stats.append((start, len(v), min(v), max(v), sum(v) / len(v), v[-1]))
+        return stats
+
+    t = np.asarray(times, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64)
+    buckets = (t // width).astype(np.int64) * width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(v)]
+    counts = ends - starts
+    sums = np.add.reduceat(v, starts)
+    return list(zip(
+        buckets[starts].tolist(),
+        counts.tolist(),
+        np.minimum.reduceat(v, starts).tolist(),
+        np.maximum.reduceat(v, starts).tolist(),
+        (sums / counts).tolist(),
+        v[ends - 1].tolist(),
+    ))
+
+
+async def _query_pg(db: AsyncSession, where: AggregateFilter, start: datetime, end: datetime, width: timedelta) -> List[Stats]:
+    bucket = bucket_sql(Message.event_time, int(width.total_seconds())).label("bucket")
+    last = array_agg(aggregate_order_by(Message.value_num, Message.event_time.desc(), Message.id.desc()))[1]
+    stmt = where.apply(
+        select(
+            bucket,
+            func.count(Message.value_num),
+            func.min(Message.value_num),
+            func.max(Message.value_num),
+            func.avg(Message.value_num),
+            last,
+        ).where(*event_range(start, end))
+    ).group_by(bucket).order_by(bucket)
+    rows = (await db.execute(stmt)).all()
+    return [(int(_epoch(b)), n, lo, hi, float(avg), last_value) for b, n, lo, hi, avg, last_value in rows]
+
+
+async def _query_rows(db: AsyncSession, where: AggregateFilter, start: datetime, end: datetime, width: timedelta) -> List[Stats]:
+    stmt = where.apply(
+        select(Message.event_time, Message.value_num)
+        .where(*event_range(start, end))
+    ).order_by(Message.event_time, Message.id)
+    rows = (await db.execute(stmt)).all()
+    return reduce_series([_epoch(ts) for ts, _ in rows], [v for _, v in rows], int(width.total_seconds()))
+
+
+def _merge(partials: Dict[int, list], start: int, count: int, total: float, lo: float, hi: float, last: float, last_key: tuple) -> None:
+    """Fold partial stats into a bucket: [count, sum, min, max, last, (last event time, last id)]."""
+    p = partials.get(start)
+    if p is None:
+        partials[start] = [count, total, lo, hi, last, last_key]
+        return
+    p[0] += count
+    p[1] += total
+    p[2] = min(p[2], lo)
+    p[3] = max(p[3], hi)
+    if last_key > p[5]:
+        p[4], p[5] = last, last_key
+
+
+def _rollup_for(where: AggregateFilter, seconds: int):
+    """The coarsest rollup table whose width divides `seconds`, if this query may use one."""
+    if not get_settings().MESSAGES_ROLLUPS_ENABLED or where.client_id is not None or seconds <= ROLLUPS[0][1]:
+        return None
+    usable = [table for table, width in ROLLUPS if seconds % width == 0]
+    return usable[-1] if usable else None
+
+
+async def _query_rollups(db: AsyncSession, table, where: AggregateFilter, start: datetime, end: datetime, width: timedelta) -> List[Stats]:
+    seconds = int(width.total_seconds())
+    watermark = await read_watermark(db)
+    conditions = [table.bucket_start >= start, table.bucket_start < end]
+    if where.device_id is not None:
+        conditions.append(table.device_id == where.device_id)
+    if where.sensor is not None:
+        conditions.append(table.sensor == where.sensor)
+
+    partials: Dict[int, list] = {}
+    latest = (table.last_event_time.desc(), table.last_id.desc())
+    if db.get_bind().dialect.name == "postgresql":
+        bucket = bucket_sql(table.bucket_start, seconds)
+        rows = await db.execute(
+            select(
+                bucket,
+                func.sum(table.count),
+                func.sum(table.sum),
+                func.min(table.min),
+                func.max(table.max),
+                array_agg(aggregate_order_by(table.last_value, *latest))[1],
+                func.max(table.last_event_time),
+                array_agg(aggregate_order_by(table.last_id, *latest))[1],
+            ).where(*conditions).group_by(bucket)
+        )
+    else:
+        rows = await db.execute(
+            select(
+                table.bucket_start, table.count, table.sum, table.min, table.max,
+                table.last_value, table.last_event_time, table.last_id,
+            ).where(*conditions)
+        )
+    for b, n, total, lo, hi, last, last_time, last_id in rows:
+        start_epoch = int(_epoch(b) // seconds) * seconds
+        _merge(partials, start_epoch, int(n), total, lo, hi, last, (_epoch(last_time), last_id))
+
+    # Readings ingested after the last refresh are not rolled up yet.
+    tail = await db.execute(where.apply(
+        select(Message.event_time, Message.id, Message.value_num)
+        .where(Message.id > watermark, *event_range(start, end))
+    ))
+    for ts, message_id, value in tail:
+        t = _epoch(ts)
+        _merge(partials, int(t // seconds) * seconds, 1, value, value, value, value, (t, message_id))
+
+    return [(s, n, lo, hi, total / n, last) for s, (n, total, lo, hi, last, _) in sorted(partials.items())]
+
+
+async def compute_buckets(db: AsyncSession, where: AggregateFilter, start: datetime, end: datetime, width: timedelta) -> List[Stats]:
+    """Stats of the non-empty buckets in [start, end), both bucket-aligned."""
+    table = _rollup_for(where, int(width.total_seconds()))
+    if table is not None:
+        return await _query_rollups(db, table, where, start, end, width)
+    if db.get_bind().dialect.name == "postgresql":
+        return await _query_pg(db, where, start, end, width)
+    return await _query_rows(db, where, start, end, width)
+
+
+async def _cached(key: str, starts: Sequence[int]) -> Dict[int, Tuple[float, Optional[Stats]]]:
+    """
+    Cached closed buckets: start -> (as_of, stats), stats None for a cached empty bucket.
+    `as_of` is the (epoch) time the bucket was computed or last found current.
+    """
+    if not starts:
+        return {}
+    try:
+        r = await get_redis()
+        raw = await r.hmget(key, [str(s) for s in starts])
+    except Exception:
+        logger.warning("Redis unavailable for cached aggregates; computing every bucket.", exc_info=True)
+        return {}
+    cached = {}
+    for s, v in zip(starts, raw):
+        entry = loads(v) if v is not None else ()
+        if len(entry) in (1, 7):
+            cached[s] = (entry[0], tuple(entry[1:]) or None)
+    return cached
+
+
+async def _late_buckets(
+    db: AsyncSession,
+    where: AggregateFilter,
+    cached: Dict[int, Tuple[float, Optional[Stats]]],
+    seconds: int,
+) -> set:
+    """
+    Cached buckets that a reading ingested after their `as_of` falls into. Only
+    the recent end of the partition key is read, so this is cheap; the close delay
+    also covers inserts still in flight when a bucket was computed.
+    """
+    if not cached:
+        return set()
+    grace = get_settings().MESSAGES_AGGREGATE_CLOSE_DELAY
+    ingested_after = EPOCH + timedelta(seconds=min(as_of for as_of, _ in cached.values()) - grace)
+    first, last = min(cached), max(cached)
+    rows = await db.execute(where.apply(
+        select(Message.event_time, Message.timestamp).where(
+            Message.timestamp > ingested_after,
+            Message.event_time >= EPOCH + timedelta(seconds=first),
+            Message.event_time < EPOCH + timedelta(seconds=last + seconds),
+        )
+    ))
+    late = set()
+    for event_time, ingested in rows:
+        start = int(_epoch(event_time) // seconds) * seconds
+        if start in cached and _epoch(ingested) > cached[start][0] - grace:
+            late.add(start)
+    return late
+
+
+async def _store(key: str, closed: Dict[int, Optional[Stats]], as_of: float) -> None:
+    if not closed:
+        return
+    try:
+        r = await get_redis()
+        await r.hset(key, mapping={str(s): dumps([as_of, *(stats or ())]) for s, stats in closed.items()})
+        await r.expire(key, get_settings().MESSAGES_AGGREGATE_CACHE_TTL)
+    except Exception:
+        logger.warning("Could not cache aggregates in Redis.", exc_info=True)
+
+
+async def aggregate(
+    db: AsyncSession,
+    where: AggregateFilter,
+    *,
+    since: datetime,
+    until: datetime,
+    bucket: Bucket,
+    now: Optional[datetime] = None,
+) -> Tuple[List[Stats], int]:
+    """Stats of the non-empty buckets covering [since, until], and how many came from the cache."""
+    settings = get_settings()
+    width = BUCKET_WIDTHS[bucket]
+    seconds = int(width.total_seconds())
+    starts = bucket_range(since, until, seconds)
+    if len(starts) > settings.MESSAGES_AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans {len(starts)} buckets; at most {settings.MESSAGES_AGGREGATE_MAX_BUCKETS} allowed",
+        )
+    if not starts:
+        return [], 0
+
+    as_of = _epoch(now or datetime.now(timezone.utc))
+    closed_before = as_of - settings.MESSAGES_AGGREGATE_CLOSE_DELAY
+    closed = [s for s in starts if s + seconds <= closed_before]
+    key = where.cache_key(bucket)
+    cached = await _cached(key, closed)
+    for s in await _late_buckets(db, where, cached, seconds):
+        del cached[s]
+
+    stats: Dict[int, Optional[Stats]] = {s: entry for s, (_, entry) in cached.items()}
+    missing = [s for s in starts if s not in cached]
+    if missing:
+        # One query from the first uncached bucket to the end of the range.
+        first = EPOCH + timedelta(seconds=missing[0])
+        end = EPOCH + timedelta(seconds=starts[-1] + seconds)
+        computed = {row[0]: row for row in await compute_buckets(db, where, first, end, width)}
+        stats.update((s, computed.get(s)) for s in missing)
+    # Recomputed buckets, and the cached ones just found current, are valid as of now.
+    await _store(key, {s: stats.get(s) for s in closed}, as_of)
+
+    from_cache = sum(1 for _, s in cached.values() if s is not None)
+    return [stats[s] for s in starts if stats.get(s) is not None], from_cache
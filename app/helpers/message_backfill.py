@@ -0,0 +1,95 @@
+"""Backfill of the typed `messages` columns (value_num, event_time).
+
+Rows written before the alembic revision c4d8e2a6f913 have both columns NULL.
+backfill_columns() walks the table in id ranges of `batch_size` and fills
+them, committing after every range, so no long transaction or table-wide lock
+is held and an interrupted run simply resumes (only rows with event_time IS
+NULL are touched).
+
+- value_num: `value` when it matches NUMBER_PATTERN and fits a double (the
+  same rule as parse_number at ingest), else NULL;
+- event_time: the ingest `timestamp`; the device time of legacy rows was
+  never stored.
+
+On PostgreSQL each range is one UPDATE; elsewhere (SQLite in tests) the rows
+are read and updated by primary key with the values computed in Python.
+"""
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.messageSummary import NUMBER_MAX, NUMBER_MIN, NUMBER_PATTERN, parse_number
+from app.models.message_model import Message
+
+logger = logging.getLogger(__name__)
+
+# Nested CASE: the cast is only evaluated for values that matched the pattern.
+_PG_BACKFILL = text(
+    "UPDATE messages SET "
+    "value_num = CASE WHEN value ~ :pattern THEN "
+    "  CASE WHEN value::numeric = 0 OR (abs(value::numeric) > :num_min AND abs(value::numeric) < :num_max) "
+    "  THEN value::double precision END "
+    "END, "
+    "event_time = timestamp "
+    "WHERE id >= :lo AND id < :hi AND event_time IS NULL"
+)
+
+
+@dataclass
+class BackfillReport:
+    batches: int = 0
+    updated: int = 0
+    last_id: Optional[int] = None
+
+
+async def _backfill_range_pg(conn: AsyncConnection, lo: int, hi: int) -> int:
+    result = await conn.execute(
+        _PG_BACKFILL,
+        {"pattern": NUMBER_PATTERN, "num_min": NUMBER_MIN, "num_max": NUMBER_MAX, "lo": lo, "hi": hi},
+    )
+    return result.rowcount
+
+
+async def _backfill_range(conn: AsyncConnection, lo: int, hi: int) -> int:
+    rows = (await conn.execute(
+        select(Message.id, Message.value, Message.timestamp)
+        .where(Message.id >= lo, Message.id < hi, Message.event_time.is_(None))
+    )).all()
+    if rows:
+        await conn.execute(
+            update(Message.__table__)
+            .where(Message.__table__.c.id == bindparam("b_id"))
+            .values(value_num=bindparam("b_value_num"), event_time=bindparam("b_event_time")),
+            [{"b_id": id_, "b_value_num": parse_number(value), "b_event_time": ts} for id_, value, ts in rows],
+        )
+    return len(rows)
+
+
+async def backfill_columns(
+    conn: AsyncConnection,
+    *,
+    batch_size: int,
+    max_batches: Optional[int] = None,
+) -> BackfillReport:
+    """Fill value_num/event_time of legacy rows, `batch_size` ids per committed batch."""
+    low, high = (await conn.execute(select(func.min(Message.id), func.max(Message.id)))).one()
+    await conn.commit()
+    report = BackfillReport()
+    if low is None:
+        return report
+
+    backfill_range = _backfill_range_pg if conn.dialect.name == "postgresql" else _backfill_range
+    lo = low
+    while lo <= high and (max_batches is None or report.batches < max_batches):
+        hi = lo + batch_size
+        report.updated += await backfill_range(conn, lo, hi)
+        await conn.commit()
+        report.batches += 1
+        report.last_id = min(hi, high + 1) - 1
+        lo = hi
+    logger.info("Backfilled %d messages in %d batches (through id %s)", report.updated, report.batches, report.last_id)
+    return report
@@ -0,0 +1,79 @@
+"""Streaming NDJSON/CSV encoders for GET /messages/export.
+
+Rows come from `AsyncSession.stream_scalars` with `yield_per`, so only one
+chunk of ORM objects is alive at a time; each chunk is encoded into one
+piece of the response body (and optionally fed through a streaming gzip
+compressor) before the next one is fetched.
+"""
+from __future__ import annotations
+import csv
+import io
+import logging
+import zlib
+from typing import AsyncIterator, Dict, Iterable, Literal, Tuple
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.models.message_model import Message
+from app.models.message_schema import MessageResponse
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# format -> (media type, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+EXPORT_CHUNK_ROWS = 1000
+CSV_COLUMNS = list(MessageResponse.model_fields)
+
+
+def _ndjson_chunk(rows: Iterable[Message]) -> bytes:
+    return b"".join(MessageResponse.model_validate(m).model_dump_json().encode() + b"\n" for m in rows)
+
+
+def _csv_chunk(rows: Iterable[Message], header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for m in rows:
+        data = MessageResponse.model_validate(m).model_dump(mode="json")
+        writer.writerow([data[c] for c in CSV_COLUMNS])
+    return buf.getvalue().encode()
+
+
+async def export_stream(
+    engine: AsyncEngine,
+    stmt: Select,
+    fmt: ExportFormat,
+    *,
+    compress: bool = False,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded (and optionally gzipped) body of `stmt`'s rows, one chunk at a time."""
+    gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    first = True
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        try:
+            result = await session.stream_scalars(stmt.execution_options(yield_per=chunk_rows))
+            async for partition in result.partitions():
+                body = _ndjson_chunk(partition) if fmt == "ndjson" else _csv_chunk(partition, header=first)
+                first = False
+                session.expunge_all()
+                if gz is not None:
+                    body = gz.compress(body)
+                if body:
+                    yield body
+            if first and fmt == "csv":
+                body = _csv_chunk([], header=True)
+                yield gz.compress(body) if gz is not None else body
+            if gz is not None:
+                yield gz.flush()
+        except Exception:
+            # Headers are already sent; the truncated body is all the client will see.
+            logger.exception("Message export failed mid-stream.")
+            raise
@@ -1,22 +1,66 @@
+from datetime import datetime, timezone
+from typing import Iterable, List
+from sqlalchemy import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.message_model import Message
 
+CONSUMER_PAYLOAD = "saved from consumer"
+
+def _message_values(summary) -> dict:
+    """Column values of the `messages` row for one MessageSummary."""
+    return {
+        "device_id": int(summary.device_id),
+        "client_id": int(summary.client_id),
+        "sensor": summary.sensor or None,
+        "value": summary.value or None,
+        "unit": summary.unit or None,
+        "payload": CONSUMER_PAYLOAD,
+        "value_num": summary.value_num,
+        # ingest time when the device sent none: NULL is left to rows the backfill has not reached
+        "event_time": summary.event_time or datetime.now(timezone.utc),
+    }
+
 async def save_message(
     session: AsyncSession,
     *,
     summary,
-) -> Message:
-    """  Save a message into the database. """
-    msg = Message(
-        device_id=int(summary.device_id),
-        client_id=int(summary.client_id),
-        sensor=summary.sensor or None,
-        value=summary.value or None,
-        unit=summary.unit or None,
-        payload="saved from consumer"
+    commit: bool = True,
+) -> Row:
+    """
+    Save a message into the database.
+
+    The generated `id` and server `timestamp` come back from the INSERT itself
+    (RETURNING), so there is no separate refresh. With commit=False the caller
+    owns the transaction, e.g. when persisting a whole SQS batch at once.
+    """
+    result = await session.execute(
+        insert(Message).values(**_message_values(summary)).returning(Message.id, Message.timestamp)
+    )
+    saved = result.one()
+    if commit:
+        await session.commit()
+    return saved
+
+async def save_messages(
+    session: AsyncSession,
+    summaries: Iterable,
+    *,
+    commit: bool = True,
+) -> List[Row]:
+    """
+    Save many messages with one multi-row INSERT ... RETURNING.
 
+    Returns one (id, timestamp) row per summary, in the order given.
+    """
+    values = [_message_values(summary) for summary in summaries]
+    if not values:
+        return []
+    result = await session.execute(
+        insert(Message).returning(Message.id, Message.timestamp, sort_by_parameter_order=True),
+        values,
     )
-    session.add(msg)
-    await session.commit()
-    await session.refresh(msg)
-    return msg
+    saved = result.all()
+    if commit:
+        await session.commit()
+    return saved
@@ -0,0 +1,168 @@
+"""Keyset (cursor) pagination helpers for the `messages` table.
+
+Pages are ordered by `(timestamp, id)`; `id` breaks ties between rows that
+share a timestamp, so no row is skipped or repeated across pages. A cursor is
+the opaque, URL-safe encoding of the last `(timestamp, id)` a client has seen,
+and the next page is found with the row-value predicate
+`(timestamp, id) > (:ts, :id)`, which PostgreSQL answers with an index seek
+instead of walking and discarding OFFSET rows.
+
+`total` is the other expensive part of a page, so it is computed per the
+requested TotalMode: exact COUNT(*), the planner's row estimate, an exact
+count memoized in Redis for a short TTL, or not at all.
+"""
+from __future__ import annotations
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Literal, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.config.settings import get_settings
+from app.helpers.redis_client import get_redis
+from app.models.message_model import Message
+
+logger = logging.getLogger(__name__)
+
+TotalMode = Literal["exact", "estimated", "cached", "none"]
+
+_SEPARATOR = "|"
+
+
+def encode_cursor(timestamp: datetime, message_id: int) -> str:
+    """Opaque cursor pointing just after the row (timestamp, message_id)."""
+    raw = f"{timestamp.isoformat()}{_SEPARATOR}{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; a malformed cursor is a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, message_id = raw.rsplit(_SEPARATOR, 1)
+        return datetime.fromisoformat(ts), int(message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def apply_filters(
+    stmt: Select,
+    *,
+    since: datetime,
+    until: Optional[datetime] = None,
+    device_id: Optional[int] = None,
+    event_since: Optional[datetime] = None,
+    event_until: Optional[datetime] = None,
+    value_min: Optional[float] = None,
+    value_max: Optional[float] = None,
+) -> Select:
+    """
+    The /messages filters: timestamp in (since, until], optionally one device, event_time in
+    (event_since, event_until] and value_num in [value_min, value_max]. The typed columns are
+    compared directly (no casts), so the event_time/value_num predicates stay indexable.
+    """
+    stmt = stmt.where(Message.timestamp > since)
+    if until is not None:
+        stmt = stmt.where(Message.timestamp <= until)
+    if device_id is not None:
+        stmt = stmt.where(Message.device_id == device_id)
+    if event_since is not None:
+        stmt = stmt.where(Message.event_time > event_since)
+    if event_until is not None:
+        stmt = stmt.where(Message.event_time <= event_until)
+    if value_min is not None:
+        stmt = stmt.where(Message.value_num >= value_min)
+    if value_max is not None:
+        stmt = stmt.where(Message.value_num <= value_max)
+    return stmt
+
+
+def keyset_order(stmt: Select) -> Select:
+    """Stable page order: timestamp, then id."""
+    return stmt.order_by(Message.timestamp.asc(), Message.id.asc())
+
+
+def after_cursor(stmt: Select, cursor: str) -> Select:
+    """
+    Restrict `stmt` to the rows that come after `cursor`.
+
+    The plain `timestamp >= ts` is implied by the row comparison but, unlike it,
+    lets PostgreSQL prune the partitions before the cursor.
+    """
+    ts, message_id = decode_cursor(cursor)
+    return stmt.where(
+        Message.timestamp >= ts,
+        tuple_(Message.timestamp, Message.id) > tuple_(ts, message_id),
+    )
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <stmt>, with the statement's bind parameters kept as binds."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt: Select) -> None:
+        self.stmt = stmt
+
+
+@compiles(_Explain)
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+async def exact_count(db: AsyncSession, stmt: Select) -> int:
+    """COUNT(*) over the filtered statement."""
+    result = await db.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    return result.scalar_one()
+
+
+async def estimated_count(db: AsyncSession, stmt: Select) -> int:
+    """
+    The planner's row estimate for `stmt` (PostgreSQL); it comes from pg_class /
+    pg_statistic and costs no scan. Other dialects have no usable estimate and
+    fall back to an exact count.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return await exact_count(db, stmt)
+    plan = (await db.execute(_Explain(stmt.order_by(None)))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def cached_count(db: AsyncSession, stmt: Select, filter_key: str) -> int:
+    """Exact count memoized in Redis per filter for MESSAGES_TOTAL_CACHE_TTL seconds."""
+    key = "messages:total:" + hashlib.sha1(filter_key.encode()).hexdigest()
+    try:
+        r = await get_redis()
+        cached = await r.get(key)
+        if cached is not None:
+            return int(cached)
+    except Exception:
+        logger.warning("Redis unavailable for cached totals; counting exactly.", exc_info=True)
+        return await exact_count(db, stmt)
+
+    total = await exact_count(db, stmt)
+    try:
+        await r.set(key, total, ex=get_settings().MESSAGES_TOTAL_CACHE_TTL)
+    except Exception:
+        logger.warning("Could not cache messages total in Redis.", exc_info=True)
+    return total
+
+
+async def count_total(db: AsyncSession, stmt: Select, mode: TotalMode, filter_key: str) -> Optional[int]:
+    """`total` for a page, computed the way `mode` asks for (None for "none")."""
+    if mode == "none":
+        return None
+    if mode == "estimated":
+        return await estimated_count(db, stmt)
+    if mode == "cached":
+        return await cached_count(db, stmt, filter_key)
+    return await exact_count(db, stmt)
@@ -0,0 +1,227 @@
+"""Per-minute and per-hour rollups of numeric readings (message_rollups_1m / _1h).
+
+Each rollup row holds count / sum / min / max / last of `value_num` for one
+(device_id, sensor, bucket_start), bucketed on `event_time`. Rows without a
+numeric value or an event time are not rolled up.
+
+- refresh_rollups() folds the messages after a watermark (the highest id
+  already rolled up) into both tables with one upsert per table, and moves
+  the watermark. Only ids up to the newest row ingested at least
+  `settle_seconds` ago are taken, so transactions still in flight below that
+  id are not skipped; nor does it pass a legacy row the value_num/event_time
+  backfill (app/helpers/message_backfill.py) has not filled yet, so those
+  rows are rolled up once they are. Run by the `refresh_message_rollups`
+  beat task.
+- rebuild_rollups() recomputes the buckets of a range from `messages`
+  (everything up to the watermark), e.g. after late data or a manual fix.
+  Run on demand by the `reconcile_message_rollups` task.
+
+Both hold the watermark row lock, so they never interleave. On PostgreSQL the
+buckets are computed in SQL (INSERT ... SELECT ... ON CONFLICT); elsewhere
+(SQLite in tests) in Python, with the same upsert.
+"""
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import case, delete, func, literal_column, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.message_model import Message
+from app.models.message_rollup_model import MessageRollupHour, MessageRollupMinute, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "messages"
+
+# (table, bucket width in seconds), finest first
+ROLLUPS: Sequence[Tuple[Type, int]] = ((MessageRollupMinute, 60), (MessageRollupHour, 3600))
+
+_COLUMNS = ["device_id", "sensor", "bucket_start", "count", "sum", "min", "max", "last_value", "last_event_time", "last_id"]
+
+
+@dataclass
+class RollupReport:
+    from_id: int = 0
+    to_id: int = 0
+    buckets: int = 0
+
+
+def bucket_sql(column, seconds: int):
+    """date_bin over the Unix epoch; literals only, so the expression groups by itself."""
+    return func.date_bin(literal_column(f"interval '{seconds} seconds'"), column, literal_column("timestamptz 'epoch'"))
+
+
+def _aware(ts: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are UTC.
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _floor(ts: datetime, seconds: int) -> datetime:
+    epoch = int(_aware(ts).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, timezone.utc)
+
+
+def _upsert(conn: AsyncConnection, table):
+    """INSERT into a rollup table that merges into an existing bucket instead of failing."""
+    pg = conn.dialect.name == "postgresql"
+    stmt = (postgresql.insert if pg else sqlite.insert)(table)
+    least, greatest = (func.least, func.greatest) if pg else (func.min, func.max)
+    t, new = table.__table__.c, stmt.excluded
+    newer = tuple_(new.last_event_time, new.last_id) > tuple_(t.last_event_time, t.last_id)
+    return stmt, {
+        "count": t.count + new.count,
+        "sum": t.sum + new.sum,
+        "min": least(t.min, new.min),
+        "max": greatest(t.max, new.max),
+        "last_value": case((newer, new.last_value), else_=t.last_value),
+        "last_event_time": case((newer, new.last_event_time), else_=t.last_event_time),
+        "last_id": case((newer, new.last_id), else_=t.last_id),
+    }
+
+
+def _fold_in_python(rows, seconds: int) -> List[Dict[str, Any]]:
+    """Rollup rows of (device_id, sensor, event_time, id, value_num) sorted by (event_time, id)."""
+    buckets: Dict[tuple, Dict[str, Any]] = {}
+    for device_id, sensor, event_time, message_id, value in rows:
+        start = _floor(event_time, seconds)
+        b = buckets.get((device_id, sensor, start))
+        if b is None:
+            buckets[(device_id, sensor, start)] = dict(
+                device_id=device_id, sensor=sensor, bucket_start=start, count=1, sum=value, min=value, max=value,
+                last_value=value, last_event_time=event_time, last_id=message_id,
+            )
+            continue
+        b["count"] += 1
+        b["sum"] += value
+        b["min"] = min(b["min"], value)
+        b["max"] = max(b["max"], value)
+        b.update(last_value=value, last_event_time=event_time, last_id=message_id)
+    return list(buckets.values())
+
+
+async def _fold(conn: AsyncConnection, table, seconds: int, conditions: list) -> int:
+    """Upsert the rollup buckets of the messages matching `conditions`; returns the buckets written."""
+    conditions = [*conditions, Message.value_num.is_not(None), Message.event_time.is_not(None)]
+    sensor = func.coalesce(Message.sensor, "")
+    stmt, merge = _upsert(conn, table)
+
+    if conn.dialect.name == "postgresql":
+        bucket = bucket_sql(Message.event_time, seconds)
+        latest = (Message.event_time.desc(), Message.id.desc())
+        source = (
+            select(
+                Message.device_id,
+                sensor,
+                bucket,
+                func.count(),
+                func.sum(Message.value_num),
+                func.min(Message.value_num),
+                func.max(Message.value_num),
+                postgresql.array_agg(postgresql.aggregate_order_by(Message.value_num, *latest))[1],
+                func.max(Message.event_time),
+                postgresql.array_agg(postgresql.aggregate_order_by(Message.id, *latest))[1],
+            )
+            .where(*conditions)
+            .group_by(Message.device_id, sensor, bucket)
+        )
+        result = await conn.execute(stmt.from_select(_COLUMNS, source).on_conflict_do_update(
+            index_elements=["device_id", "sensor", "bucket_start"], set_=merge,
+        ))
+        return result.rowcount
+
+    rows = (await conn.execute(
+        select(Message.device_id, sensor, Message.event_time, Message.id, Message.value_num)
+        .where(*conditions)
+        .order_by(Message.event_time, Message.id)
+    )).all()
+    values = _fold_in_python(rows, seconds)
+    if values:
+        await conn.execute(
+            stmt.on_conflict_do_update(index_elements=["device_id", "sensor", "bucket_start"], set_=merge),
+            values,
+        )
+    return len(values)
+
+
+async def read_watermark(conn) -> int:
+    """Highest messages.id already rolled up (0 before the first refresh); works on sessions too."""
+    result = await conn.execute(select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK))
+    return result.scalar() or 0
+
+
+async def _lock_watermark(conn: AsyncConnection) -> int:
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    await conn.execute(insert(RollupWatermark).values(name=WATERMARK, last_id=0).on_conflict_do_nothing())
+    result = await conn.execute(
+        select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK).with_for_update()
+    )
+    return result.scalar_one()
+
+
+async def refresh_rollups(
+    conn: AsyncConnection,
+    *,
+    batch_size: int,
+    settle_seconds: int,
+    now: Optional[datetime] = None,
+) -> RollupReport:
+    """Fold up to `batch_size` messages after the watermark into every rollup table."""
+    low = await _lock_watermark(conn)
+    settled = (now or datetime.now(timezone.utc)) - timedelta(seconds=settle_seconds)
+    ids = (
+        select(Message.id)
+        .where(Message.id > low, Message.timestamp <= settled)
+        .order_by(Message.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    high = (await conn.execute(select(func.max(ids.c.id)))).scalar()
+    report = RollupReport(from_id=low, to_id=low)
+    if high is None:
+        return report
+    unfilled = (await conn.execute(
+        select(func.min(Message.id)).where(Message.id > low, Message.id <= high, Message.event_time.is_(None))
+    )).scalar()
+    if unfilled is not None:
+        logger.info("Rollups wait for the backfill: message %d has no event_time yet", unfilled)
+        high = unfilled - 1
+        if high <= low:
+            return report
+
+    for table, seconds in ROLLUPS:
+        report.buckets += await _fold(conn, table, seconds, [Message.id > low, Message.id <= high])
+    await conn.execute(update(RollupWatermark).where(RollupWatermark.name == WATERMARK).values(last_id=high))
+    report.to_id = high
+    logger.info("Rolled up messages (%d, %d] into %d buckets", low, high, report.buckets)
+    return report
+
+
+async def rebuild_rollups(
+    conn: AsyncConnection,
+    *,
+    since: datetime,
+    until: datetime,
+    device_id: Optional[int] = None,
+    sensor: Optional[str] = None,
+) -> Dict[str, int]:
+    """Recompute every rollup bucket overlapping [since, until] from `messages`; returns buckets per table."""
+    watermark = await _lock_watermark(conn)
+    rebuilt = {}
+    for table, seconds in ROLLUPS:
+        start, end = _floor(since, seconds), _floor(until, seconds) + timedelta(seconds=seconds)
+        stale = [table.bucket_start >= start, table.bucket_start < end]
+        source = [Message.id <= watermark, Message.event_time >= start, Message.event_time < end]
+        if device_id is not None:
+            stale.append(table.device_id == device_id)
+            source.append(Message.device_id == device_id)
+        if sensor is not None:
+            stale.append(table.sensor == sensor)
+            source.append(func.coalesce(Message.sensor, "") == sensor)
+        await conn.execute(delete(table).where(*stale))
+        rebuilt[table.__tablename__] = await _fold(conn, table, seconds, source)
+    logger.info("Rebuilt rollups for [%s, %s] device=%s sensor=%s: %s", since, until, device_id, sensor, rebuilt)
+    return rebuilt
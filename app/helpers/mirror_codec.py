@@ -0,0 +1,88 @@
+"""
+Encodings of the messages mirrored to Redis (REDIS_MIRROR_CODEC).
+
+- "json": a JSON object per entry, field names included. This is the legacy
+  format and has no version byte; it is recognised by its leading "{".
+- "tuple": version byte 0x02 + a JSON array of the values in MIRROR_FIELDS
+  order, with ids stored as integers.
+- "msgpack": version byte 0x01 + a MessagePack array in the same order.
+  Requires the optional `msgpack` package.
+
+decode_message() sniffs the first byte, so readers handle every format.
+During a rolling deploy, ship the readers first and switch the writers'
+codec afterwards; a list or stream may hold a mix of formats until old
+entries are trimmed.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Literal, Tuple, Union
+
+from app.helpers.fast_json import dumps, loads
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+MirrorCodecName = Literal["json", "tuple", "msgpack"]
+
+VERSION_MSGPACK = 0x01
+VERSION_TUPLE = 0x02
+
+# Value order of the versioned encodings; the ids are stored as integers.
+MIRROR_FIELDS: Tuple[str, ...] = (
+    "id", "message_id", "device_id", "client_id", "sensor", "value", "unit", "timestamp", "payload",
+)
+_INT_FIELDS = ("id", "device_id", "client_id")
+
+
+def _values(message: Dict[str, Any]) -> list:
+    values = [message.get(name) for name in MIRROR_FIELDS]
+    for i, name in enumerate(MIRROR_FIELDS):
+        if name in _INT_FIELDS and values[i] is not None:
+            values[i] = int(values[i])
+    return values
+
+
+def _encode_json(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def _encode_tuple(message: Dict[str, Any]) -> bytes:
+    return bytes((VERSION_TUPLE,)) + dumps(_values(message))
+
+
+def _encode_msgpack(message: Dict[str, Any]) -> bytes:
+    return bytes((VERSION_MSGPACK,)) + msgpack.packb(_values(message))
+
+
+_ENCODERS: Dict[str, Callable[[Dict[str, Any]], bytes]] = {
+    "json": _encode_json,
+    "tuple": _encode_tuple,
+    "msgpack": _encode_msgpack,
+}
+
+
+def codec_available(name: str) -> bool:
+    return name in _ENCODERS and (name != "msgpack" or msgpack is not None)
+
+
+def encode_message(message: Dict[str, Any], codec: MirrorCodecName = "json") -> bytes:
+    """Encode one mirrored message with `codec`."""
+    if not codec_available(codec):
+        raise ValueError(f"Mirror codec {codec!r} is not available")
+    return _ENCODERS[codec](message)
+
+
+def decode_message(raw: Union[bytes, str]) -> Dict[str, Any]:
+    """Decode an entry written by any codec (legacy JSON or a versioned encoding)."""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    version = raw[0] if raw else None
+    if version == VERSION_TUPLE:
+        return dict(zip(MIRROR_FIELDS, loads(raw[1:])))
+    if version == VERSION_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Entry is MessagePack-encoded but msgpack is not installed")
+        return dict(zip(MIRROR_FIELDS, msgpack.unpackb(raw[1:])))
+    return loads(raw)
@@ -0,0 +1,172 @@
+"""Range partitions of the `messages` table (PostgreSQL).
+
+`messages` is partitioned by `timestamp` (see the alembic revision
+9b2e4c1f7a35). Partitions are named `messages_pYYYY_MM` (monthly) or
+`messages_pYYYY_MM_DD` (daily); rows outside every range land in
+`messages_default`.
+
+- ensure_partitions() creates the current and the next N periods, and a
+  partition for every period that still has rows parked in the default
+  partition, so the default partition is drained instead of growing forever
+  (and its rows become subject to retention). A new partition is built
+  standalone, the default-partition rows for its range are moved into it, and
+  only then is it attached. The parent is locked against inserts for the
+  whole move, so no row can land in the default partition in between and
+  make the ATTACH fail its constraint check.
+- apply_retention() detaches (and, in "drop" mode, drops) partitions that end
+  before the retention cutoff: retention costs a catalog change instead of a
+  huge DELETE.
+
+Both are no-ops when `messages` is not partitioned (e.g. SQLite in tests).
+"""
+from __future__ import annotations
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+PARENT = "messages"
+DEFAULT_PARTITION = "messages_default"
+
+Interval = Literal["day", "month"]
+Partition = Tuple[str, datetime, datetime]
+
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def period_start(ts: datetime, interval: Interval) -> datetime:
+    """Start (UTC) of the period containing `ts`."""
+    ts = ts.astimezone(timezone.utc)
+    if interval == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period(start: datetime, interval: Interval) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: datetime, interval: Interval) -> str:
+    return f"{PARENT}_p{start:%Y_%m_%d}" if interval == "day" else f"{PARENT}_p{start:%Y_%m}"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent)"),
+        {"parent": PARENT},
+    )
+    return result.scalar() is not None
+
+
+async def list_partitions(conn: AsyncConnection) -> List[Partition]:
+    """Range partitions of `messages` as (name, start, end), oldest first; the default partition is left out."""
+    await conn.execute(text("SET LOCAL TimeZone = 'UTC'"))
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": PARENT},
+    )
+    partitions = []
+    for name, bound in result:
+        match = _BOUNDS.search(bound or "")
+        if match is None:
+            continue
+        partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def _create_partition(conn: AsyncConnection, name: str, start: datetime, end: datetime) -> None:
+    """Build the partition standalone, move matching default-partition rows into it, then attach it."""
+    bounds = {"start": start, "end": end}
+    # Blocks inserts (ROW EXCLUSIVE) until the transaction ends; reads go on.
+    await conn.execute(text(f"LOCK TABLE {PARENT} IN SHARE ROW EXCLUSIVE MODE"))
+    await conn.execute(text(f'CREATE TABLE "{name}" (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    await conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            f'INSERT INTO "{name}" SELECT * FROM moved'
+        ),
+        bounds,
+    )
+    # Partition bounds must be literals; both come from period_start/next_period, never from input.
+    await conn.execute(
+        text(
+            f'ALTER TABLE {PARENT} ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    *,
+    interval: Interval,
+    ahead: int,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Create the partitions for the current period and the `ahead` following ones; return the new names."""
+    if not await is_partitioned(conn):
+        return []
+
+    existing = await list_partitions(conn)
+    created = []
+    start = period_start(now or datetime.now(timezone.utc), interval)
+    periods = [start]
+    for _ in range(ahead):
+        periods.append(next_period(periods[-1], interval))
+    periods += [p for p in await _parked_periods(conn, interval) if p not in periods]
+
+    for start in periods:
+        end = next_period(start, interval)
+        # A month created earlier still covers its days after switching to daily partitions.
+        if not any(s < end and start < e for _, s, e in existing):
+            name = partition_name(start, interval)
+            await _create_partition(conn, name, start, end)
+            existing.append((name, start, end))
+            created.append(name)
+            logger.info("Created partition %s [%s, %s)", name, start, end)
+    return created
+
+
+async def _parked_periods(conn: AsyncConnection, interval: Interval) -> List[datetime]:
+    """Starts (UTC) of the periods that have rows in the default partition."""
+    await conn.execute(text("SET LOCAL TimeZone = 'UTC'"))
+    result = await conn.execute(
+        text(f"SELECT DISTINCT date_trunc(:unit, timestamp) FROM {DEFAULT_PARTITION}"),
+        {"unit": interval},
+    )
+    return sorted(period_start(ts, interval) for ts, in result)
+
+
+async def apply_retention(
+    conn: AsyncConnection,
+    *,
+    keep_days: int,
+    mode: Literal["drop", "detach"],
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Detach (and drop, in "drop" mode) every partition that ends before now - keep_days."""
+    if keep_days <= 0 or not await is_partitioned(conn):
+        return []
+
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=keep_days)
+    expired = [name for name, _, end in await list_partitions(conn) if end <= cutoff]
+    for name in expired:
+        await conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{name}"'))
+        if mode == "drop":
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+        logger.info("Retention: %s partition %s (cutoff %s)", "dropped" if mode == "drop" else "detached", name, cutoff)
+    return expired
@@ -1,22 +1,129 @@
-import json
+"""
+Shared async Redis client.
+
+One BlockingConnectionPool per process, created by the FastAPI lifespan
+(`init_redis`) and closed on shutdown (`close_redis`). The SQS consumer and
+the controllers all get the same client from `get_redis()`, so connections
+are reused instead of being opened (and leaked) per message or request.
+"""
+import logging
+import weakref
+from typing import Any, Dict, List, Optional
+
 import redis.asyncio as redis
 from app.config.settings import get_settings
+from app.helpers.device_state import queue_device_state
+from app.helpers.latest_store import queue_latest
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+
+class CountingConnectionPool(redis.BlockingConnectionPool):
+    """
+    BlockingConnectionPool that counts its connections through the public pool
+    methods, so the gauges do not depend on redis-py's private pool state.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.created = 0
+        self._checked_out: "weakref.WeakSet" = weakref.WeakSet()
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self._checked_out.add(connection)
+        return connection
+
+    async def release(self, connection) -> None:
+        self._checked_out.discard(connection)
+        await super().release(connection)
+
+    @property
+    def in_use(self) -> int:
+        return len(self._checked_out)
+
+
+_pool: Optional[CountingConnectionPool] = None
+_client: Optional[redis.Redis] = None
 
-async def get_redis() -> redis.Redis :
+
+def init_redis() -> redis.Redis:
+    """Create the shared pool and client (idempotent)."""
+    global _pool, _client
+    if _client is None:
+        _pool = CountingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _client = redis.Redis(connection_pool=_pool)
+        logger.info(
+            "Redis pool ready (max_connections=%s, health_check_interval=%ss)",
+            settings.REDIS_MAX_CONNECTIONS, settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return _client
+
+
+async def close_redis() -> None:
+    """Close the shared client and disconnect every pooled connection."""
+    global _pool, _client
+    if _client is not None:
+        await _client.aclose()
+        await _pool.disconnect()
+        _pool = _client = None
+        logger.info("Redis pool closed.")
+
+
+async def get_redis() -> redis.Redis:
+    """
+    Return the shared async Redis client (created on first use outside the lifespan)
+    """
+
+    return _client if _client is not None else init_redis()
+
+
+def redis_pool_metrics() -> Optional[Dict[str, Any]]:
+    """Pool gauges, or None before the pool exists."""
+    if _pool is None:
+        return None
+    return {
+        "max_connections": _pool.max_connections,
+        "connections": _pool.created,
+        "in_use": _pool.in_use,
+        "idle": _pool.created - _pool.in_use,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+async def mirror_messages_to_redis(r: redis.Redis, messages: List[dict]) -> None:
     """
-    Create and return an async Redis client using the configured url
+    Push a batch of messages into the latest-message store (REDIS_LATEST_BACKEND,
+    encoded with REDIS_MIRROR_CODEC), capped at REDIS_MAX_MESSAGES per list/stream, and into the per-device state
+    hashes, all in one MULTI pipeline
     """
+    if not messages:
+        return
+    pipe = r.pipeline(transaction=True)
+    queue_latest(
+        pipe, messages,
+        backend=settings.REDIS_LATEST_BACKEND,
+        max_len=settings.REDIS_MAX_MESSAGES,
+        codec=settings.REDIS_MIRROR_CODEC,
+    )
+    await queue_device_state(pipe, messages)
+    await pipe.execute()
 
-    return redis.from_url(settings.REDIS_URL, decode_responses=True)
 
 async def mirror_message_to_redis(r:redis.Redis, message:dict)->None:
     """
     Push a new message into the Redis list and trim it to keep only the last N entries
     """
-    data = json.dumps(message, separators=(",", ":"))
-    pipe = r.pipeline(transaction=True)
-    pipe.lpush("latest:messages", data)
-    pipe.ltrim("latest:messages",0, settings.REDIS_MAX_MESSAGES - 1)
-    await pipe.execute()
\ No newline at end of file
+    await mirror_messages_to_redis(r, [message])
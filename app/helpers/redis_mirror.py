@@ -0,0 +1,102 @@
+"""
+Write-behind buffer for the Redis "latest messages" mirror.
+
+Ingested messages are queued without waiting on Redis; a background task
+coalesces whatever arrived within `max_delay` (or up to `max_batch`
+messages) into one `mirror_messages_to_redis` pipeline, so Redis round trips
+scale with batches instead of messages. The mirror is best effort: a failed
+flush is logged and dropped, exactly like a failed synchronous mirror.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from app.helpers.redis_client import get_redis, mirror_messages_to_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MirrorStats:
+    """Counters for the Redis mirror."""
+    mirrored: int = 0
+    dropped: int = 0
+    flushes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "mirrored": self.mirrored,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "avg_batch_size": round(self.mirrored / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+class RedisMirrorBuffer:
+    """
+    Coalesces mirrored messages into pipelined batches
+    - add() is called on the event loop and never blocks
+    - a background task flushes after max_delay, or at once when max_batch is reached
+    - close() flushes whatever is still pending
+    """
+
+    def __init__(self, *, max_delay: float, max_batch: int) -> None:
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+
+        self._pending: List[dict] = []
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+        self.stats = MirrorStats()
+
+    def start(self) -> None:
+        """Start the background flush loop."""
+        self._task = asyncio.create_task(self._run(), name="redis-mirror")
+
+    def add(self, messages: List[dict]) -> None:
+        """Queue messages for the next pipelined flush."""
+        self._pending.extend(messages)
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def close(self) -> None:
+        """Stop the flush loop and mirror everything still pending."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                logger.exception("Redis mirror loop raised during shutdown.")
+        while self._pending:
+            await self._flush_once()
+
+    async def _run(self) -> None:
+        """Wait for the first message, give the batch max_delay to fill, then flush it."""
+        while not self._closed:
+            if not self._pending:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            if len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.max_delay)
+            await self._flush_once()
+
+    async def _flush_once(self) -> None:
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        try:
+            r = await get_redis()
+            await mirror_messages_to_redis(r, batch)
+        except Exception:
+            self.stats.dropped += len(batch)
+            logger.exception("Redis mirror flush of %d messages failed; dropping them.", len(batch))
+            return
+        self.stats.flushes += 1
+        self.stats.mirrored += len(batch)
@@ -1,5 +1,5 @@
 """Schema for creating a new device."""
-from typing import Optional, Any
+from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, constr, ConfigDict
 from app.enum.status import Status
 
@@ -19,3 +19,21 @@ class DeviceRead(BaseModel):
     status: str
     location: str | None = None
     payload: str| None = None
+
+
+class SensorState(BaseModel):
+    value: str | None = None
+    unit: str | None = None
+    timestamp: str | None = None
+    message_id: str | None = None
+
+
+class DeviceState(BaseModel):
+    """Latest reading per sensor of one device (from Redis)."""
+    device_id: int
+    sensors: Dict[str, SensorState]
+
+
+class DeviceStates(BaseModel):
+    count: int
+    items: List[DeviceState]
@@ -1,12 +1,53 @@
+import re
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional
 from xml.etree import ElementTree as ET
 
 NS = {"x": "urn:example:device-message"}
 
+# Plain decimal / scientific notation; the same pattern backfills `messages.value_num` in SQL.
+NUMBER_PATTERN = r"^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$"
+_NUMBER = re.compile(NUMBER_PATTERN)
+# Magnitudes a double holds without overflow/underflow trouble.
+NUMBER_MAX = Decimal("1e300")
+NUMBER_MIN = Decimal("1e-300")
+
+
+def parse_number(value: Optional[str]) -> Optional[float]:
+    """`value` as a float when it is a plain finite number, else None."""
+    if not value or not _NUMBER.match(value):
+        return None
+    exact = abs(Decimal(value.strip()))
+    if exact and not NUMBER_MIN < exact < NUMBER_MAX:
+        return None
+    return float(value)
+
+# Section -> {qualified child tag -> field}; resolved once, so decoding is dict lookups only.
+_Q = "{%s}%%s" % NS["x"]
+_SECTIONS: Dict[str, Dict[str, str]] = {
+    _Q % "Header": {
+        _Q % "MessageID": "message_id",
+        _Q % "DeviceID": "device_id",
+        _Q % "ClientID": "client_id",
+        _Q % "Timestamp": "timestamp",
+    },
+    _Q % "Body": {
+        _Q % "Sensor": "sensor",
+        _Q % "Value": "value",
+        _Q % "Unit": "unit",
+    },
+}
+
 @dataclass
 class MessageSummary:
-    """Parsed data from an SQS message (id, device, client, sensor, value, unit, timestamp)."""
+    """
+    Parsed data from an SQS message (id, device, client, sensor, value, unit, timestamp).
+
+    `timestamp` is the device time formatted for display; `event_time` is the same
+    instant as an aware datetime (None when the device sent none).
+    """
     message_id: str
     device_id: str
     client_id: str
@@ -14,33 +55,50 @@ class MessageSummary:
     value: str
     unit: str
     timestamp:str
+    event_time: Optional[datetime] = None
+
+    @property
+    def value_num(self) -> Optional[float]:
+        return parse_number(self.value)
 
     @classmethod
     def from_body(cls, body: dict) -> "MessageSummary":
         """Build a response from xml {'xml':..., 'parsed':...}"""
-        xml = body.get("xml", "")
         parsed = body.get("parsed")
         if parsed is None:
-            parsed = ET.fromstring(xml)
+            parsed = ET.fromstring(body.get("xml", ""))
+        return cls.from_element(parsed)
 
-        ts_str = parsed.findtext("x:Header/x:Timestamp", namespaces=NS)
-
-        ts_eu = None
+    @classmethod
+    def from_element(cls, root: ET.Element) -> "MessageSummary":
+        """
+        Extract every Header/Body field in one pass over the children of the two
+        sections (same result as findtext: the first matching element wins,
+        missing ones are None).
+        """
+        values = dict.fromkeys(("message_id", "device_id", "client_id", "sensor", "value", "unit", "timestamp"))
+        for section in root:
+            fields = _SECTIONS.get(section.tag)
+            if fields is None:
+                continue
+            for child in section:
+                name = fields.get(child.tag)
+                if name is not None and values[name] is None:
+                    values[name] = child.text or ""
 
-        if ts_str:
+        return cls.from_fields(**values)
 
-            dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+    @classmethod
+    def from_fields(cls, *, timestamp: str | None, **fields) -> "MessageSummary":
+        """Build a summary from decoded field values; `timestamp` is ISO 8601 (a trailing Z is allowed)."""
+        ts_eu = None
+        dt = None
+        if timestamp:
+            dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
             ts_eu = dt.strftime("%d.%m.%Y %H:%M:%S")
-
-        return cls(
-            message_id=parsed.findtext("x:Header/x:MessageID", namespaces=NS),
-            device_id=parsed.findtext("x:Header/x:DeviceID", namespaces=NS),
-            client_id=parsed.findtext("x:Header/x:ClientID", namespaces=NS),
-            sensor=parsed.findtext("x:Body/x:Sensor", namespaces=NS),
-            value=parsed.findtext("x:Body/x:Value", namespaces=NS),
-            unit=parsed.findtext("x:Body/x:Unit", namespaces=NS),
-            timestamp=ts_eu or "",
-        )
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+        return cls(timestamp=ts_eu or "", event_time=dt, **fields)
 
     def as_dict(self):
         return {
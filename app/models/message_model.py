@@ -1,14 +1,25 @@
 """Represents a message entity in the system."""
 from __future__ import annotations
-from sqlalchemy import DateTime, Text, text, Integer, ForeignKey
+from sqlalchemy import DateTime, Float, Index, Text, text, Integer, ForeignKey
 from app.models.base import Base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # per-device pages: device_id = ? AND (timestamp, id) > (?, ?) ORDER BY timestamp, id
+        Index("ix_messages_device_ts_id", "device_id", "timestamp", "id"),
+        # time-range scans over the whole, time-ordered table
+        Index("ix_messages_timestamp_brin", "timestamp", postgresql_using="brin"),
+        Index("ix_messages_client_id", "client_id"),
+        # the same two shapes over device (event) time
+        Index("ix_messages_device_event_time_id", "device_id", "event_time", "id"),
+        Index("ix_messages_event_time_brin", "event_time", postgresql_using="brin"),
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # the primary key index covers id lookups (the partitioned table's key is (id, timestamp))
+    id: Mapped[int] = mapped_column(primary_key=True)
     device_id: Mapped[int] = mapped_column(
         Integer,
         nullable=False
@@ -26,3 +37,8 @@ class Message(Base):
         server_default=text("CURRENT_TIMESTAMP"),
     )
     payload: Mapped[str] = mapped_column(Text, nullable=False)
+    # `value` as a number when it is one (NULL otherwise)
+    value_num: Mapped[float] = mapped_column(Float, nullable=True)
+    # device time of the reading (the ingest time when the device sent none); `timestamp`
+    # is the ingest time. NULL only on legacy rows not reached by the backfill yet.
+    event_time: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,36 @@
+"""Pre-aggregated numeric readings per (device, sensor, bucket), maintained from `messages`."""
+from __future__ import annotations
+from sqlalchemy import BigInteger, DateTime, Float, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+
+
+class _RollupColumns:
+    # messages.sensor NULL is stored as '' (part of the primary key)
+    device_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sensor: Mapped[str] = mapped_column(Text, primary_key=True)
+    bucket_start: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    sum: Mapped[float] = mapped_column(Float, nullable=False)
+    min: Mapped[float] = mapped_column(Float, nullable=False)
+    max: Mapped[float] = mapped_column(Float, nullable=False)
+    # the reading with the greatest (event_time, id) in the bucket, so rollups merge exactly
+    last_value: Mapped[float] = mapped_column(Float, nullable=False)
+    last_event_time: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class MessageRollupMinute(_RollupColumns, Base):
+    __tablename__ = "message_rollups_1m"
+
+
+class MessageRollupHour(_RollupColumns, Base):
+    __tablename__ = "message_rollups_1h"
+
+
+class RollupWatermark(Base):
+    """Highest messages.id already folded into the rollups."""
+    __tablename__ = "message_rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
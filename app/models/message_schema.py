@@ -7,7 +7,7 @@
 
 """
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 class MessageResponse(BaseModel):
@@ -19,6 +19,8 @@ class MessageResponse(BaseModel):
     unit: str | None
     timestamp: datetime
     payload: str
+    value_num: float | None = None
+    event_time: datetime | None = None
 
     model_config = {
         "from_attributes": True
@@ -26,9 +28,12 @@ class MessageResponse(BaseModel):
 
 
 class PaginatedMessages(BaseModel):
-    total: int
+    total: Optional[int]
+    total_mode: str = "exact"
     limit: int
     offset: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None
     items: List[MessageResponse]
 
 
@@ -48,10 +53,38 @@ class RedisMessageResponse(BaseModel):
 
 
 
+class AggregateBucket(BaseModel):
+    """
+       One bucket of GET /messages/aggregate. The floats are serialized in orjson's
+       format (1e16, 1e-7, 0.00001) rather than json.dumps' (1e+16, 1e-07, 1e-05).
+       """
+    bucket_start: datetime
+    count: int
+    min: float
+    max: float
+    avg: float
+    last: float
+
+
+class SensorAggregates(BaseModel):
+    """
+       Response for GET /messages/aggregate: non-empty buckets, oldest first.
+       """
+    bucket: str
+    since: datetime
+    until: datetime
+    device_id: Optional[int] = None
+    client_id: Optional[int] = None
+    sensor: Optional[str] = None
+    cached: int = 0
+    items: List[AggregateBucket]
+
+
 class LatestMessages(BaseModel):
     """
        Response for GET /messages/latest (reads from Redis, newest-first).
        """
     count: int
     limit: int
+    last_id: Optional[str] = None
     items: List[RedisMessageResponse]
\ No newline at end of file
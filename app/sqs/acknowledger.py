@@ -0,0 +1,161 @@
+"""
+Batched SQS acknowledgement.
+
+Successful receipts are collected and deleted with `delete_message_batch`
+(at most 10 entries per call, the SQS limit). A batch is flushed as soon as
+it is full or when its oldest receipt has waited `max_delay` seconds.
+Entries that fail with a retryable (non sender-fault) error are retried up
+to `max_retries` times; anything still not deleted is simply redelivered
+by SQS after the visibility timeout.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+SQS_DELETE_BATCH_LIMIT = 10
+
+DeleteBatch = Callable[[List[Dict[str, str]]], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class _PendingAck:
+    receipt: str
+    enqueued_at: float
+    attempts: int = 0
+
+
+@dataclass
+class AckStats:
+    """Counters for the acknowledgement stage."""
+    acked: int = 0
+    failed: int = 0
+    retried: int = 0
+    flushes: int = 0
+    entries_flushed: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "acked": self.acked,
+            "failed": self.failed,
+            "retried": self.retried,
+            "flushes": self.flushes,
+            "avg_batch_size": round(self.entries_flushed / self.flushes, 2) if self.flushes else 0.0,
+            "avg_ack_latency_ms": round(self.latency_total / self.acked * 1000, 2) if self.acked else 0.0,
+            "max_ack_latency_ms": round(self.latency_max * 1000, 2),
+        }
+
+
+class SQSAcknowledger:
+    """
+    Collects receipt handles and deletes them in batches
+    - ack() is called on the event loop and never blocks
+    - a background task flushes on size (10) or deadline (max_delay)
+    - close() flushes whatever is still pending
+    """
+
+    def __init__(self, delete_batch: DeleteBatch, *, max_delay: float, max_retries: int) -> None:
+        self._delete_batch = delete_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+
+        self._pending: List[_PendingAck] = []
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+        self.stats = AckStats()
+
+    def start(self) -> None:
+        """Start the background flush loop."""
+        self._task = asyncio.create_task(self._run(), name="sqs-acknowledger")
+
+    def ack(self, receipt: str) -> None:
+        """Queue a receipt handle for deletion."""
+        self._pending.append(_PendingAck(receipt, time.monotonic()))
+        if len(self._pending) == 1 or len(self._pending) >= SQS_DELETE_BATCH_LIMIT:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def close(self) -> None:
+        """Stop the flush loop and delete everything still pending."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                logger.exception("SQS acknowledger loop raised during shutdown.")
+        while self._pending:
+            await self._flush_once()
+
+    async def _run(self) -> None:
+        """Flush a batch whenever it is full or its oldest receipt reached the deadline."""
+        while not self._closed:
+            if not self._pending:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            timeout = self._pending[0].enqueued_at + self.max_delay - time.monotonic()
+            if len(self._pending) < SQS_DELETE_BATCH_LIMIT and timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._flush_once()
+
+    async def _flush_once(self) -> None:
+        """Delete up to 10 pending receipts and requeue the retryable failures."""
+        batch = self._pending[:SQS_DELETE_BATCH_LIMIT]
+        del self._pending[:SQS_DELETE_BATCH_LIMIT]
+        entries = [{"Id": str(i), "ReceiptHandle": p.receipt} for i, p in enumerate(batch)]
+
+        self.stats.flushes += 1
+        self.stats.entries_flushed += len(batch)
+        try:
+            resp = await self._delete_batch(entries)
+        except Exception as exc:
+            logger.warning("delete_message_batch failed for %d receipts: %s", len(batch), exc)
+            self._retry(batch)
+            await asyncio.sleep(self.max_delay)
+            return
+
+        now = time.monotonic()
+        for ok in resp.get("Successful", []):
+            latency = now - batch[int(ok["Id"])].enqueued_at
+            self.stats.acked += 1
+            self.stats.latency_total += latency
+            self.stats.latency_max = max(self.stats.latency_max, latency)
+
+        retry: List[_PendingAck] = []
+        for failed in resp.get("Failed", []):
+            if failed.get("SenderFault"):
+                logger.warning("SQS rejected receipt (%s): %s", failed.get("Code"), failed.get("Message"))
+                self.stats.failed += 1
+            else:
+                retry.append(batch[int(failed["Id"])])
+        self._retry(retry)
+
+    def _retry(self, entries: List[_PendingAck]) -> None:
+        """Put retryable entries back at the front of the queue, dropping exhausted ones."""
+        requeue = []
+        for p in entries:
+            p.attempts += 1
+            if p.attempts > self.max_retries:
+                self.stats.failed += 1
+                continue
+            requeue.append(p)
+        self.stats.retried += len(requeue)
+        self._pending[:0] = requeue
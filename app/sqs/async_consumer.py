@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Coroutine, Dict, List, Set
+from app.config.settings import Settings
+from app.sqs.sqs_consumer import SQSConsumer
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # optional dependency; boto3 on a small dedicated pool is used instead
+    AioConfig = None
+    get_session = None
+
+
+logger = logging.getLogger(__name__)
+
+class AsyncSQSConsumer(SQSConsumer):
+    """
+    Event-loop native SQS consumer (SQS_ENGINE=asyncio)
+    - Calls SQS through an async client (aiobotocore) when it is installed; otherwise
+      boto3 runs on a small dedicated pool (SQS_ASYNC_IO_THREADS), never the default executor
+    - Each message (or batch) is processed in an asyncio task, at most SQS_ASYNC_CONCURRENCY at once
+    - No worker threads and no run_coroutine_threadsafe/future.result() bridge
+    - Decoding, persistence, batching and acknowledgement are shared with SQSConsumer
+
+    """
+
+    engine = "asyncio"
+
+    def __init__(self, settings: Settings, sessionmaker) -> None:
+        super().__init__(settings, sessionmaker)
+        self._settings = settings
+        self.concurrency = settings.SQS_ASYNC_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._exit_stack = AsyncExitStack()
+        self._aio_sqs = None
+
+    def _make_executor(self, settings: Settings) -> ThreadPoolExecutor:
+        """Replaces the per-message worker pool: only blocking boto3 calls run here."""
+        return ThreadPoolExecutor(
+            max_workers=settings.SQS_ASYNC_IO_THREADS,
+            thread_name_prefix="sqs-io",
+        )
+
+    async def start(self) -> None:
+        """Open the async SQS client (if available), then start the polling loop."""
+        if get_session is not None:
+            self._aio_sqs = await self._exit_stack.enter_async_context(
+                get_session().create_client(
+                    "sqs",
+                    region_name=self._settings.AWS_REGION,
+                    endpoint_url=self._settings.sqs_effective_endpoint,
+                    aws_access_key_id=self._settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=self._settings.AWS_SECRET_ACCESS_KEY,
+                    config=AioConfig(retries={"max_attempts": 10, "mode": "standard"}),
+                )
+            )
+        else:
+            logger.info("aiobotocore not installed; using boto3 on %d dedicated threads.", self._executor._max_workers)
+        await super().start()
+
+    async def shutdown(self) -> None:
+        """Stop polling, wait for in-flight tasks, flush acks, then close the SQS client/pool."""
+        await super().shutdown()
+        self._executor.shutdown(wait=True)
+        await self._exit_stack.aclose()
+
+    async def _drain(self) -> None:
+        """Wait for every in-flight processing task."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Consumer counters plus the task/concurrency gauges of this engine."""
+        return {
+            **super().metrics(),
+            "client": "aiobotocore" if self._aio_sqs is not None else "boto3",
+            "tasks": len(self._tasks),
+            "concurrency": self.concurrency,
+        }
+
+    async def _sqs_call(self, method: str, **kwargs) -> Dict[str, Any]:
+        """Await the async client directly, or run boto3 on the dedicated I/O pool."""
+        if self._aio_sqs is not None:
+            return await getattr(self._aio_sqs, method)(**kwargs)
+        assert self._loop is not None, "Loop not initialized"
+        return await self._loop.run_in_executor(self._executor, partial(getattr(self._sqs, method), **kwargs))
+
+    def _dispatch(self, msg: Dict[str, Any]) -> None:
+        """Process one message in its own task."""
+        self._spawn(self._handle_message(msg), self._receipts([msg]))
+
+    def _dispatch_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Process one batch in its own task."""
+        self._spawn(self._handle_batch_async(batch), self._receipts(batch))
+
+    def _spawn(self, coro: Coroutine[Any, Any, None], receipts: List[str]) -> None:
+        """Run `coro` as a tracked task once a concurrency slot is free; release `receipts` when done."""
+        task = asyncio.create_task(self._bounded(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._release(receipts))
+
+    async def _bounded(self, coro: Coroutine[Any, Any, None]) -> None:
+        async with self._semaphore:
+            await coro
+
+    async def _handle_message(self, msg: Dict[str, Any]) -> None:
+        """Decode and process one message on the loop; failures leave it in the queue."""
+        items = self._unpack_batch([msg])
+        if not items:
+            return
+        receipt, summary = items[0]
+        try:
+            await self._process_and_delete(summary, receipt)
+        except Exception as e:
+            logger.exception("Message processing failed; leaving it in the queue. Error: %s", e)
+
+    async def _handle_batch_async(self, msgs: List[Dict[str, Any]]) -> None:
+        """Decode and process one batch on the loop; failures leave their messages in the queue."""
+        items = self._unpack_batch(msgs)
+        if not items:
+            return
+        try:
+            await self._process_batch_and_delete(items)
+        except Exception as e:
+            logger.exception("Batch processing failed; leaving %d messages in the queue. Error: %s", len(items), e)
@@ -0,0 +1,238 @@
+"""
+Ingest codecs: SQS message body -> MessageSummary.
+
+Producers declare the format with two message attributes:
+- ContentType: application/xml, application/json or application/msgpack
+- SchemaVersion: "1" when omitted
+
+Without a ContentType (legacy producers) the type is sniffed from the first
+character of the body: "<" is XML, "{" is JSON.
+
+Each (content type, schema version) maps to a registered decoder that returns
+a MessageSummary directly. A body that no decoder accepts, has fields of the
+wrong type, or lacks an integer device or client id raises DecodeError. The
+consumer rejects it before any
+DB or Redis work; it stays in the queue until the redrive policy moves it to
+the dead-letter queue.
+
+Wire formats (schema version 1):
+- XML: the urn:example:device-message document (Header/Body)
+- JSON: {"message_id", "device_id", "client_id", "sensor", "value", "unit",
+  "timestamp" (ISO 8601)}
+- MessagePack: base64 (SQS bodies are text) of the array
+  [message_id, device_id, client_id, sensor, value, unit, epoch seconds].
+  Requires the optional `msgpack` package.
+"""
+from __future__ import annotations
+import base64
+import binascii
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+from app.models.messageSummary import MessageSummary
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+CONTENT_TYPE_ATTRIBUTE = "ContentType"
+SCHEMA_VERSION_ATTRIBUTE = "SchemaVersion"
+MESSAGE_ATTRIBUTE_NAMES = [CONTENT_TYPE_ATTRIBUTE, SCHEMA_VERSION_ATTRIBUTE]
+DEFAULT_SCHEMA_VERSION = "1"
+
+XML = "application/xml"
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+Decoder = Callable[[str], MessageSummary]
+
+_ENTITY_ID = re.compile(r"\s*[-+]?[0-9]+\s*")
+
+
+class DecodeError(ValueError):
+    """The message body cannot be turned into a MessageSummary."""
+
+
+@dataclass
+class Codec:
+    name: str
+    decode: Decoder
+
+
+_REGISTRY: Dict[Tuple[str, str], Codec] = {}
+
+
+def register_codec(content_type: str, version: str = DEFAULT_SCHEMA_VERSION, *, name: Optional[str] = None):
+    """Register the decorated function as the decoder of (content_type, version)."""
+    def decorator(decode: Decoder) -> Decoder:
+        codec_name = name or f"{content_type.rsplit('/', 1)[-1]}/v{version}"
+        _REGISTRY[(content_type, version)] = Codec(codec_name, decode)
+        return decode
+    return decorator
+
+
+def registered_codecs() -> List[str]:
+    return sorted(codec.name for codec in _REGISTRY.values())
+
+
+def _attribute(attributes: Mapping[str, Any], name: str) -> Optional[str]:
+    value = (attributes.get(name) or {}).get("StringValue")
+    return value.strip() if value else None
+
+
+def _sniff(body: str) -> Optional[str]:
+    first = body.lstrip()[:1]
+    if first == "<":
+        return XML
+    if first == "{":
+        return JSON
+    return None
+
+
+def select_codec(body: str, attributes: Optional[Mapping[str, Any]] = None) -> Codec:
+    """The codec declared by the message attributes, or sniffed from the body."""
+    attributes = attributes or {}
+    declared = _attribute(attributes, CONTENT_TYPE_ATTRIBUTE)
+    content_type = declared.split(";", 1)[0].strip().lower() if declared else _sniff(body)
+    if content_type is None:
+        raise DecodeError("Unrecognised message body (no ContentType attribute, not XML or JSON)")
+    version = _attribute(attributes, SCHEMA_VERSION_ATTRIBUTE) or DEFAULT_SCHEMA_VERSION
+    codec = _REGISTRY.get((content_type, version))
+    if codec is None:
+        raise DecodeError(f"No codec registered for {content_type} schema version {version}")
+    return codec
+
+
+@register_codec(XML)
+def decode_xml_v1(body: str) -> MessageSummary:
+    return MessageSummary.from_element(ET.fromstring(body))
+
+
+def _field(data: Mapping[str, Any], name: str, types: Tuple[type, ...]) -> Optional[str]:
+    """`data[name]` as text; None when absent, DecodeError when it is not one of `types`."""
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise DecodeError(f"{name} must be {' or '.join(t.__name__ for t in types)}, got {type(value).__name__}")
+    return str(value)
+
+
+@register_codec(JSON)
+def decode_json_v1(body: str) -> MessageSummary:
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise DecodeError("JSON message body must be an object")
+    return MessageSummary.from_fields(
+        message_id=_field(data, "message_id", (str,)),
+        device_id=_field(data, "device_id", (int, str)),
+        client_id=_field(data, "client_id", (int, str)),
+        sensor=_field(data, "sensor", (str,)),
+        value=_field(data, "value", (str, int, float)),
+        unit=_field(data, "unit", (str,)),
+        timestamp=_field(data, "timestamp", (str,)),
+    )
+
+
+_MSGPACK_FIELDS = ("message_id", "device_id", "client_id", "sensor", "value", "unit", "epoch")
+
+
+@register_codec(MSGPACK)
+def decode_msgpack_v1(body: str) -> MessageSummary:
+    if msgpack is None:
+        raise DecodeError("MessagePack message received but msgpack is not installed")
+    values = msgpack.unpackb(base64.b64decode(body))
+    if not isinstance(values, (list, tuple)) or len(values) != len(_MSGPACK_FIELDS):
+        raise DecodeError(f"MessagePack message body must be an array of {len(_MSGPACK_FIELDS)} values")
+    data = dict(zip(_MSGPACK_FIELDS, values))
+    epoch = data["epoch"]
+    if epoch is not None and (isinstance(epoch, bool) or not isinstance(epoch, (int, float))):
+        raise DecodeError(f"epoch must be int or float, got {type(epoch).__name__}")
+    try:
+        event_time = datetime.fromtimestamp(epoch, timezone.utc) if epoch else None
+    except (OverflowError, OSError, ValueError) as e:
+        raise DecodeError(f"epoch {epoch!r} is out of range") from e
+    return MessageSummary(
+        message_id=_field(data, "message_id", (str,)),
+        device_id=_field(data, "device_id", (int, str)),
+        client_id=_field(data, "client_id", (int, str)),
+        sensor=_field(data, "sensor", (str,)),
+        value=_field(data, "value", (str, int, float)),
+        unit=_field(data, "unit", (str,)),
+        timestamp=event_time.strftime("%d.%m.%Y %H:%M:%S") if event_time else "",
+        event_time=event_time,
+    )
+
+
+@dataclass
+class CodecStats:
+    decoded: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "decoded": self.decoded,
+            "rejected": self.rejected,
+            "avg_decode_us": round(self.seconds / self.decoded * 1e6, 1) if self.decoded else 0.0,
+        }
+
+
+class IngestDecoder:
+    """
+    Decodes received SQS messages with the registered codecs and times them
+    - decode() raises DecodeError for anything that must not reach the database
+    - per-codec counters; rejects that match no codec are counted under "unknown"
+    """
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, CodecStats] = {}
+
+    def decode(self, msg: Mapping[str, Any]) -> MessageSummary:
+        """Decode one received message (its Body and MessageAttributes)."""
+        body = msg.get("Body", "")
+        try:
+            codec = select_codec(body, msg.get("MessageAttributes"))
+        except DecodeError:
+            self._stats("unknown").rejected += 1
+            raise
+
+        stats = self._stats(codec.name)
+        started = time.perf_counter()
+        try:
+            summary = codec.decode(body)
+        except DecodeError:
+            stats.rejected += 1
+            raise
+        except (ValueError, TypeError, AttributeError, ET.ParseError, binascii.Error) as e:
+            stats.rejected += 1
+            raise DecodeError(f"Undecodable {codec.name} message: {e}") from e
+        finally:
+            stats.seconds += time.perf_counter() - started
+        if not summary.device_id or not summary.client_id:
+            stats.rejected += 1
+            raise DecodeError("device_id/client_id not found")
+        if not (_ENTITY_ID.fullmatch(summary.device_id) and _ENTITY_ID.fullmatch(summary.client_id)):
+            stats.rejected += 1
+            raise DecodeError(f"device_id/client_id must be integers, got {summary.device_id!r}/{summary.client_id!r}")
+        stats.decoded += 1
+        return summary
+
+    @property
+    def rejected(self) -> int:
+        return sum(s.rejected for s in self.stats.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: stats.as_dict() for name, stats in sorted(self.stats.items())}
+
+    def _stats(self, name: str) -> CodecStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = CodecStats()
+        return stats
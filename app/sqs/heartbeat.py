@@ -0,0 +1,176 @@
+"""
+Visibility-timeout heartbeat for in-flight SQS messages.
+
+A received message stays invisible for SQS_VISIBILITY_TIMEOUT seconds only;
+if processing takes longer, SQS hands it to another worker while the first
+one is still busy with it. The heartbeat tracks every in-flight receipt and,
+every `interval` seconds, extends the ones whose visibility ends within two
+intervals with `change_message_visibility_batch` (10 entries per call, the
+SQS limit). A message still unfinished after `max_processing` seconds is
+given up on: its visibility is set to 0 so it is redelivered right away, and
+`on_release` tells the consumer to stop counting it as in flight.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+SQS_VISIBILITY_BATCH_LIMIT = 10
+
+# Failures meaning the receipt is gone for good (deleted, expired or already redelivered).
+_STALE_RECEIPT_CODES = {"ReceiptHandleIsInvalid", "MessageNotInflight", "InvalidParameterValue"}
+
+ChangeVisibilityBatch = Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class _Lease:
+    received_at: float
+    visible_at: float
+
+
+@dataclass
+class HeartbeatStats:
+    """Counters for the heartbeat stage."""
+    extended: int = 0
+    released: int = 0
+    failed: int = 0
+    calls: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "extended": self.extended,
+            "released": self.released,
+            "failed": self.failed,
+            "calls": self.calls,
+        }
+
+
+class VisibilityHeartbeat:
+    """
+    Keeps in-flight messages invisible while they are being processed
+    - track()/forget() are called on the event loop and never block
+    - a background task extends leases close to expiry, in batches of 10
+    - leases older than max_processing are released (VisibilityTimeout=0)
+    """
+
+    def __init__(
+        self,
+        change_visibility_batch: ChangeVisibilityBatch,
+        *,
+        visibility_timeout: int,
+        interval: float,
+        max_processing: float,
+        on_release: Callable[[List[str]], None] | None = None,
+    ) -> None:
+        self._change_visibility_batch = change_visibility_batch
+        self._on_release = on_release
+        self.visibility_timeout = visibility_timeout
+        self.interval = interval
+        self.max_processing = max_processing
+
+        self._leases: Dict[str, _Lease] = {}
+        self._closed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.stats = HeartbeatStats()
+
+    def start(self) -> None:
+        """Start the background heartbeat loop."""
+        self._task = asyncio.create_task(self._run(), name="sqs-heartbeat")
+
+    def track(self, receipts: Iterable[str]) -> None:
+        """Start keeping freshly received messages invisible."""
+        now = time.monotonic()
+        for receipt in receipts:
+            self._leases[receipt] = _Lease(now, now + self.visibility_timeout)
+
+    def forget(self, receipts: Iterable[str]) -> None:
+        """Stop extending finished messages."""
+        for receipt in receipts:
+            self._leases.pop(receipt, None)
+
+    @property
+    def tracked(self) -> int:
+        return len(self._leases)
+
+    async def close(self) -> None:
+        """Stop the heartbeat loop; remaining leases simply expire."""
+        self._closed.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                logger.exception("SQS heartbeat loop raised during shutdown.")
+        self._leases.clear()
+
+    async def _run(self) -> None:
+        """Beat every `interval` seconds until closed."""
+        while not self._closed.is_set():
+            try:
+                await asyncio.wait_for(self._closed.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.beat()
+            except Exception as exc:
+                logger.exception("SQS heartbeat failed: %s", exc)
+
+    async def beat(self) -> None:
+        """Release leases past max_processing and extend the ones expiring within two intervals."""
+        now = time.monotonic()
+        release: List[str] = []
+        extend: List[str] = []
+        for receipt, lease in self._leases.items():
+            if now - lease.received_at >= self.max_processing:
+                release.append(receipt)
+            elif lease.visible_at - now <= 2 * self.interval:
+                extend.append(receipt)
+
+        if release:
+            logger.warning(
+                "Giving up on %d messages processing for over %ss; releasing them for redelivery.",
+                len(release), self.max_processing,
+            )
+            self.forget(release)
+            self.stats.released += len(release)
+            if self._on_release is not None:
+                self._on_release(release)
+            await self._change(release, 0)
+
+        for receipt in await self._change(extend, self.visibility_timeout):
+            lease = self._leases.get(receipt)
+            if lease is not None:
+                lease.visible_at = now + self.visibility_timeout
+                self.stats.extended += 1
+
+    async def _change(self, receipts: List[str], timeout: int) -> List[str]:
+        """Set the visibility of `receipts` in batches of 10; return the receipts that succeeded."""
+        changed: List[str] = []
+        for start in range(0, len(receipts), SQS_VISIBILITY_BATCH_LIMIT):
+            batch = receipts[start:start + SQS_VISIBILITY_BATCH_LIMIT]
+            entries = [
+                {"Id": str(i), "ReceiptHandle": receipt, "VisibilityTimeout": timeout}
+                for i, receipt in enumerate(batch)
+            ]
+            self.stats.calls += 1
+            try:
+                resp = await self._change_visibility_batch(entries)
+            except Exception as exc:
+                # Nothing changed; extensions are retried on the next beat.
+                logger.warning("change_message_visibility_batch failed for %d receipts: %s", len(batch), exc)
+                self.stats.failed += len(batch)
+                continue
+
+            changed.extend(batch[int(ok["Id"])] for ok in resp.get("Successful", []))
+            for failed in resp.get("Failed", []):
+                self.stats.failed += 1
+                if failed.get("Code") in _STALE_RECEIPT_CODES:
+                    self.forget([batch[int(failed["Id"])]])
+                else:
+                    logger.warning("SQS visibility change failed (%s): %s", failed.get("Code"), failed.get("Message"))
+        return changed
@@ -6,7 +6,9 @@ from fastapi import FastAPI
 from app.config.settings import get_settings
 from app.sqs.connector import connect_to_sqs
 from app.sqs.sqs_consumer import SQSConsumer
+from app.sqs.async_consumer import AsyncSQSConsumer
 from app.helpers.database import SessionLocal
+from app.helpers.redis_client import close_redis, init_redis
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +17,13 @@ async def lifespan(app: FastAPI):
     """  Manage application lifespan events."""
     settings = get_settings()
     consumer: SQSConsumer | None = None
+    init_redis()
 
     if not connect_to_sqs(queue_url=str(settings.SQS_QUEUE_URL)):
         logger.warning("SQS_QUEUE_URL missing/invalid; consumer will not start.")
     else:
-        consumer = SQSConsumer(settings, SessionLocal)
+        consumer_cls = AsyncSQSConsumer if settings.SQS_ENGINE == "asyncio" else SQSConsumer
+        consumer = consumer_cls(settings, SessionLocal)
         await consumer.start()
         app.state.sqs_consumer = consumer
 
@@ -28,3 +32,4 @@ async def lifespan(app: FastAPI):
     finally:
         if consumer is not None:
             await consumer.shutdown()
+        await close_redis()
@@ -1,33 +1,98 @@
 from __future__ import annotations
-import json
+import math
 import asyncio
 import logging
-from sqlalchemy.exc import IntegrityError
-from typing import Any, Dict
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import Any, Dict, List, Set, Tuple
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import boto3
-import xml.etree.ElementTree as ET
 from botocore.config import Config as BotoConfig
 from app.config.settings import Settings
-from app.helpers.ensure_entities import ensure_client, ensure_device
+from app.sqs.acknowledger import SQSAcknowledger
+from app.sqs.codecs import MESSAGE_ATTRIBUTE_NAMES, DecodeError, IngestDecoder
+from app.sqs.heartbeat import VisibilityHeartbeat
+from app.helpers.entity_registry import EntityRegistry
 from app.models.messageSummary import MessageSummary
-from app.helpers.message_helper import save_message
-from app.helpers.redis_client import get_redis, mirror_message_to_redis
+from app.helpers.bulk_loader import copy_messages
+from app.helpers.device_state import event_ms
+from app.helpers.message_helper import CONSUMER_PAYLOAD, save_message, save_messages
+from app.helpers.redis_client import get_redis, mirror_messages_to_redis
+from app.helpers.redis_mirror import RedisMirrorBuffer
 
 
 
 logger = logging.getLogger(__name__)
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+@dataclass
+class ConsumerStats:
+    """Message counters shared by every consumer engine."""
+    processed: int = 0
+    failed: int = 0
+    pauses: int = 0
+    receives: int = 0
+    empty_receives: int = 0
+    bulk_rows: int = 0
+    bulk_seconds: float = 0.0
+
+
+def _runtime_snapshot() -> Dict[str, Any]:
+    """Thread count and process context switches, to compare consumer engines."""
+    snapshot: Dict[str, Any] = {"threads": threading.active_count()}
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        snapshot["ctx_switches_voluntary"] = usage.ru_nvcsw
+        snapshot["ctx_switches_involuntary"] = usage.ru_nivcsw
+    return snapshot
+
+
+def _mirror_dict(summary: MessageSummary, message_id: int) -> Dict[str, Any]:
+    """The Redis mirror entry of a saved message; `event_ms` orders the device state."""
+    message_dict = summary.as_dict()
+    message_dict.update({
+        "id": str(message_id),
+        "payload": CONSUMER_PAYLOAD,
+        "event_ms": event_ms(summary.event_time),
+    })
+    return message_dict
+
+
 class SQSConsumer:
     """
     Asynchronous SQS consumer
     - Polls SQS via boto3.receive_message (run in a thread to avoid blocking the event loop)
     - Dispatches each received message to a ThreadPoolExecutor worker (one thread per message)
     - Worker schedules async processing+deletion on the event loop
-    - On success → delete_message; on failure → DO NOT delete (SQS redelivers after visibility timeout)
+    - On success → receipt goes to the acknowledger (delete_message_batch, 10 per call);
+      on failure → DO NOT delete (SQS redelivers after visibility timeout)
+    - Batch mode (SQS_BATCH_MODE): a whole receive (or an N-message / T-ms window) is persisted
+      in ONE DB transaction; only the receipts of messages that failed are left for redelivery.
+      With SQS_BATCH_COPY the rows are streamed with COPY instead of a multi-row INSERT
+    - Backpressure: polling pauses once SQS_MAX_IN_FLIGHT messages are received but not finished,
+      and resumes when the count drops to SQS_IN_FLIGHT_LOW_WATERMARK
+    - SQS_POLLERS receive loops run in parallel; with SQS_AUTOSCALE their number follows the
+      queue depth (ApproximateNumberOfMessages) and the empty-receive rate within
+      [SQS_POLLERS_MIN, SQS_POLLERS_MAX]
+    - Heartbeat (SQS_HEARTBEAT): visibility of messages still being processed is extended before it
+      expires; after SQS_MAX_PROCESSING_TIME they are released for redelivery instead
+    - Known clients/devices are cached in an EntityRegistry (warmed at start), so a message
+      from a known device costs no client/device round trips
+    - Bodies are decoded by the codec their ContentType/SchemaVersion attributes select
+      (app/sqs/codecs.py); undecodable messages are rejected before any DB or Redis work
 
     """
 
+    engine = "threaded"
+
     def __init__(self, settings: Settings, sessionmaker) -> None:
         """
          Asynchronous SQS consumer
@@ -43,16 +108,40 @@ class SQSConsumer:
         self.max_messages = settings.SQS_MAX_MESSAGES
         self.visibility_timeout = settings.SQS_VISIBILITY_TIMEOUT
         self.thread_pool_size = settings.SQS_THREAD_POOL_SIZE
+        self.batch_mode = settings.SQS_BATCH_MODE
+        self.batch_size = settings.SQS_BATCH_SIZE
+        self.batch_window = settings.SQS_BATCH_WINDOW_MS / 1000.0
+        self.batch_copy = settings.SQS_BATCH_COPY
+        self.max_in_flight = settings.SQS_MAX_IN_FLIGHT
+        self.in_flight_low = settings.SQS_IN_FLIGHT_LOW_WATERMARK
+        self.autoscale = settings.SQS_AUTOSCALE
+        self.pollers_min = settings.SQS_POLLERS_MIN
+        self.pollers_max = settings.SQS_POLLERS_MAX
+        self.initial_pollers = settings.SQS_POLLERS
+        self.autoscale_interval = settings.SQS_AUTOSCALE_INTERVAL
+        self.messages_per_poller = settings.SQS_AUTOSCALE_MESSAGES_PER_POLLER
+        self.scale_down_empty_rate = settings.SQS_AUTOSCALE_EMPTY_RATE
 
-
+        # receipt -> loop time it was received; insertion order keeps the oldest first
+        self._in_flight: Dict[str, float] = {}
+        # receipts the heartbeat released for redelivery while their handler was still running
+        self._abandoned: Set[str] = set()
+        self._capacity = asyncio.Event()
+        self._paused = False
+        self._reserved = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_since: float | None = None
         self._loop: asyncio.AbstractEventLoop | None = None
         self._stop = asyncio.Event()
-        self._executor = ThreadPoolExecutor(
-            max_workers=self.thread_pool_size,
-            thread_name_prefix="sqs-worker",
-        )
+        self._executor = self._make_executor(settings)
         self._task = None
+        # one (task, retire event) per receive loop
+        self._pollers: List[Tuple[asyncio.Task, asyncio.Event]] = []
+        # retired loops still finishing their last receive; shutdown waits for them too
+        self._retiring: Set[asyncio.Task] = set()
+        self._queue_depth: int | None = None
         self._sessionmaker = sessionmaker
+        self._stats = ConsumerStats()
 
         self._sqs = boto3.client(
             "sqs",
@@ -62,56 +151,272 @@ class SQSConsumer:
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             config=BotoConfig(retries={"max_attempts": 10, "mode": "standard"}),
         )
+        self._acker = SQSAcknowledger(
+            self._delete_batch,
+            max_delay=settings.SQS_ACK_MAX_DELAY_MS / 1000.0,
+            max_retries=settings.SQS_ACK_MAX_RETRIES,
+        )
+        self._mirror_buffer: RedisMirrorBuffer | None = None
+        if settings.REDIS_MIRROR_BUFFERED:
+            self._mirror_buffer = RedisMirrorBuffer(
+                max_delay=settings.REDIS_MIRROR_DELAY_MS / 1000.0,
+                max_batch=settings.REDIS_MIRROR_MAX_BATCH,
+            )
+        self._decoder = IngestDecoder()
+        self._entities = EntityRegistry(maxsize=settings.ENTITY_CACHE_SIZE, ttl=settings.ENTITY_CACHE_TTL)
+        self._heartbeat: VisibilityHeartbeat | None = None
+        if settings.SQS_HEARTBEAT:
+            self._heartbeat = VisibilityHeartbeat(
+                self._change_visibility_batch,
+                visibility_timeout=self.visibility_timeout,
+                interval=settings.SQS_HEARTBEAT_INTERVAL or self.visibility_timeout / 3,
+                max_processing=settings.SQS_MAX_PROCESSING_TIME,
+                on_release=self._abandon,
+            )
+
+    def _make_executor(self, settings: Settings) -> ThreadPoolExecutor:
+        """The per-message worker pool; engines that need another pool override this."""
+        return ThreadPoolExecutor(
+            max_workers=self.thread_pool_size,
+            thread_name_prefix="sqs-worker",
+        )
 
     async def start(self) -> None:
-        """Start the polling loop."""
+        """Start the polling loops (and the autoscaler, if enabled)."""
         self._loop = asyncio.get_running_loop()
         logger.info(
-            "Starting SQS consumer for %s (poll=%ss, wait=%ss, max=%s, pool=%s, vis=%ss)",
-            self.queue_url, self.poll_interval, self.wait_time_seconds,
+            "Starting %s SQS consumer for %s (poll=%ss, wait=%ss, max=%s, pool=%s, vis=%ss, batch=%s, pollers=%s)",
+            self.engine, self.queue_url, self.poll_interval, self.wait_time_seconds,
             self.max_messages, self._executor._max_workers, self.visibility_timeout,
+            f"{self.batch_size}/{int(self.batch_window * 1000)}ms" if self.batch_mode else "off",
+            f"{self.initial_pollers} ({self.pollers_min}..{self.pollers_max})" if self.autoscale else self.initial_pollers,
         )
-        self._task = asyncio.create_task(self._run(), name="sqs-consumer-loop")
+        if self._sessionmaker is not None:
+            try:
+                async with self._sessionmaker() as session:
+                    await self._entities.warm(session)
+            except Exception as exc:
+                logger.warning("Could not warm the entity registry; starting cold: %s", exc)
+        self._acker.start()
+        if self._mirror_buffer is not None:
+            self._mirror_buffer.start()
+        if self._heartbeat is not None:
+            self._heartbeat.start()
+        self._scale_to(self.initial_pollers)
+        if self.autoscale:
+            self._task = asyncio.create_task(self._autoscale(), name="sqs-consumer-autoscaler")
 
     async def shutdown(self) -> None:
-        """Signal stop, wait for loop to finish, then drain the executor."""
+        """Signal stop, wait for the loops to finish, drain the executor, then flush pending acks."""
         logger.info("Stopping SQS consumer...")
         self._stop.set()
         await asyncio.sleep(0.05)
+        tasks = [task for task, _ in self._pollers] + list(self._retiring)
         if self._task is not None:
-            try:
-                await self._task
-            except Exception:
-                logger.exception("SQS consumer loop raised during shutdown.")
-        self._executor.shutdown(wait=True, cancel_futures=True)
+            tasks.append(self._task)
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("SQS consumer loop raised during shutdown: %s", result)
+        self._pollers.clear()
+
+        # Like work still queued in the executor, an unflushed batch is left for redelivery.
+        self._release(self._receipts(self._pending))
+        self._pending.clear()
+        await self._drain()
+        if self._mirror_buffer is not None:
+            await self._mirror_buffer.close()
+        if self._heartbeat is not None:
+            await self._heartbeat.close()
+        await self._acker.close()
+        self._in_flight.clear()
+        self._abandoned.clear()
         logger.info("SQS consumer stopped.")
 
-    async def _run(self) -> None:
+    async def _drain(self) -> None:
+        """Wait for in-flight work; runs off-loop because workers block on futures that need this loop."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self._executor.shutdown(wait=True, cancel_futures=True)
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of the consumer's runtime counters."""
+        return {
+            "engine": self.engine,
+            "processed": self._stats.processed,
+            "failed": self._stats.failed,
+            "rejected": self._decoder.rejected,
+            "pollers": len(self._pollers),
+            "receives": self._stats.receives,
+            "empty_receives": self._stats.empty_receives,
+            "queue_depth": self._queue_depth,
+            "bulk": {
+                "method": "copy" if self.batch_copy else "insert",
+                "rows": self._stats.bulk_rows,
+                "rows_per_sec": (
+                    round(self._stats.bulk_rows / self._stats.bulk_seconds, 1) if self._stats.bulk_seconds else 0.0
+                ),
+            },
+            **self._in_flight_snapshot(),
+            **_runtime_snapshot(),
+            "ack": {**self._acker.stats.as_dict(), "pending": self._acker.pending},
+            "entity_cache": self._entities.metrics(),
+            "codecs": self._decoder.metrics(),
+            "redis_mirror": (
+                {**self._mirror_buffer.stats.as_dict(), "pending": self._mirror_buffer.pending}
+                if self._mirror_buffer is not None else None
+            ),
+            "heartbeat": (
+                {**self._heartbeat.stats.as_dict(), "tracked": self._heartbeat.tracked}
+                if self._heartbeat is not None else None
+            ),
+        }
+
+    def _in_flight_snapshot(self) -> Dict[str, Any]:
+        """In-flight gauges: count, age of the oldest message and how many outlived their visibility timeout."""
+        now = self._loop.time() if self._loop is not None else 0.0
+        oldest = next(iter(self._in_flight.values()), None)
+        return {
+            "in_flight": len(self._in_flight),
+            "in_flight_max": self.max_in_flight,
+            "oldest_in_flight_age_s": round(now - oldest, 3) if oldest is not None else 0.0,
+            "in_flight_past_visibility": sum(
+                1 for t in self._in_flight.values() if now - t > self.visibility_timeout
+            ),
+            "abandoned": len(self._abandoned),
+            "paused": self._paused,
+            "pauses": self._stats.pauses,
+        }
+
+    async def _sqs_call(self, method: str, **kwargs) -> Dict[str, Any]:
+        """boto3 calls are blocking → run in default executor via run_in_executor(None, ...)."""
+        assert self._loop is not None, "Loop not initialized"
+        return await self._loop.run_in_executor(None, partial(getattr(self._sqs, method), **kwargs))
+
+    async def _delete_batch(self, entries: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Delete up to 10 receipts in one round trip."""
+        return await self._sqs_call("delete_message_batch", QueueUrl=self.queue_url, Entries=entries)
+
+    async def _change_visibility_batch(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Change the visibility of up to 10 receipts in one round trip."""
+        return await self._sqs_call("change_message_visibility_batch", QueueUrl=self.queue_url, Entries=entries)
+
+    def _scale_to(self, target: int) -> None:
+        """Start or retire receive loops until `target` are running."""
+        while len(self._pollers) < target:
+            retire = asyncio.Event()
+            task = asyncio.create_task(self._run(retire), name=f"sqs-consumer-loop-{len(self._pollers)}")
+            self._pollers.append((task, retire))
+        while len(self._pollers) > target:
+            # A retired loop finishes its current receive, then exits on its own.
+            task, retire = self._pollers.pop()
+            retire.set()
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+
+    def _desired_pollers(self, depth: int, empty_rate: float) -> int:
+        """
+        Poller count for the observed backlog:
+        - backlog above what the current loops cover → one loop per SQS_AUTOSCALE_MESSAGES_PER_POLLER
+        - mostly empty receives → retire one loop, if the remaining loops still cover the backlog
+        - paused by backpressure → never add loops (more polling cannot help)
         """
-        Main polling loop:
-        - receive_message is blocking → run in default executor via run_in_executor(None, ...)
+        current = len(self._pollers)
+        target = current
+        if depth > current * self.messages_per_poller and not self._paused:
+            target = math.ceil(depth / self.messages_per_poller)
+        elif empty_rate >= self.scale_down_empty_rate and depth <= (current - 1) * self.messages_per_poller:
+            target = current - 1
+        return max(self.pollers_min, min(self.pollers_max, target))
+
+    async def _autoscale(self) -> None:
+        """Every SQS_AUTOSCALE_INTERVAL: read the queue depth and resize the poller set."""
+        last_receives, last_empty = self._stats.receives, self._stats.empty_receives
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.autoscale_interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                resp = await self._sqs_call(
+                    "get_queue_attributes",
+                    QueueUrl=self.queue_url,
+                    AttributeNames=["ApproximateNumberOfMessages"],
+                )
+                self._queue_depth = int(resp.get("Attributes", {}).get("ApproximateNumberOfMessages", 0))
+            except Exception as exc:
+                logger.warning("Could not read SQS queue depth: %s", exc)
+                continue
+
+            receives = self._stats.receives - last_receives
+            empty = self._stats.empty_receives - last_empty
+            last_receives, last_empty = self._stats.receives, self._stats.empty_receives
+            empty_rate = empty / receives if receives else 1.0
+
+            target = self._desired_pollers(self._queue_depth, empty_rate)
+            if target != len(self._pollers):
+                logger.info(
+                    "Scaling SQS pollers %d → %d (depth=%d, empty_rate=%.2f)",
+                    len(self._pollers), target, self._queue_depth, empty_rate,
+                )
+                self._scale_to(target)
+
+    async def _run(self, retire: asyncio.Event | None = None) -> None:
+        """
+        Main polling loop (one per poller; `retire` stops just this loop):
+        - receive_message goes through _sqs_call (blocking boto3 → default executor)
         - if no messages → sleep poll_interval
-        - for each message → submit _handle_one_message to our worker pool
+        - for each message → _dispatch (submit _handle_one_message to our worker pool)
+        - batch mode → buffer messages and _dispatch_batch once the batch is full / the window elapsed
+        - in-flight limit reached → stop polling until the low watermark (_wait_for_capacity)
         """
         assert self._loop is not None, "Loop not initialized"
-        while not self._stop.is_set():
+        while not self._stop.is_set() and not (retire is not None and retire.is_set()):
             try:
-                resp = await self._loop.run_in_executor(
-                    None,
-                    lambda: self._sqs.receive_message(
+                # Headroom already requested by concurrent pollers counts against the limit.
+                headroom = self.max_in_flight - len(self._in_flight) - self._reserved
+                if len(self._in_flight) >= self.max_in_flight:
+                    await self._wait_for_capacity()
+                    continue
+                if headroom <= 0:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                # While a batch window is open, short-poll so we can honour its deadline.
+                wait_time = 0 if self._pending else self.wait_time_seconds
+                requested = min(self.max_messages, headroom)
+                self._reserved += requested
+                try:
+                    resp = await self._sqs_call(
+                        "receive_message",
                         QueueUrl=self.queue_url,
-                        MaxNumberOfMessages=self.max_messages,
-                        WaitTimeSeconds=self.wait_time_seconds,
+                        MaxNumberOfMessages=requested,
+                        WaitTimeSeconds=wait_time,
                         VisibilityTimeout=self.visibility_timeout,
-                    ),
-                 )
+                        MessageAttributeNames=MESSAGE_ATTRIBUTE_NAMES,
+                    )
+                finally:
+                    self._reserved -= requested
                 messages = resp.get("Messages", [])
+                self._track(messages)
+                self._stats.receives += 1
+                if not messages:
+                    self._stats.empty_receives += 1
+                if self.batch_mode:
+                    self._buffer_batch(messages)
+                    if not messages and self._pending:
+                        await asyncio.sleep(min(self.poll_interval, self._batch_time_left()))
+                    elif not messages:
+                        await asyncio.sleep(self.poll_interval)
+                    continue
+
                 if not messages:
                     await asyncio.sleep(self.poll_interval)
                     continue
 
                 for msg in messages:
-                    self._executor.submit(self._handle_one_message, msg)
+                    self._dispatch(msg)
 
             except Exception as exc:
                 logger.exception("Error while polling SQS: %s", exc)
@@ -119,33 +424,133 @@ class SQSConsumer:
 
         logger.info("SQS consumer loop exited.")
 
+    async def _wait_for_capacity(self) -> None:
+        """
+        Pause polling until in-flight work drains to the low watermark (or we are stopping).
+        Buffered batch messages count as in flight but only this loop flushes them, so
+        they are dispatched on entry and whenever the batch window closes while paused.
+        """
+        assert self._loop is not None, "Loop not initialized"
+        if self._pending:
+            self._flush_batch()
+        self._paused = True
+        self._stats.pauses += 1
+        self._capacity.clear()
+        logger.warning(
+            "SQS consumer paused: %d messages in flight (max=%d, resume at %d)",
+            len(self._in_flight), self.max_in_flight, self.in_flight_low,
+        )
+        while not self._stop.is_set() and len(self._in_flight) > self.in_flight_low:
+            if self._pending and self._batch_time_left() <= 0:
+                self._flush_batch()
+            try:
+                await asyncio.wait_for(self._capacity.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        self._paused = False
+        logger.info("SQS consumer resumed: %d messages in flight", len(self._in_flight))
+
+    @staticmethod
+    def _receipts(msgs: List[Dict[str, Any]]) -> List[str]:
+        return [m["ReceiptHandle"] for m in msgs if m.get("ReceiptHandle")]
+
+    def _track(self, msgs: List[Dict[str, Any]]) -> None:
+        """Count received messages as in flight until their processing finishes."""
+        assert self._loop is not None, "Loop not initialized"
+        now = self._loop.time()
+        receipts = self._receipts(msgs)
+        for receipt in receipts:
+            self._in_flight[receipt] = now
+        if self._heartbeat is not None:
+            self._heartbeat.track(receipts)
+
+    def _release(self, receipts: List[str]) -> None:
+        """Runs on the event loop: finished receipts leave the in-flight set."""
+        for receipt in receipts:
+            self._in_flight.pop(receipt, None)
+            self._abandoned.discard(receipt)
+        if self._heartbeat is not None:
+            self._heartbeat.forget(receipts)
+        if self._paused and len(self._in_flight) <= self.in_flight_low:
+            self._capacity.set()
+
+    def _abandon(self, receipts: List[str]) -> None:
+        """
+        Heartbeat callback: these messages were released for redelivery while their
+        handler still runs. They stop counting as in flight now; acking them later is
+        a no-op, and so is their release once the handler returns.
+        """
+        for receipt in receipts:
+            if self._in_flight.pop(receipt, None) is not None:
+                self._abandoned.add(receipt)
+        if self._paused and len(self._in_flight) <= self.in_flight_low:
+            self._capacity.set()
+
+    def _ack(self, receipt: str) -> None:
+        """Hand a processed receipt to the acknowledger, unless the heartbeat gave it up."""
+        if receipt in self._abandoned:
+            logger.warning("Processed a message after its lease was released; leaving it for redelivery.")
+            return
+        self._acker.ack(receipt)
+
+    def _release_threadsafe(self, receipts: List[str], _future=None) -> None:
+        """Future done-callback (worker thread): hop back onto the loop to release."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._release, receipts)
+
+    def _buffer_batch(self, messages: List[Dict[str, Any]]) -> None:
+        """Add received messages to the pending batch and flush every full batch / an expired window."""
+        assert self._loop is not None, "Loop not initialized"
+        if messages and not self._pending:
+            self._pending_since = self._loop.time()
+        self._pending.extend(messages)
+
+        while len(self._pending) >= self.batch_size:
+            self._flush_batch(self.batch_size)
+        if self._pending and self._batch_time_left() <= 0:
+            self._flush_batch()
+
+    def _batch_time_left(self) -> float:
+        """Seconds until the pending batch window closes."""
+        assert self._loop is not None, "Loop not initialized"
+        if self._pending_since is None:
+            return self.batch_window
+        return self._pending_since + self.batch_window - self._loop.time()
+
+    def _flush_batch(self, size: int | None = None) -> None:
+        """Dispatch (up to `size`) pending messages as one batch."""
+        assert self._loop is not None, "Loop not initialized"
+        size = size or len(self._pending)
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        self._pending_since = self._loop.time() if self._pending else None
+        self._dispatch_batch(batch)
+
+    def _dispatch(self, msg: Dict[str, Any]) -> None:
+        """Hand one received message to the worker pool."""
+        future = self._executor.submit(self._handle_one_message, msg)
+        future.add_done_callback(partial(self._release_threadsafe, self._receipts([msg])))
+
+    def _dispatch_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Hand one batch of received messages to the worker pool."""
+        future = self._executor.submit(self._handle_batch, batch)
+        future.add_done_callback(partial(self._release_threadsafe, self._receipts(batch)))
+
     def _handle_one_message(self, msg: Dict[str, Any]) -> None:
         """
         Runs in a worker thread:
-        - Parse body (JSON or raw)
+        - Decode the body with its codec (undecodable → rejected, left in the queue)
         - Schedule async processing+deletion on the event loop
         - Wait for the result in THIS worker thread (does not block the event loop)
         """
         assert self._loop is not None, "Loop not initialized"
 
-        receipt = msg.get("ReceiptHandle")
-        body_str = msg.get("Body", "")
-
-        if receipt is None:
-            logger.warning("Received message without ReceiptHandle; skipping.")
+        items = self._unpack_batch([msg])
+        if not items:
             return
-
-        try:
-            body = json.loads(body_str)
-        except json.JSONDecodeError:
-            try:
-                root = ET.fromstring(body_str)
-                body = {"xml": body_str, "parsed": root}
-            except ET.ParseError:
-                body = {"raw": body_str}
+        receipt, summary = items[0]
 
         future = asyncio.run_coroutine_threadsafe(
-            self._process_and_delete(body, receipt),
+            self._process_and_delete(summary, receipt),
             self._loop,
         )
         try:
@@ -155,49 +560,92 @@ class SQSConsumer:
         except Exception as e:
             logger.exception("Message processing failed; leaving it in the queue. Error: %s", e)
 
-    async def _process_and_delete(self, body: Dict[str, Any], receipt: str) -> None:
+    def _unpack_batch(self, msgs: List[Dict[str, Any]]) -> List[Tuple[str, MessageSummary]]:
         """
-        Runs on the event loop:
-        - Run business logic (_process_message)
-        - On success → delete from SQS (blocking boto3 call run in a thread)
-        - On error → re-raise (so worker does NOT delete and SQS will redeliver)
+        Pair every receipt with its decoded summary. Messages without a ReceiptHandle
+        are skipped; undecodable ones are rejected here, before any DB or Redis work,
+        and left in the queue (the redrive policy moves them to the dead-letter queue).
+        """
+        items: List[Tuple[str, MessageSummary]] = []
+        for msg in msgs:
+            receipt = msg.get("ReceiptHandle")
+            if receipt is None:
+                logger.warning("Received message without ReceiptHandle; skipping.")
+                continue
+            try:
+                summary = self._decoder.decode(msg)
+            except DecodeError as e:
+                logger.warning("Rejected message %s: %s", msg.get("MessageId"), e)
+                continue
+            except Exception:
+                # A decoder bug must not take the rest of the batch down with it.
+                logger.exception("Decoding message %s failed; leaving it in the queue.", msg.get("MessageId"))
+                continue
+            items.append((receipt, summary))
+        return items
+
+    def _handle_batch(self, msgs: List[Dict[str, Any]]) -> None:
+        """
+        Runs in a worker thread (batch mode):
+        - Decode every body
+        - Schedule one async batch processing+acknowledgement on the event loop and wait for it
         """
         assert self._loop is not None, "Loop not initialized"
-        await self._process_message(body)
 
-        await self._loop.run_in_executor(
-            None,
-            lambda: self._sqs.delete_message(
-                QueueUrl=self.queue_url,
-                ReceiptHandle=receipt,
-            ),
+        items = self._unpack_batch(msgs)
+        if not items:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._process_batch_and_delete(items),
+            self._loop,
         )
+        try:
+            future.result()
+        except Exception as e:
+            logger.exception("Batch processing failed; leaving %d messages in the queue. Error: %s", len(items), e)
 
-    async def _process_message(self, body: dict) -> None:
-        """Parse message body and save it into the database."""
-        summary = MessageSummary.from_body(body)
+    async def _process_batch_and_delete(self, items: List[Tuple[str, MessageSummary]]) -> None:
+        """
+        Runs on the event loop:
+        - Persist the batch (_process_batch)
+        - Acknowledge only the receipts that were committed; failed ones stay for redelivery
+        """
+        try:
+            done = await self._process_batch(items)
+        except Exception:
+            self._stats.failed += len(items)
+            raise
+        self._stats.processed += len(done)
+        self._stats.failed += len(items) - len(done)
+        for receipt in done:
+            self._ack(receipt)
 
-        if not summary.device_id or not summary.client_id:
-            raise ValueError("device_id/client_id not found")
+    async def _process_and_delete(self, summary: MessageSummary, receipt: str) -> None:
+        """
+        Runs on the event loop:
+        - Run business logic (_process_message)
+        - On success → hand the receipt to the acknowledger (batched delete)
+        - On error → re-raise (so worker does NOT delete and SQS will redeliver)
+        """
+        try:
+            await self._process_message(summary)
+        except Exception:
+            self._stats.failed += 1
+            raise
+        self._stats.processed += 1
+        self._ack(receipt)
 
+    async def _process_message(self, summary: MessageSummary) -> None:
+        """Save a decoded message into the database."""
         async with self._sessionmaker() as session:
             try:
-                await ensure_client(session, int(summary.client_id))
-                await ensure_device(session, int(summary.device_id), int(summary.client_id))
+                entity = (int(summary.device_id), int(summary.client_id))
+                await self._entities.ensure(session, *entity)
 
                 saved = await save_message(session, summary=summary)
 
-                message_dict = summary.as_dict()
-                message_dict.update({
-                    "id": str(saved.id),
-                    "payload": saved.payload,
-                })
-
-                try:
-                    r = await get_redis()
-                    await mirror_message_to_redis(r, message_dict)
-                except Exception:
-                    logger.exception("Redis mirror failed; continuing without blocking.")
+                await self._mirror([_mirror_dict(summary, saved.id)])
 
                 logger.info(
                     "Saved message id=%s | device=%s client=%s sensor=%s value=%s%s time=%s",
@@ -206,8 +654,88 @@ class SQSConsumer:
                 )
             except IntegrityError:
                 await session.rollback()
+                self._entities.discard([entity])
                 logger.exception(
                     "FK/constraint error when saving message | device=%s client=%s",
                     summary.device_id, summary.client_id
                 )
-                raise
\ No newline at end of file
+                raise
+            except SQLAlchemyError:
+                self._entities.discard([entity])
+                raise
+
+    async def _mirror(self, messages: List[dict]) -> None:
+        """Mirror saved messages to Redis: queued in the write-behind buffer, or one pipeline now."""
+        if self._mirror_buffer is not None:
+            self._mirror_buffer.add(messages)
+            return
+        try:
+            r = await get_redis()
+            await mirror_messages_to_redis(r, messages)
+        except Exception:
+            logger.exception("Redis mirror failed; continuing without blocking.")
+
+    async def _process_batch(self, items: List[Tuple[str, MessageSummary]]) -> List[str]:
+        """
+        Upsert and insert a batch of decoded messages in a single transaction.
+
+        Clients/devices are ensured per message (a failure only drops that message),
+        then all rows go in with one multi-row INSERT ... RETURNING (or COPY). If that insert
+        fails, each message is retried in its own SAVEPOINT so only the offending
+        ones are left out. Returns the receipts of the messages that were committed.
+        """
+        if not items:
+            return []
+
+        staged: List[Tuple[str, MessageSummary]] = []
+        saved: List[Tuple[str, MessageSummary, int]] = []
+        async with self._sessionmaker() as session:
+            for receipt, summary in items:
+                entity = None
+                try:
+                    entity = (int(summary.device_id), int(summary.client_id))
+                    await self._entities.ensure(session, *entity)
+                except (SQLAlchemyError, ValueError):
+                    if entity is not None:
+                        self._entities.discard([entity])
+                    logger.exception(
+                        "Failed to stage message in batch; leaving it in the queue | device=%s client=%s",
+                        summary.device_id, summary.client_id
+                    )
+                    continue
+                staged.append((receipt, summary))
+
+            bulk_insert = copy_messages if self.batch_copy else save_messages
+            try:
+                started = time.perf_counter()
+                async with session.begin_nested():
+                    rows = await bulk_insert(session, [summary for _, summary in staged], commit=False)
+                self._stats.bulk_rows += len(rows)
+                self._stats.bulk_seconds += time.perf_counter() - started
+                saved = [(receipt, summary, row.id) for (receipt, summary), row in zip(staged, rows)]
+            except Exception:
+                logger.warning("Bulk insert of %d messages failed; inserting them one by one.", len(staged))
+                for receipt, summary in staged:
+                    try:
+                        async with session.begin_nested():
+                            row = await save_message(session, summary=summary, commit=False)
+                    except (SQLAlchemyError, ValueError):
+                        logger.exception(
+                            "Failed to stage message in batch; leaving it in the queue | device=%s client=%s",
+                            summary.device_id, summary.client_id
+                        )
+                        continue
+                    saved.append((receipt, summary, row.id))
+
+            try:
+                await session.commit()
+            except SQLAlchemyError:
+                self._entities.discard(
+                    (int(summary.device_id), int(summary.client_id)) for _, summary in staged
+                )
+                raise
+
+        await self._mirror([_mirror_dict(summary, message_id) for _, summary, message_id in saved])
+
+        logger.info("Saved batch of %d/%d messages in one transaction", len(saved), len(items))
+        return [receipt for receipt, _, _ in saved]
@@ -0,0 +1,91 @@
+"""
+Messages/sec per core of SQS body decoding: the previous path (json.loads
+attempt, ET.fromstring, seven namespaced findtext calls) versus the current
+one (codec selection by attribute or first byte, one parse, single-pass
+extraction), as done by the consumer's IngestDecoder.
+
+Payload sizes: the bare message, and messages whose Body carries extra
+elements (diagnostics, firmware blobs) to reach roughly 1 KiB and 8 KiB.
+
+    python -m benchmarks.bench_message_decoder --seconds 1
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict
+from xml.etree import ElementTree as ET
+
+from app.models.messageSummary import NS, MessageSummary
+from app.sqs.codecs import IngestDecoder
+
+HEADER = (
+    '<Message xmlns="urn:example:device-message">'
+    "<Header><MessageID>4c6e1f0a-1b2c-4d5e-8f90-123456789abc</MessageID><DeviceID>10423</DeviceID>"
+    "<ClientID>77</ClientID><Timestamp>2025-09-03T14:30:00Z</Timestamp></Header>"
+    "<Body><Sensor>temperature</Sensor><Value>21.5</Value><Unit>C</Unit>{extra}</Body>"
+    "</Message>"
+)
+
+
+def payload(size: int) -> str:
+    xml = HEADER.format(extra="")
+    extra = []
+    while len(xml) + sum(map(len, extra)) < size:
+        extra.append(f"<Diagnostic code=\"{len(extra)}\">battery=98;rssi=-61;fw=2.4.{len(extra)}</Diagnostic>")
+    return HEADER.format(extra="".join(extra))
+
+
+def previous(body_str: str) -> MessageSummary:
+    """The decoder as it was: JSON attempt, parse, then one findtext per field."""
+    try:
+        body = json.loads(body_str)
+    except json.JSONDecodeError:
+        body = {"xml": body_str, "parsed": ET.fromstring(body_str)}
+    parsed = body["parsed"]
+    ts_str = parsed.findtext("x:Header/x:Timestamp", namespaces=NS)
+    ts_eu = datetime.fromisoformat(ts_str.replace("Z", "+00:00")).strftime("%d.%m.%Y %H:%M:%S") if ts_str else None
+    return MessageSummary(
+        message_id=parsed.findtext("x:Header/x:MessageID", namespaces=NS),
+        device_id=parsed.findtext("x:Header/x:DeviceID", namespaces=NS),
+        client_id=parsed.findtext("x:Header/x:ClientID", namespaces=NS),
+        sensor=parsed.findtext("x:Body/x:Sensor", namespaces=NS),
+        value=parsed.findtext("x:Body/x:Value", namespaces=NS),
+        unit=parsed.findtext("x:Body/x:Unit", namespaces=NS),
+        timestamp=ts_eu or "",
+    )
+
+
+_decoder = IngestDecoder()
+
+
+def current(body_str: str) -> MessageSummary:
+    return _decoder.decode({"Body": body_str})
+
+
+def rate(decode: Callable[[str], MessageSummary], body: str, seconds: float) -> float:
+    done = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(200):
+            decode(body)
+        done += 200
+    return done / (time.perf_counter() - started)
+
+
+def main(args: argparse.Namespace) -> None:
+    sizes: Dict[str, str] = {"bare": payload(0), "1KiB": payload(1024), "8KiB": payload(8192)}
+    print("decoder throughput, one core (messages/sec)")
+    for label, body in sizes.items():
+        assert previous(body) == current(body)
+        old = rate(previous, body, args.seconds)
+        new = rate(current, body, args.seconds)
+        print(f"  {label:5} ({len(body):5d} B): previous {old:9.0f}  current {new:9.0f}  ({new / old:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the SQS body decoders.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per decoder and payload")
+    main(parser.parse_args())
@@ -0,0 +1,139 @@
+"""
+Query plans and latencies of the /messages query paths, before and after the
+message indexes (alembic revision 3f1c9a7d2b64).
+
+Seeds a PostgreSQL database with synthetic messages, then for each phase
+(without / with the indexes) prints the EXPLAIN (ANALYZE, BUFFERS) plan of
+every query and its median / p95 latency.
+
+Run it against a scratch database; it drops and recreates the indexes:
+    python -m benchmarks.bench_message_indexes --database-url postgresql+asyncpg://u:p@localhost/bench --rows 2000000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from app.models.base import Base
+from app.models.message_model import Message
+
+INDEXES = {
+    "ix_messages_device_ts_id": "CREATE INDEX ix_messages_device_ts_id ON messages (device_id, timestamp, id)",
+    "ix_messages_timestamp_brin": "CREATE INDEX ix_messages_timestamp_brin ON messages USING brin (timestamp)",
+    "ix_messages_client_id": "CREATE INDEX ix_messages_client_id ON messages (client_id)",
+}
+
+# (name, SQL) pairs mirroring what GET /messages issues
+QUERIES: List[Tuple[str, str]] = [
+    (
+        "device page (offset 0)",
+        "SELECT * FROM messages WHERE timestamp > :since AND device_id = :device "
+        "ORDER BY timestamp, id LIMIT 51",
+    ),
+    (
+        "device page (keyset)",
+        "SELECT * FROM messages WHERE timestamp > :since AND device_id = :device "
+        "AND (timestamp, id) > (:cursor_ts, 0) ORDER BY timestamp, id LIMIT 51",
+    ),
+    (
+        "device total",
+        "SELECT count(*) FROM messages WHERE timestamp > :since AND device_id = :device",
+    ),
+    (
+        "time range total",
+        "SELECT count(*) FROM messages WHERE timestamp > :recent",
+    ),
+    (
+        "client messages",
+        "SELECT * FROM messages WHERE client_id = :client ORDER BY id DESC LIMIT 50",
+    ),
+]
+
+
+async def seed(conn: AsyncConnection, rows: int, devices: int, clients: int) -> None:
+    """Create the table if needed and fill it with `rows` time-ordered messages (one per second)."""
+    await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=[Message.__table__]))
+    await conn.execute(text("TRUNCATE messages"))
+    await conn.execute(
+        text(
+            "INSERT INTO messages (device_id, client_id, sensor, value, unit, timestamp, payload) "
+            "SELECT g % :devices + 1, (g % :devices) % :clients + 1, 'temp', (random() * 100)::text, 'C', "
+            "now() - make_interval(secs => :rows - g), 'bench' "
+            "FROM generate_series(1, :rows) AS g"
+        ),
+        {"rows": rows, "devices": devices, "clients": clients},
+    )
+
+
+async def set_indexes(conn: AsyncConnection, enabled: bool) -> None:
+    for name, ddl in INDEXES.items():
+        await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        if enabled:
+            await conn.execute(text(ddl))
+    await conn.execute(text("ANALYZE messages"))
+
+
+async def run_phase(conn: AsyncConnection, params: Dict[str, object], repeat: int) -> Dict[str, Tuple[float, float]]:
+    """Print each query's plan and return {query: (median ms, p95 ms)}."""
+    timings = {}
+    for name, sql in QUERIES:
+        plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        print(f"\n--- {name}")
+        print("\n".join(row[0] for row in plan))
+
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await conn.execute(text(sql), params)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        timings[name] = (statistics.median(samples), samples[int(0.95 * (len(samples) - 1))])
+    return timings
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.database_url)
+    now = datetime.now(timezone.utc)
+    params = {
+        "since": now - timedelta(seconds=args.rows),
+        "cursor_ts": now - timedelta(seconds=args.rows // 2),
+        "recent": now - timedelta(hours=1),
+        "device": args.devices // 2,
+        "client": args.clients // 2,
+    }
+    try:
+        async with engine.begin() as conn:
+            if not args.skip_seed:
+                started = time.perf_counter()
+                await seed(conn, args.rows, args.devices, args.clients)
+                print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        results = {}
+        for phase, enabled in (("before", False), ("after", True)):
+            async with engine.begin() as conn:
+                await set_indexes(conn, enabled)
+                print(f"\n===== {phase}: indexes {'on' if enabled else 'off'} =====")
+                results[phase] = await run_phase(conn, params, args.repeat)
+    finally:
+        await engine.dispose()
+
+    print(f"\n{'query':<26}{'before p50/p95 ms':>22}{'after p50/p95 ms':>22}")
+    for name, _ in QUERIES:
+        (b50, b95), (a50, a95) = results["before"][name], results["after"][name]
+        print(f"{name:<26}{b50:>12.2f} /{b95:>8.2f}{a50:>12.2f} /{a95:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the messages indexes on a seeded PostgreSQL database.")
+    parser.add_argument("--database-url", required=True, help="postgresql+asyncpg URL of a scratch database")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20, help="timed executions per query")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the rows already in the table")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""
+Requests/sec of GET /messages pages: the previous ORM + pydantic path versus
+the column-row + raw JSON path now used by app/controllers/message_controller.py.
+
+Both handlers run in-process (httpx ASGITransport, no network) against the
+same seeded SQLite database and return identical bodies, so the difference is
+the ORM/validation/serialization work per page.
+
+    python -m benchmarks.bench_message_serialization --rows 500 --requests 300
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import Response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.helpers.fast_json import dumps
+from app.models.base import Base
+from app.models.message_model import Message
+from app.models.message_schema import MessageResponse, PaginatedMessages
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+COLUMNS = [getattr(Message, name) for name in MessageResponse.model_fields]
+FIELDS = list(MessageResponse.model_fields)
+
+app = FastAPI()
+
+
+async def get_session():
+    async with Session() as session:
+        yield session
+
+
+@app.get("/orm", response_model=PaginatedMessages)
+async def orm_page(limit: int, db: AsyncSession = Depends(get_session)):
+    rows = (await db.execute(select(Message).order_by(Message.timestamp, Message.id).limit(limit))).scalars().all()
+    return PaginatedMessages(
+        total=None, total_mode="none", limit=limit, offset=0, has_more=False, next_cursor=None,
+        items=[MessageResponse.model_validate(m) for m in rows],
+    )
+
+
+@app.get("/fast", response_model=PaginatedMessages)
+async def fast_page(limit: int, db: AsyncSession = Depends(get_session)):
+    rows = (await db.execute(select(*COLUMNS).order_by(Message.timestamp, Message.id).limit(limit))).all()
+    body = {
+        "total": None, "total_mode": "none", "limit": limit, "offset": 0, "has_more": False, "next_cursor": None,
+        "items": [dict(zip(FIELDS, row)) for row in rows],
+    }
+    return Response(content=dumps(body), media_type="application/json")
+
+
+async def seed(rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    async with Session() as session:
+        session.add_all(
+            Message(device_id=i % 50, client_id=i % 5, sensor="temp", value=f"{i % 40}.5", unit="C",
+                    timestamp=t0 + timedelta(seconds=i), payload="saved from consumer")
+            for i in range(rows)
+        )
+        await session.commit()
+
+
+async def measure(client: AsyncClient, path: str, limit: int, requests: int) -> tuple[float, bytes]:
+    body = (await client.get(path, params={"limit": limit})).content  # warm-up
+    started = time.perf_counter()
+    for _ in range(requests):
+        await client.get(path, params={"limit": limit})
+    return requests / (time.perf_counter() - started), body
+
+
+async def main(args: argparse.Namespace) -> None:
+    await seed(args.rows)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        orm_rps, orm_body = await measure(client, "/orm", args.rows, args.requests)
+        fast_rps, fast_body = await measure(client, "/fast", args.rows, args.requests)
+    await engine.dispose()
+
+    print(f"page size {args.rows}, {args.requests} requests each")
+    print(f"  orm + pydantic : {orm_rps:8.1f} req/s")
+    print(f"  rows + raw json: {fast_rps:8.1f} req/s  ({fast_rps / orm_rps:.2f}x)")
+    print(f"  identical bodies: {orm_body == fast_body}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the /messages serialization paths.")
+    parser.add_argument("--rows", type=int, default=500, help="rows per page")
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+Size and decode cost of each Redis mirror codec (app/helpers/mirror_codec.py).
+
+Always reported, no Redis needed:
+- bytes per encoded entry
+- decode + /latest item building time for a full page
+
+With --redis-url (a scratch Redis database; its latest:* keys are overwritten):
+- MEMORY USAGE of a stream of --entries entries, per entry
+- GET /messages/latest latency, in-process through the real app
+
+    python -m benchmarks.bench_mirror_codec --entries 1000 --redis-url redis://localhost:6379/15
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+from app.controllers.message_controller import _latest_item
+from app.helpers.latest_store import LATEST_STREAM_KEY, push_latest
+from app.helpers.mirror_codec import codec_available, decode_message, encode_message
+
+CODECS = ("json", "tuple", "msgpack")
+
+
+def sample(i: int) -> dict:
+    return {
+        "message_id": f"msg-{i:08d}", "device_id": str(1000 + i % 50), "client_id": str(i % 5),
+        "sensor": "temperature", "value": f"{i % 40}.5", "unit": "C",
+        "timestamp": "01.01.2025 10:00:00", "id": str(i), "payload": "saved from consumer",
+    }
+
+
+def decode_page(encoded: list, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        [_latest_item(decode_message(raw)) for raw in encoded]
+    return (time.perf_counter() - started) / rounds
+
+
+async def redis_numbers(url: str, codec: str, messages: list, requests: int) -> tuple[float, float]:
+    import redis.asyncio as redis
+    from httpx import ASGITransport, AsyncClient
+
+    from app.helpers import redis_client
+    from main import app
+
+    r = redis.Redis.from_url(url)
+    await r.delete(*(await r.keys("latest:stream*")) or [LATEST_STREAM_KEY])
+    for start in range(0, len(messages), 500):
+        await push_latest(r, messages[start:start + 500], backend="stream", max_len=len(messages), codec=codec)
+    per_entry = await r.memory_usage(LATEST_STREAM_KEY) / len(messages)
+    await r.aclose()
+
+    redis_client.settings.REDIS_URL = url
+    redis_client.settings.REDIS_LATEST_BACKEND = "stream"
+    redis_client.settings.REDIS_MAX_MESSAGES = len(messages)
+    await redis_client.close_redis()
+    redis_client.init_redis()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/messages/latest")  # warm-up
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/messages/latest")
+        latency = (time.perf_counter() - started) / requests
+    await redis_client.close_redis()
+    return per_entry, latency
+
+
+async def main(args: argparse.Namespace) -> None:
+    messages = [sample(i) for i in range(args.entries)]
+    print(f"{args.entries} entries")
+    for codec in CODECS:
+        if not codec_available(codec):
+            print(f"  {codec:8}: not available (optional dependency missing)")
+            continue
+        encoded = [encode_message(m, codec) for m in messages]
+        size = sum(map(len, encoded)) / len(encoded)
+        decode_ms = decode_page(encoded, args.rounds) * 1000
+        line = f"  {codec:8}: {size:6.1f} B/entry encoded, decode page {decode_ms:7.2f} ms"
+        if args.redis_url:
+            per_entry, latency = await redis_numbers(args.redis_url, codec, messages, args.requests)
+            line += f", redis {per_entry:6.1f} B/entry, /latest {latency * 1000:7.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the Redis mirror codecs.")
+    parser.add_argument("--entries", type=int, default=1000, help="entries in the stream / page")
+    parser.add_argument("--rounds", type=int, default=50, help="decode rounds per codec")
+    parser.add_argument("--requests", type=int, default=100, help="timed /messages/latest requests per codec")
+    parser.add_argument("--redis-url", default=None, help="scratch Redis for memory and endpoint numbers")
+    asyncio.run(main(parser.parse_args()))
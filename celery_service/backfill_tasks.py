@@ -0,0 +1,23 @@
+"""One-off maintenance tasks for data written before a schema change."""
+import asyncio
+import logging
+from dataclasses import asdict
+
+from celery_service.config import celery
+from celery_service.database import run_job
+from app.config.settings import get_settings
+from app.helpers.message_backfill import backfill_columns
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(name="backfill_message_columns")
+def backfill_message_columns(max_batches=None):
+    settings = get_settings()
+    # No surrounding transaction: backfill_columns commits after every batch.
+    report = asyncio.run(run_job(
+        lambda conn: backfill_columns(conn, batch_size=settings.MESSAGES_BACKFILL_BATCH_SIZE, max_batches=max_batches),
+        transaction=False,
+    ))
+    logger.info("Message column backfill: %s", report)
+    return asdict(report)
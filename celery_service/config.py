@@ -1,15 +1,29 @@
 from celery import Celery
+from celery.schedules import crontab
 
 celery = Celery(main="sqs_task", broker="redis://localhost:6379/0" , backend="redis://localhost:6379/1")
 celery.conf.update(
     task_track_started=True,         
     result_expires=3600,             
     result_extended=True,            
+    imports=("celery_service.partition_tasks", "celery_service.backfill_tasks", "celery_service.rollup_tasks"),
 )
 
 celery.conf.beat_schedule = {
     "beat-every-2s": {
         "task": "emit",
         "schedule": 2,
-        }
+        },
+    "ensure-message-partitions": {
+        "task": "ensure_message_partitions",
+        "schedule": crontab(minute=5),
+    },
+    "apply-message-retention": {
+        "task": "apply_message_retention",
+        "schedule": crontab(hour=3, minute=15),
+    },
+    "refresh-message-rollups": {
+        "task": "refresh_message_rollups",
+        "schedule": 60,
+    },
 }
\ No newline at end of file
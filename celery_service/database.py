@@ -0,0 +1,23 @@
+"""Database access for the async jobs run by Celery tasks."""
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config.settings import get_settings
+
+
+async def run_job(job, *, transaction=True):
+    """
+    Await `job(conn)` on a fresh engine; every task gets its own event loop via asyncio.run.
+
+    With transaction=True the job runs in one transaction (committed on success);
+    otherwise it gets a plain connection and commits on its own, e.g. per batch.
+    """
+    engine = create_async_engine(get_settings().DATABASE_URL, poolclass=NullPool)
+    try:
+        if transaction:
+            async with engine.begin() as conn:
+                return await job(conn)
+        async with engine.connect() as conn:
+            return await job(conn)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,34 @@
+"""Beat tasks that maintain the partitions of the messages table."""
+import asyncio
+import logging
+
+from celery_service.config import celery
+from celery_service.database import run_job
+from app.config.settings import get_settings
+from app.helpers.partitions import apply_retention, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(name="ensure_message_partitions")
+def ensure_message_partitions():
+    settings = get_settings()
+    created = asyncio.run(run_job(lambda conn: ensure_partitions(
+        conn,
+        interval=settings.MESSAGES_PARTITION_INTERVAL,
+        ahead=settings.MESSAGES_PARTITIONS_AHEAD,
+    )))
+    logger.info("Message partitions created: %s", created or "none")
+    return created
+
+
+@celery.task(name="apply_message_retention")
+def apply_message_retention():
+    settings = get_settings()
+    expired = asyncio.run(run_job(lambda conn: apply_retention(
+        conn,
+        keep_days=settings.MESSAGES_RETENTION_DAYS,
+        mode=settings.MESSAGES_RETENTION_MODE,
+    )))
+    logger.info("Message partitions retired: %s", expired or "none")
+    return expired
@@ -0,0 +1,38 @@
+"""Tasks that maintain the per-minute/per-hour message rollups."""
+import asyncio
+import logging
+from dataclasses import asdict
+from datetime import datetime
+
+from celery_service.config import celery
+from celery_service.database import run_job
+from app.config.settings import get_settings
+from app.helpers.message_rollups import rebuild_rollups, refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(name="refresh_message_rollups")
+def refresh_message_rollups():
+    settings = get_settings()
+    report = asyncio.run(run_job(lambda conn: refresh_rollups(
+        conn,
+        batch_size=settings.MESSAGES_ROLLUP_BATCH_SIZE,
+        settle_seconds=settings.MESSAGES_ROLLUP_SETTLE_SECONDS,
+    )))
+    logger.info("Message rollups refreshed: %s", report)
+    return asdict(report)
+
+
+@celery.task(name="reconcile_message_rollups")
+def reconcile_message_rollups(since, until, device_id=None, sensor=None):
+    """Rebuild the rollup buckets of [since, until] (ISO 8601) from the messages table."""
+    rebuilt = asyncio.run(run_job(lambda conn: rebuild_rollups(
+        conn,
+        since=datetime.fromisoformat(since),
+        until=datetime.fromisoformat(until),
+        device_id=device_id,
+        sensor=sensor,
+    )))
+    logger.info("Message rollups rebuilt for [%s, %s]: %s", since, until, rebuilt)
+    return rebuilt
@@ -1,12 +1,15 @@
 import asyncio
 import logging
+import os
 
 import pytest
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from app.models.base import Base
+from app.models.message_model import Message
 from app.helpers.database import get_db
 from main import app
 
@@ -67,3 +70,37 @@ async def client(async_session: AsyncSession):
         yield ac
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+async def pg_engine():
+    """
+    A PostgreSQL engine for the code paths SQLite cannot exercise (partitions,
+    COPY, date_bin...). Skipped unless TEST_POSTGRES_URL points at a scratch
+    database (postgresql+asyncpg://...); every table in it is dropped.
+
+    The schema is rebuilt for every test, with `messages` partitioned by
+    timestamp as alembic revision 9b2e4c1f7a35 leaves it (default partition only).
+    """
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS messages CASCADE"))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("ALTER TABLE messages RENAME TO messages_plain"))
+        for index in Message.__table__.indexes:
+            await conn.execute(text(f"DROP INDEX {index.name}"))
+        await conn.execute(text(
+            "CREATE TABLE messages (LIKE messages_plain INCLUDING DEFAULTS, PRIMARY KEY (id, timestamp)) "
+            "PARTITION BY RANGE (timestamp)"
+        ))
+        await conn.execute(text("CREATE TABLE messages_default PARTITION OF messages DEFAULT"))
+        await conn.execute(text("ALTER SEQUENCE messages_id_seq OWNED BY messages.id"))
+        await conn.execute(text("DROP TABLE messages_plain"))
+        for index in Message.__table__.indexes:
+            await conn.run_sync(index.create)
+    yield engine
+    await engine.dispose()
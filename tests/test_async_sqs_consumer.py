@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import uuid
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.sqs.async_consumer import AsyncSQSConsumer
+
+
+@pytest.fixture
+def sqs_env(monkeypatch):
+    """
+    Moto-backed queue plus the environment AsyncSQSConsumer reads its settings from.
+    """
+    with mock_aws():
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        queue_url = sqs.create_queue(QueueName=f"async-{uuid.uuid4().hex}")["QueueUrl"]
+
+        monkeypatch.setenv("SQS_QUEUE_URL", queue_url)
+        monkeypatch.setenv("SQS_ENDPOINT_URL", "https://sqs.us-east-1.amazonaws.com")
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setenv("SQS_WAIT_TIME_SECONDS", "1")
+        monkeypatch.setenv("SQS_POLL_INTERVAL", "0.05")
+        monkeypatch.setenv("SQS_ACK_MAX_DELAY_MS", "20")
+        monkeypatch.setenv("SQS_ENGINE", "asyncio")
+        monkeypatch.setenv("SQS_ASYNC_CONCURRENCY", "2")
+        yield sqs, queue_url
+
+
+def _remaining(sqs, queue_url):
+    attrs = sqs.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+    )["Attributes"]
+    return int(attrs["ApproximateNumberOfMessages"]) + int(attrs["ApproximateNumberOfMessagesNotVisible"])
+
+
+@pytest.mark.asyncio
+async def test_processes_on_event_loop_with_bounded_concurrency(sqs_env, monkeypatch):
+    """
+    Messages are processed on the loop thread, never more than SQS_ASYNC_CONCURRENCY at once,
+    and acknowledged so the queue drains.
+    """
+    from app.config.settings import get_settings
+
+    sqs, queue_url = sqs_env
+    for i in range(6):
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1, "value": i}))
+
+    loop_thread = threading.current_thread()
+    threads, running, peak = set(), [0], [0]
+
+    async def slow_process(self, body):
+        threads.add(threading.current_thread())
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.05)
+        running[0] -= 1
+
+    monkeypatch.setattr(AsyncSQSConsumer, "_process_message", slow_process, raising=True)
+
+    consumer = AsyncSQSConsumer(get_settings(), sessionmaker=None)
+    await consumer.start()
+    await asyncio.sleep(1.0)
+    await consumer.shutdown()
+
+    assert threads == {loop_thread}
+    assert peak[0] == 2
+    assert _remaining(sqs, queue_url) == 0
+
+    metrics = consumer.metrics()
+    assert metrics["engine"] == "asyncio"
+    assert metrics["processed"] == 6
+    assert metrics["ack"]["acked"] == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_messages_are_not_acknowledged(sqs_env, monkeypatch):
+    from app.config.settings import get_settings
+
+    sqs, queue_url = sqs_env
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1, "value": "boom"}))
+
+    async def failing_process(self, body):
+        raise ValueError("device_id/client_id not found")
+
+    monkeypatch.setattr(AsyncSQSConsumer, "_process_message", failing_process, raising=True)
+
+    consumer = AsyncSQSConsumer(get_settings(), sessionmaker=None)
+    await consumer.start()
+    await asyncio.sleep(0.5)
+    await consumer.shutdown()
+
+    assert consumer.metrics()["failed"] >= 1
+    assert consumer.metrics()["ack"]["acked"] == 0
+    assert _remaining(sqs, queue_url) == 1
+
+
+def test_builds_only_the_io_pool(sqs_env, monkeypatch):
+    """The asyncio engine creates its small boto3 pool instead of the per-message worker pool."""
+    import app.sqs.async_consumer as async_module
+    import app.sqs.sqs_consumer as sync_module
+    from app.config.settings import get_settings
+
+    monkeypatch.setenv("SQS_ASYNC_IO_THREADS", "3")
+    created = []
+
+    class RecordingExecutor(async_module.ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(async_module, "ThreadPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(sync_module, "ThreadPoolExecutor", RecordingExecutor)
+
+    consumer = AsyncSQSConsumer(get_settings(), sessionmaker=None)
+
+    assert created == [consumer._executor]
+    assert consumer._executor._max_workers == 3
+    assert consumer._executor._thread_name_prefix == "sqs-io"
+    consumer._executor.shutdown()
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.helpers.bulk_loader import copy_messages, load_messages, read_summaries
+from app.models.message_model import Message
+from app.sqs.codecs import DecodeError
+
+XML = (
+    '<Message xmlns="urn:example:device-message"><Header><MessageID>{mid}</MessageID>'
+    "<DeviceID>{device}</DeviceID><ClientID>80</ClientID></Header>"
+    "<Body><Sensor>temp</Sensor><Value>{value}</Value><Unit>C</Unit></Body></Message>"
+)
+
+
+@pytest.mark.asyncio
+async def test_load_messages_from_xml_and_json_lines(async_engine, tmp_path):
+    path = tmp_path / "messages.txt"
+    lines = [XML.format(mid=f"x{i}", device=8000 + i, value=i) for i in range(5)]
+    lines += [json.dumps({"device_id": 8100 + i, "client_id": 81, "sensor": "hum", "value": i}) for i in range(4)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    sessionmaker = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    report = await load_messages(sessionmaker, read_summaries(str(path)), batch_size=4)
+
+    assert (report.rows, report.batches) == (9, 3)
+    assert report.rows_per_sec > 0
+    async with sessionmaker() as session:
+        count = await session.scalar(
+            select(func.count()).select_from(Message).where(Message.device_id.between(8000, 8199))
+        )
+    assert count == 9
+
+
+@pytest.mark.asyncio
+async def test_copy_messages_falls_back_to_insert_returning_on_sqlite(async_session, tmp_path):
+    path = tmp_path / "one.txt"
+    path.write_text(json.dumps({"device_id": 8200, "client_id": 82, "value": 3.5}) + "\n", encoding="utf-8")
+
+    saved = await copy_messages(async_session, read_summaries(str(path)))
+
+    row = await async_session.get(Message, saved[0].id)
+    assert (row.device_id, row.value) == (8200, "3.5")
+
+
+def test_read_summaries_decodes_with_the_ingest_codecs(tmp_path):
+    path = tmp_path / "mixed.txt"
+    path.write_text(
+        json.dumps({"message_id": "j1", "device_id": 8300, "client_id": 83, "value": 1.5,
+                    "timestamp": "2025-01-01T11:00:00+02:00"}) + "\n"
+        + json.dumps({"device_id": "x", "client_id": 83}) + "\n",
+        encoding="utf-8",
+    )
+
+    summaries = read_summaries(str(path))
+    first = next(summaries)
+    assert (first.message_id, first.device_id, first.value) == ("j1", "8300", "1.5")
+    assert first.event_time.isoformat() == "2025-01-01T11:00:00+02:00"
+    with pytest.raises(DecodeError, match="mixed.txt:2"):
+        next(summaries)
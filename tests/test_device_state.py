@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from app.helpers.device_state import DEVICE_STATE_KEY, _epoch_ms, event_ms, queue_device_state
+from app.models.messageSummary import MessageSummary
+from app.sqs.sqs_consumer import _mirror_dict
+from app.helpers.redis_client import get_redis
+from main import app
+
+
+class FakePipeline:
+    """Records queued state-script calls and HGETALLs."""
+
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.scripts = []
+        self.queued = []
+
+    def register_script(self, script):
+        async def call(keys, args, client):
+            self.scripts.append((list(keys), list(args)))
+        return call
+
+    def hgetall(self, key):
+        self.queued.append(key)
+
+    async def execute(self):
+        return [self.hashes.get(key, {}) for key in self.queued]
+
+
+class FakeRedis:
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.hashes)
+
+    async def hgetall(self, key):
+        return self.hashes.get(key, {})
+
+
+def _reading(value, ts, message_id):
+    return json.dumps({"value": value, "unit": "C", "timestamp": ts, "message_id": message_id, "ts": _epoch_ms(ts)})
+
+
+def test_epoch_ms_parses_device_timestamps():
+    assert _epoch_ms("01.01.1970 00:00:01") == 1000
+    assert _epoch_ms("") == 0
+    assert _epoch_ms(None) == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_device_state_sends_one_script_call_per_batch():
+    pipe = FakePipeline({})
+    messages = [
+        {"id": "1", "device_id": "7", "sensor": "temp", "value": "20", "unit": "C", "timestamp": "01.01.2025 10:00:00"},
+        {"id": "2", "device_id": "8", "sensor": None, "value": "1", "unit": "", "timestamp": ""},
+    ]
+
+    await queue_device_state(pipe, messages)
+
+    assert len(pipe.scripts) == 1
+    keys, args = pipe.scripts[0]
+    assert keys == [DEVICE_STATE_KEY.format(7), DEVICE_STATE_KEY.format(8)]
+    assert args[:3] == ["temp", _epoch_ms("01.01.2025 10:00:00"), "1"]
+    assert args[4:7] == ["unknown", 0, "2"]
+    assert json.loads(args[3])["value"] == "20"
+
+
+@pytest.mark.asyncio
+async def test_queue_device_state_orders_by_the_aware_event_time():
+    # 11:00 at +02:00 is 09:00 UTC, earlier than 10:00 UTC although its display time is later.
+    early = MessageSummary.from_fields(
+        message_id="a", device_id="7", client_id="1", sensor="temp", value="1", unit="C",
+        timestamp="2025-01-01T11:00:00+02:00",
+    )
+    late = MessageSummary.from_fields(
+        message_id="b", device_id="7", client_id="1", sensor="temp", value="2", unit="C",
+        timestamp="2025-01-01T10:00:00Z",
+    )
+    pipe = FakePipeline({})
+
+    await queue_device_state(pipe, [_mirror_dict(early, 1), _mirror_dict(late, 2)])
+
+    _, args = pipe.scripts[0]
+    assert args[1] == event_ms(early.event_time) == 1735722000000
+    assert args[5] == event_ms(late.event_time) == 1735725600000
+    assert args[1] < args[5]
+    assert event_ms(None) == 0
+
+
+@pytest.mark.anyio
+async def test_device_state_endpoints(client):
+    r = FakeRedis({
+        DEVICE_STATE_KEY.format(1): {"temp": _reading("21.5", "01.01.2025 10:00:00", "5")},
+        DEVICE_STATE_KEY.format(2): {"hum": _reading("40", "01.01.2025 10:00:01", "6")},
+    })
+    app.dependency_overrides[get_redis] = lambda: r
+
+    res = await client.get("/devices/state", params=[("device_id", 1), ("device_id", 2), ("device_id", 3)])
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == 2
+    assert body["items"][1] == {
+        "device_id": 2,
+        "sensors": {"hum": {"value": "40", "unit": "C", "timestamp": "01.01.2025 10:00:01", "message_id": "6"}},
+    }
+
+    res = await client.get("/devices/1/state")
+    assert res.status_code == 200
+    assert res.json()["sensors"]["temp"]["value"] == "21.5"
+
+    assert (await client.get("/devices/3/state")).status_code == 404
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.helpers.entity_registry import EntityRegistry
+from app.models.client_model import Client
+from app.models.device_model import Device
+
+
+@pytest.mark.asyncio
+async def test_miss_upserts_once_then_hits(async_session):
+    registry = EntityRegistry(maxsize=100, ttl=60)
+
+    await registry.ensure(async_session, 7001, 701)
+    await registry.ensure(async_session, 7001, 701)
+    await async_session.commit()
+
+    assert await async_session.scalar(select(Device.client_id).where(Device.device_id == 7001)) == 701
+    assert await async_session.scalar(select(Client.name).where(Client.client_id == 701)) == "AUTO-701"
+    metrics = registry.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["upserts"]) == (1, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_existing_rows_do_not_conflict(async_session):
+    async_session.add(Client(client_id=702, name="existing"))
+    async_session.add(Device(device_id=7002, client_id=702, name="existing"))
+    await async_session.commit()
+
+    registry = EntityRegistry(maxsize=100, ttl=60)
+    await registry.ensure(async_session, 7002, 702)
+    await async_session.commit()
+
+    count = await async_session.scalar(select(func.count()).select_from(Device).where(Device.device_id == 7002))
+    assert count == 1
+    assert await async_session.scalar(select(Device.name).where(Device.device_id == 7002)) == "existing"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_lru_bound_and_ttl(async_session):
+    async_session.add(Client(client_id=703, name="warm"))
+    async_session.add(Device(device_id=7003, client_id=703, name="warm"))
+    await async_session.commit()
+
+    registry = EntityRegistry(maxsize=2, ttl=60)
+    await registry.warm(async_session)
+    await registry.ensure(async_session, 7003, 703)
+    assert registry.metrics()["hits"] == 1
+
+    await registry.ensure(async_session, 7004, 704)
+    await registry.ensure(async_session, 7005, 705)
+    assert registry.metrics()["devices"] == 2
+    assert registry.metrics()["evictions"] > 0
+
+    expired = EntityRegistry(maxsize=10, ttl=1e-9)
+    await expired.ensure(async_session, 7003, 703)
+    await expired.ensure(async_session, 7003, 703)
+    assert expired.metrics()["misses"] == 2
+    await async_session.rollback()
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from app.sqs import codecs
+from app.sqs.codecs import DecodeError, IngestDecoder, register_codec, select_codec
+
+XML = (
+    '<Message xmlns="urn:example:device-message">'
+    "<Header><MessageID>m-1</MessageID><DeviceID>501</DeviceID>"
+    "<ClientID>50</ClientID><Timestamp>2025-09-03T14:30:00Z</Timestamp></Header>"
+    "<Body><Sensor>temp</Sensor><Value>21.5</Value><Unit>C</Unit></Body>"
+    "</Message>"
+)
+JSON = json.dumps({
+    "message_id": "m-1", "device_id": 501, "client_id": 50, "sensor": "temp",
+    "value": 21.5, "unit": "C", "timestamp": "2025-09-03T14:30:00Z",
+})
+
+
+def _attrs(content_type, version=None):
+    attrs = {"ContentType": {"DataType": "String", "StringValue": content_type}}
+    if version is not None:
+        attrs["SchemaVersion"] = {"DataType": "String", "StringValue": version}
+    return attrs
+
+
+def test_xml_and_json_decode_to_the_same_summary():
+    decoder = IngestDecoder()
+
+    from_xml = decoder.decode({"Body": XML, "MessageAttributes": _attrs("application/xml; charset=utf-8")})
+    from_json = decoder.decode({"Body": JSON})  # no attributes: sniffed
+
+    assert from_xml == from_json
+    assert from_xml.timestamp == "03.09.2025 14:30:00"
+    assert decoder.metrics()["xml/v1"]["decoded"] == 1
+    assert decoder.metrics()["json/v1"]["decoded"] == 1
+
+
+def test_undecodable_messages_are_rejected():
+    decoder = IngestDecoder()
+    for msg in (
+        {"Body": "raw-body"},
+        {"Body": "<broken"},
+        {"Body": json.dumps({"device_id": 1})},
+        {"Body": XML, "MessageAttributes": _attrs("application/xml", "2")},
+        {"Body": XML, "MessageAttributes": _attrs("text/plain")},
+    ):
+        with pytest.raises(DecodeError):
+            decoder.decode(msg)
+
+    assert decoder.rejected == 5
+    assert decoder.metrics()["unknown"]["rejected"] == 3
+
+
+def test_mistyped_fields_and_non_numeric_ids_are_rejected():
+    decoder = IngestDecoder()
+    good = json.loads(JSON)
+    for field, value in (
+        ("timestamp", 123),
+        ("sensor", ["temp"]),
+        ("value", {"v": 1}),
+        ("device_id", True),
+        ("device_id", "abc"),
+        ("client_id", 1.5),
+    ):
+        with pytest.raises(DecodeError):
+            decoder.decode({"Body": json.dumps({**good, field: value})})
+    with pytest.raises(DecodeError):
+        decoder.decode({"Body": XML.replace("<DeviceID>501</DeviceID>", "<DeviceID>dev-501</DeviceID>")})
+
+    assert decoder.metrics()["json/v1"]["rejected"] == 6
+    assert decoder.metrics()["xml/v1"]["rejected"] == 1
+    assert decoder.decode({"Body": json.dumps({**good, "device_id": "501"})}).device_id == "501"
+
+
+def test_registered_codec_is_selected_by_schema_version(monkeypatch):
+    monkeypatch.setattr(codecs, "_REGISTRY", dict(codecs._REGISTRY))
+
+    @register_codec("application/json", "2")
+    def decode_json_v2(body):
+        device, client = body.split(",")
+        return codecs.MessageSummary.from_fields(
+            message_id=None, device_id=device, client_id=client, sensor=None, value=None, unit=None, timestamp=None,
+        )
+
+    codec = select_codec("7,8", _attrs("application/json", "2"))
+    assert codec.name == "json/v2"
+    assert IngestDecoder().decode({"Body": "7,8", "MessageAttributes": _attrs("application/json", "2")}).device_id == "7"
+
+
+def test_msgpack_without_the_package_is_rejected(monkeypatch):
+    monkeypatch.setattr(codecs, "msgpack", None)
+    decoder = IngestDecoder()
+    with pytest.raises(DecodeError):
+        decoder.decode({"Body": "kQ==", "MessageAttributes": _attrs("application/msgpack")})
+    assert decoder.metrics()["msgpack/v1"]["rejected"] == 1
+
+
+def test_malformed_msgpack_payloads_are_rejected():
+    msgpack = pytest.importorskip("msgpack")
+    import base64
+
+    def body(values):
+        return base64.b64encode(msgpack.packb(values)).decode()
+
+    decoder = IngestDecoder()
+    attrs = _attrs("application/msgpack")
+    good = ["m-1", 501, 50, "temp", 21.5, "C", 1756909800]
+    summary = decoder.decode({"Body": body(good), "MessageAttributes": attrs})
+    assert (summary.device_id, summary.value, summary.timestamp) == ("501", "21.5", "03.09.2025 14:30:00")
+
+    for values in (
+        good[:6],                       # wrong arity
+        {"device_id": 501},             # not an array
+        [b"m-1", *good[1:]],            # bytes message id
+        [*good[:3], ["temp"], *good[4:]],
+        [*good[:5], 7, good[6]],        # integer unit
+        [*good[:6], "yesterday"],
+        [*good[:6], 10 ** 18],          # epoch out of range
+        [*good[:6], 1e300],
+    ):
+        with pytest.raises(DecodeError):
+            decoder.decode({"Body": body(values), "MessageAttributes": attrs})
+    with pytest.raises(DecodeError):
+        decoder.decode({"Body": "not base64!", "MessageAttributes": attrs})
+
+    assert decoder.metrics()["msgpack/v1"]["rejected"] == 9
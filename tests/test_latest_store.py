@@ -0,0 +1,126 @@
+import pytest
+from fastapi import HTTPException
+
+from app.helpers.latest_store import (
+    CLIENT_STREAM_KEY,
+    DEVICE_STREAM_KEY,
+    LATEST_STREAM_KEY,
+    push_latest,
+    read_latest,
+)
+from app.helpers.redis_client import get_redis
+from main import app
+
+
+class FakeStreams:
+    """Just enough of redis.asyncio for the stream backend: pipelined XADD, raw XRANGE/XREVRANGE."""
+
+    def __init__(self):
+        self.streams = {}
+        self.seq = 0
+        self.executes = 0
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entries = self.streams.setdefault(key, [])
+        entries.append((f"{self.seq}-0", fields))
+        del entries[:-maxlen]
+
+    async def execute(self):
+        self.executes += 1
+
+    async def execute_command(self, command, key, start, end, _, count, **options):
+        entries = self.streams.get(key, [])
+        if command == "XREVRANGE":
+            entries = list(reversed(entries))
+        else:
+            after = int(start.lstrip("(").split("-")[0])
+            entries = [e for e in entries if int(e[0].split("-")[0]) > after]
+        return [(entry_id.encode(), {k.encode(): v for k, v in fields.items()}) for entry_id, fields in entries[:count]]
+
+
+def _msg(i, device, client):
+    return {"id": str(i), "device_id": str(device), "client_id": str(client), "sensor": "temp",
+            "value": "1", "unit": "C", "timestamp": "2025-01-01T00:00:00+00:00", "payload": "saved from consumer"}
+
+
+@pytest.fixture()
+async def streams():
+    r = FakeStreams()
+    await push_latest(r, [_msg(1, 10, 1), _msg(2, 11, 1), _msg(3, 10, 1), _msg(4, 20, 2)], backend="stream", max_len=100)
+    return r
+
+
+@pytest.mark.asyncio
+async def test_push_writes_global_device_and_client_streams_in_one_pipeline(streams):
+    assert streams.executes == 1
+    assert len(streams.streams[LATEST_STREAM_KEY]) == 4
+    assert len(streams.streams[DEVICE_STREAM_KEY.format(10)]) == 2
+    assert len(streams.streams[CLIENT_STREAM_KEY.format(1)]) == 3
+
+
+@pytest.mark.asyncio
+async def test_read_latest_uses_the_narrowest_stream(streams):
+    messages, last_id = await read_latest(streams, backend="stream", limit=10, device_id=10)
+    assert [m["id"] for m in messages] == ["3", "1"]
+
+    messages, _ = await read_latest(streams, backend="stream", limit=1, client_id=1)
+    assert [m["id"] for m in messages] == ["3"]
+
+    messages, _ = await read_latest(streams, backend="stream", limit=10, device_id=10, client_id=2)
+    assert messages == []
+
+    # Entries written by another codec are read back alongside the legacy JSON ones.
+    await push_latest(streams, [_msg(5, 10, 1)], backend="stream", max_len=100, codec="tuple")
+    newer, newest_id = await read_latest(streams, backend="stream", limit=10, device_id=10, after_id=last_id)
+    assert [m["id"] for m in newer] == [5]
+    assert newest_id != last_id
+
+
+@pytest.mark.asyncio
+async def test_read_latest_rejects_bad_after_id(streams):
+    with pytest.raises(HTTPException):
+        await read_latest(streams, backend="stream", limit=10, after_id="nope")
+    with pytest.raises(HTTPException):
+        await read_latest(streams, backend="list", limit=10, after_id="1-0")
+
+
+@pytest.mark.anyio
+async def test_latest_endpoint_filters_by_device(client, streams, monkeypatch):
+    from app.helpers.redis_client import settings
+
+    monkeypatch.setattr(settings, "REDIS_LATEST_BACKEND", "stream")  # opt-in backend
+    app.dependency_overrides[get_redis] = lambda: streams
+
+    res = await client.get("/messages/latest", params={"limit": 5, "device_id": 10})
+    assert res.status_code == 200
+    body = res.json()
+    assert [item["id"] for item in body["items"]] == [3, 1]
+    assert body["last_id"] == streams.streams[DEVICE_STREAM_KEY.format(10)][-1][0]
+
+    res = await client.get("/messages/latest", params={"after_id": "bad"})
+    assert res.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["list", "stream"])
+async def test_mirror_message_without_ids(backend, monkeypatch):
+    """mirror_message_to_redis(r, message) still takes any dict (tests/test_redis.py mirrors {"hello": "world"})."""
+    from app.helpers.redis_client import mirror_message_to_redis, settings
+
+    monkeypatch.setattr(settings, "REDIS_LATEST_BACKEND", backend)
+    r = FakeStreams()
+    pushed = []
+    r.lpush = lambda key, *values: pushed.extend(values)
+    r.ltrim = lambda key, start, end: None
+
+    await mirror_message_to_redis(r, {"hello": "world"})
+
+    assert r.executes == 1
+    if backend == "stream":
+        assert list(r.streams) == [LATEST_STREAM_KEY]
+    else:
+        assert pushed == [b'{"hello":"world"}']
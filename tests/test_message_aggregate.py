@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.helpers.message_aggregate as message_aggregate
+from app.helpers.message_aggregate import reduce_series
+from app.models.message_model import Message
+
+PATH = "/messages/aggregate"
+T0 = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    async def hmget(self, key, fields):
+        h = self.hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def expire(self, key, seconds):
+        pass
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    r = FakeRedis()
+
+    async def fake_get_redis():
+        return r
+
+    monkeypatch.setattr(message_aggregate, "get_redis", fake_get_redis)
+    return r
+
+
+def test_reduce_series_numpy_and_python_agree(monkeypatch):
+    times = [0, 10, 59.5, 60, 200, 201]
+    values = [3.0, 1.0, 2.0, 7.0, -1.0, 4.0]
+    expected = [(0, 3, 1.0, 3.0, 2.0, 2.0), (60, 1, 7.0, 7.0, 7.0, 7.0), (180, 2, -1.0, 4.0, 1.5, 4.0)]
+
+    assert reduce_series(times, values, 60) == expected
+    monkeypatch.setattr(message_aggregate, "np", None)
+    assert reduce_series(times, values, 60) == expected
+    assert reduce_series([], [], 60) == []
+
+
+@pytest.mark.anyio
+async def test_aggregate_buckets_and_caches_closed_ones(client, async_session, fake_redis):
+    readings = [(0, "20"), (10, "22"), (20, "off"), (70, "30"), (75, "26"), (200, "5")]
+    async_session.add_all([
+        Message(device_id=7700, client_id=1, sensor="temp", value=v, value_num=float(v) if v != "off" else None,
+                timestamp=T0, event_time=T0 + timedelta(minutes=m), payload="p")
+        for m, v in readings
+    ] + [Message(device_id=7700, client_id=1, sensor="hum", value="99", value_num=99.0,
+                 timestamp=T0, event_time=T0, payload="p")])
+    await async_session.commit()
+    params = {"since": "01.03.2026 10:30", "until": "01.03.2026 13:30", "bucket": "1h",
+              "device_id": 7700, "sensor": "temp"}
+
+    r = await client.get(PATH, params=params)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["since"], body["until"], body["cached"]) == ("2026-03-01T10:00:00Z", "2026-03-01T14:00:00Z", 0)
+    assert [(i["bucket_start"], i["count"], i["min"], i["max"], i["avg"], i["last"]) for i in body["items"]] == [
+        ("2026-03-01T10:00:00Z", 2, 20.0, 22.0, 21.0, 22.0),
+        ("2026-03-01T11:00:00Z", 2, 26.0, 30.0, 28.0, 26.0),
+        ("2026-03-01T13:00:00Z", 1, 5.0, 5.0, 5.0, 5.0),
+    ]
+    # all four buckets are in the past: cached, the empty 12:00 one included
+    assert len(next(iter(fake_redis.hashes.values()))) == 4
+
+    again = await client.get(PATH, params=params)
+    assert again.json()["items"] == body["items"]
+    assert again.json()["cached"] == 3
+
+    # a backlogged reading for a cached bucket, ingested now: that bucket is recomputed
+    async_session.add(Message(device_id=7700, client_id=1, sensor="temp", value="40", value_num=40.0,
+                              timestamp=datetime.now(timezone.utc), event_time=T0 + timedelta(minutes=80), payload="p"))
+    await async_session.commit()
+    late = (await client.get(PATH, params=params)).json()
+    assert late["cached"] == 2
+    assert [(i["count"], i["max"]) for i in late["items"]] == [(2, 22.0), (3, 40.0), (1, 5.0)]
+    assert (await client.get(PATH, params=params)).json()["items"] == late["items"]
+
+
+@pytest.mark.anyio
+async def test_aggregate_rejects_too_many_buckets(client, fake_redis):
+    r = await client.get(PATH, params={"since": "01.01.2020", "until": "01.01.2026", "bucket": "1m"})
+    assert r.status_code == 400
+    r = await client.get(PATH, params={"since": "02.01.2026", "until": "01.01.2026"})
+    assert r.status_code == 400
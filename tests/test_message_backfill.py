@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.helpers.message_backfill import backfill_columns
+from app.helpers.message_query import apply_filters
+from app.models.message_model import Message
+
+TS = datetime(2026, 1, 5, 10, 0)
+
+
+@pytest.mark.asyncio
+async def test_backfill_fills_legacy_rows_in_batches(async_engine):
+    async with async_engine.begin() as conn:
+        await conn.execute(insert(Message), [
+            {"device_id": 9500, "client_id": 1, "value": value, "timestamp": TS, "payload": "legacy"}
+            for value in ("21.5", "on", None, "1e400", " -2 ")
+        ])
+
+    async with async_engine.connect() as conn:
+        report = await backfill_columns(conn, batch_size=2)
+        again = await backfill_columns(conn, batch_size=2)
+
+    assert report.updated >= 5 and report.batches >= 3
+    assert again.updated == 0
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(
+            select(Message.value, Message.value_num, Message.event_time)
+            .where(Message.device_id == 9500).order_by(Message.id)
+        )).all()
+    assert [r.value_num for r in rows] == [21.5, None, None, None, -2.0]
+    assert all(r.event_time == TS for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_filters_on_typed_columns(async_engine):
+    async with async_engine.begin() as conn:
+        await conn.execute(insert(Message), [
+            {"device_id": 9600, "client_id": 1, "value": str(v), "value_num": v, "timestamp": TS,
+             "event_time": datetime(2026, 1, 1, h), "payload": "p"}
+            for v, h in ((1.0, 1), (5.0, 2), (9.0, 3))
+        ])
+        stmt = apply_filters(
+            select(Message.value_num).where(Message.device_id == 9600),
+            since=datetime(2000, 1, 1),
+            event_since=datetime(2026, 1, 1, 1),
+            value_max=9.0,
+        )
+        assert (await conn.execute(stmt.order_by(Message.id))).scalars().all() == [5.0, 9.0]
+        stmt = apply_filters(select(Message.value_num), since=datetime(2000, 1, 1), device_id=9600, value_min=2, value_max=6)
+        assert (await conn.execute(stmt)).scalars().all() == [5.0]
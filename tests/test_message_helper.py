@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import select
+
+from app.helpers.message_helper import CONSUMER_PAYLOAD, save_message, save_messages
+from app.models.messageSummary import MessageSummary
+from app.models.message_model import Message
+
+
+def _summary(device_id, sensor):
+    return MessageSummary(
+        message_id=f"m-{device_id}-{sensor}", device_id=str(device_id), client_id="90",
+        timestamp=None, sensor=sensor, value="1", unit="C",
+    )
+
+
+@pytest.mark.asyncio
+async def test_save_message_returns_id_and_server_timestamp(async_session):
+    saved = await save_message(async_session, summary=_summary(9001, "temp"))
+
+    row = await async_session.get(Message, saved.id)
+    assert row.device_id == 9001
+    assert row.payload == CONSUMER_PAYLOAD
+    assert saved.timestamp is not None
+    assert row.event_time is not None  # no device time: the ingest time
+
+
+@pytest.mark.asyncio
+async def test_save_messages_returns_ids_in_input_order(async_session):
+    summaries = [_summary(9100 + i, f"s{i}") for i in range(5)]
+
+    saved = await save_messages(async_session, summaries)
+
+    assert len(saved) == 5
+    by_id = dict((await async_session.execute(
+        select(Message.id, Message.sensor).where(Message.id.in_([r.id for r in saved]))
+    )).all())
+    assert [by_id[r.id] for r in saved] == ["s0", "s1", "s2", "s3", "s4"]
+    assert await save_messages(async_session, []) == []
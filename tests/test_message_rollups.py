@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.helpers.message_aggregate import AggregateFilter, aggregate
+from app.helpers.message_rollups import read_watermark, rebuild_rollups, refresh_rollups
+from app.models.message_model import Message
+from app.models.message_rollup_model import MessageRollupHour, MessageRollupMinute, RollupWatermark
+
+T0 = datetime(2026, 4, 1, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+async def empty_rollups(async_engine):
+    """Every test starts without messages, rollups or watermark."""
+    async with async_engine.begin() as conn:
+        for table in (Message, MessageRollupMinute, MessageRollupHour, RollupWatermark):
+            await conn.execute(delete(table))
+    return async_engine
+
+
+async def _add(conn, readings, sensor="temp", event_time=True):
+    await conn.execute(insert(Message), [
+        {"device_id": 8800, "client_id": 1, "sensor": sensor, "value": str(v), "value_num": v, "timestamp": T0,
+         "event_time": T0 + timedelta(seconds=s) if event_time else None, "payload": "p"}
+        for s, v in readings
+    ])
+
+
+async def _ids(conn):
+    return (await conn.execute(select(Message.id).order_by(Message.id))).scalars().all()
+
+
+async def _hour_rows(conn):
+    return (await conn.execute(
+        select(MessageRollupHour.sensor, MessageRollupHour.count, MessageRollupHour.sum,
+               MessageRollupHour.min, MessageRollupHour.max, MessageRollupHour.last_value)
+        .order_by(MessageRollupHour.sensor, MessageRollupHour.bucket_start)
+    )).all()
+
+
+@pytest.mark.asyncio
+async def test_refresh_folds_new_messages_after_the_watermark(empty_rollups):
+    async with empty_rollups.begin() as conn:
+        await _add(conn, [(0, 4.0), (30, 2.0), (90, 6.0), (3700, 1.0)])
+        await _add(conn, [(10, 50.0)], sensor=None)
+        ids = await _ids(conn)
+
+        first = await refresh_rollups(conn, batch_size=3, settle_seconds=0)
+        second = await refresh_rollups(conn, batch_size=3, settle_seconds=0)
+        idle = await refresh_rollups(conn, batch_size=3, settle_seconds=0)
+        assert (first.from_id, first.to_id, second.to_id, idle.buckets) == (0, ids[2], ids[4], 0)
+        assert await read_watermark(conn) == ids[4]
+        minutes = (await conn.execute(select(MessageRollupMinute.count).where(MessageRollupMinute.sensor == "temp"))).scalars().all()
+        assert sorted(minutes) == [1, 1, 2]
+
+        # a later, out-of-order reading merges into the existing buckets
+        await _add(conn, [(5, 9.0)])
+        await refresh_rollups(conn, batch_size=10, settle_seconds=0)
+        assert await _hour_rows(conn) == [
+            ("", 1, 50.0, 50.0, 50.0, 50.0),
+            ("temp", 4, 21.0, 2.0, 9.0, 6.0),
+            ("temp", 1, 1.0, 1.0, 1.0, 1.0),
+        ]
+
+        # nothing ingested recently enough is skipped while it settles
+        await _add(conn, [(20, 7.0)])
+        assert (await refresh_rollups(conn, batch_size=10, settle_seconds=10**9)).buckets == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_waits_for_the_backfill(empty_rollups):
+    async with empty_rollups.begin() as conn:
+        await _add(conn, [(0, 1.0)])
+        await _add(conn, [(0, 2.0)], event_time=False)  # legacy row, not backfilled yet
+        await _add(conn, [(0, 3.0)])
+        ids = await _ids(conn)
+
+        report = await refresh_rollups(conn, batch_size=10, settle_seconds=0)
+        assert report.to_id == ids[0]
+        assert (await refresh_rollups(conn, batch_size=10, settle_seconds=0)).to_id == ids[0]
+
+        await conn.execute(update(Message).where(Message.id == ids[1]).values(event_time=T0))
+        assert (await refresh_rollups(conn, batch_size=10, settle_seconds=0)).to_id == ids[2]
+        assert [r.count for r in await _hour_rows(conn)] == [3]
+
+
+@pytest.mark.asyncio
+async def test_coarse_aggregates_come_from_rollups_plus_tail(empty_rollups, monkeypatch):
+    async with empty_rollups.begin() as conn:
+        await _add(conn, [(0, 4.0), (5, 9.0), (30, 2.0), (90, 6.0), (3700, 1.0)])
+        await refresh_rollups(conn, batch_size=10, settle_seconds=0)
+        await _add(conn, [(7300, 3.0)])  # after the watermark: not rolled up yet
+    where = AggregateFilter(device_id=8800, sensor="temp")
+    since, until, now = T0, T0 + timedelta(hours=3), T0 + timedelta(days=1)
+    monkeypatch.setenv("MESSAGES_AGGREGATE_CLOSE_DELAY", str(10**9))  # keep the cache out of it
+
+    async with empty_rollups.connect() as conn:
+        async with AsyncSession(bind=conn) as db:
+            monkeypatch.setenv("MESSAGES_ROLLUPS_ENABLED", "false")
+            raw, _ = await aggregate(db, where, since=since, until=until, bucket="1h", now=now)
+            monkeypatch.setenv("MESSAGES_ROLLUPS_ENABLED", "true")
+            rolled, _ = await aggregate(db, where, since=since, until=until, bucket="1h", now=now)
+            daily, _ = await aggregate(db, where, since=since, until=until, bucket="1d", now=now)
+
+    assert rolled == raw
+    assert [s[1:] for s in raw] == [(4, 2.0, 9.0, 5.25, 6.0), (1, 1.0, 1.0, 1.0, 1.0), (1, 3.0, 3.0, 3.0, 3.0)]
+    assert [s[1:] for s in daily] == [(6, 1.0, 9.0, 25.0 / 6, 3.0)]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_restores_buckets_from_messages(empty_rollups):
+    async with empty_rollups.begin() as conn:
+        await _add(conn, [(0, 4.0), (5, 9.0), (30, 2.0), (90, 6.0), (3700, 1.0)])
+        await _add(conn, [(10, 50.0)], sensor=None)
+        await refresh_rollups(conn, batch_size=10, settle_seconds=0)
+        before = await _hour_rows(conn)
+        await conn.execute(update(MessageRollupHour).values(count=999, max=999.0))
+
+        rebuilt = await rebuild_rollups(conn, since=T0, until=T0 + timedelta(hours=1), device_id=8800, sensor="temp")
+        assert rebuilt == {"message_rollups_1m": 2, "message_rollups_1h": 2}
+        after = await _hour_rows(conn)
+
+    # rebuilt temp buckets are exact again; the untouched "" sensor keeps the manual edit
+    assert [r for r in after if r.sensor == "temp"] == [r for r in before if r.sensor == "temp"]
+    assert [r.count for r in after if r.sensor == ""] == [999]
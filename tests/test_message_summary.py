@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+from xml.etree import ElementTree as ET
+
+from app.models.messageSummary import NS, MessageSummary, parse_number
+
+XML = (
+    '<Message xmlns="urn:example:device-message">'
+    "<Header><MessageID>m-1</MessageID><DeviceID>501</DeviceID>"
+    "<ClientID>50</ClientID><Timestamp>2025-09-03T14:30:00Z</Timestamp></Header>"
+    "<Body><Sensor>temp</Sensor><Value>21.5</Value><Unit>C</Unit><Extra>x</Extra></Body>"
+    "</Message>"
+)
+
+
+def _findtext_summary(root):
+    """The previous path-based extraction, as the reference."""
+    find = lambda path: root.findtext(path, namespaces=NS)
+    return (
+        find("x:Header/x:MessageID"), find("x:Header/x:DeviceID"), find("x:Header/x:ClientID"),
+        find("x:Body/x:Sensor"), find("x:Body/x:Value"), find("x:Body/x:Unit"),
+    )
+
+
+def test_single_pass_extraction_matches_findtext():
+    for xml in (XML, XML.replace("<Unit>C</Unit>", ""), XML.replace("<Value>21.5</Value>", "<Value/>")):
+        root = ET.fromstring(xml)
+        s = MessageSummary.from_element(root)
+        assert (s.message_id, s.device_id, s.client_id, s.sensor, s.value, s.unit) == _findtext_summary(root)
+        assert s.timestamp == "03.09.2025 14:30:00"
+        assert s.event_time == datetime(2025, 9, 3, 14, 30, tzinfo=timezone.utc)
+
+
+def test_parse_number():
+    assert parse_number("21.5") == 21.5
+    assert parse_number(" -3 ") == -3.0
+    assert parse_number("1.5e3") == 1500.0
+    assert parse_number(".5") == 0.5
+    assert parse_number("0") == 0.0
+    for value in (None, "", "on", "1,5", "nan", "inf", "0x10", "1e400", "1e-400", "1.2.3"):
+        assert parse_number(value) is None
+
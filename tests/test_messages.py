@@ -84,3 +84,183 @@ async def test_get_messages_db_error_returns_500(client, async_session: AsyncSes
     r: Response = await client.get(PATH, params={"since": cutoff.isoformat().replace("+00:00", "Z")})
     assert r.status_code == 500, r.text
     assert "database error while fetching messages" in r.json()["detail"].lower()
+
+
+async def _add_messages(db: AsyncSession, device_id: int, timestamps) -> list:
+    msgs = [
+        Message(device_id=device_id, client_id=1, timestamp=ts, payload=f"p{i}")
+        for i, ts in enumerate(timestamps)
+    ]
+    db.add_all(msgs)
+    await db.commit()
+    return msgs
+
+
+@pytest.mark.anyio
+async def test_get_messages_cursor_pages_through_equal_timestamps(client, async_session: AsyncSession):
+    """
+    Keyset pagination walks (timestamp, id) order: rows sharing a timestamp are
+    neither skipped nor repeated, and the last page has no next_cursor.
+    """
+    t0 = datetime(2030, 5, 1, 8, 0, 0, tzinfo=timezone.utc)
+    msgs = await _add_messages(async_session, 4242, [t0, t0, t0, t0 + timedelta(seconds=1), t0 + timedelta(seconds=2)])
+    params = {"since": "01.05.2030", "device_id": 4242, "limit": 2}
+
+    seen, cursor = [], None
+    for _ in range(5):
+        r: Response = await client.get(PATH, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        seen += [m["id"] for m in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [m.id for m in msgs]
+
+
+@pytest.mark.anyio
+async def test_get_messages_rejects_bad_cursor_and_cursor_with_offset(client):
+    r: Response = await client.get(PATH, params={"since": "01.05.2030", "cursor": "not-a-cursor"})
+    assert r.status_code == 400, r.text
+    assert r.json()["detail"] == "Invalid cursor"
+
+    r = await client.get(PATH, params={"since": "01.05.2030", "cursor": "abc", "offset": 5})
+    assert r.status_code == 400, r.text
+
+
+@pytest.mark.anyio
+async def test_get_messages_total_modes_and_has_more(client, async_session: AsyncSession, monkeypatch):
+    """
+    `total` follows total_mode (cached totals come from Redis); has_more comes from limit+1.
+    """
+    import app.helpers.message_query as message_query
+
+    t0 = datetime(2031, 2, 1, 9, 0, 0, tzinfo=timezone.utc)
+    await _add_messages(async_session, 4343, [t0 + timedelta(seconds=i) for i in range(3)])
+    params = {"since": "01.02.2031", "device_id": 4343, "limit": 2}
+
+    store = {}
+
+    class FakeRedis:
+        async def get(self, key):
+            return store.get(key)
+
+        async def set(self, key, value, ex=None):
+            store[key] = value
+
+    async def fake_get_redis():
+        return FakeRedis()
+
+    monkeypatch.setattr(message_query, "get_redis", fake_get_redis)
+
+    r: Response = await client.get(PATH, params={**params, "total_mode": "none"})
+    body = r.json()
+    assert (body["total"], body["total_mode"], body["has_more"]) == (None, "none", True)
+    assert len(body["items"]) == 2
+
+    for mode in ("exact", "estimated", "cached"):
+        r = await client.get(PATH, params={**params, "total_mode": mode})
+        assert r.json()["total"] == 3, mode
+    assert list(store.values()) == [3]
+
+    r = await client.get(PATH, params={**params, "cursor": body["next_cursor"], "total_mode": "none"})
+    assert r.json()["has_more"] is False
+    assert r.json()["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_get_messages_until_bounds_the_range(client, async_session: AsyncSession):
+    t0 = datetime(2032, 3, 1, 10, 0, 0, tzinfo=timezone.utc)
+    msgs = await _add_messages(async_session, 4444, [t0, t0 + timedelta(hours=1), t0 + timedelta(days=2)])
+
+    r: Response = await client.get(
+        PATH, params={"since": "01.03.2032", "until": "01.03.2032 11:00:00", "device_id": 4444}
+    )
+    assert r.status_code == 200, r.text
+    assert [m["id"] for m in r.json()["items"]] == [msgs[0].id, msgs[1].id]
+
+
+@pytest.mark.anyio
+async def test_export_streams_ndjson_and_gzipped_csv(client, async_session: AsyncSession):
+    import csv
+    import io
+    import json
+
+    t0 = datetime(2033, 4, 1, 6, 0, 0, tzinfo=timezone.utc)
+    msgs = await _add_messages(async_session, 4545, [t0 + timedelta(minutes=i) for i in range(3)])
+    params = {"since": "01.04.2033", "device_id": 4545}
+
+    r: Response = await client.get(f"{PATH}/export", params=params)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [m["id"] for m in lines] == [m.id for m in msgs]
+    assert lines[0]["device_id"] == 4545
+
+    r = await client.get(f"{PATH}/export", params={**params, "format": "csv", "gzip": True, "until": "01.04.2033 06:01:00"})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-encoding"] == "gzip"
+    rows = list(csv.DictReader(io.StringIO(r.text)))  # httpx decodes Content-Encoding: gzip
+    assert [int(row["id"]) for row in rows] == [msgs[0].id, msgs[1].id]
+    assert rows[0]["payload"] == "p0"
+
+
+@pytest.mark.anyio
+async def test_get_messages_fast_path_is_byte_compatible(client, async_session: AsyncSession):
+    """
+    The raw JSON body equals what FastAPI renders for the PaginatedMessages model.
+    """
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+    from app.models.message_schema import MessageResponse, PaginatedMessages
+
+    t0 = datetime(2034, 6, 1, 7, 0, 0, 250000, tzinfo=timezone.utc)
+    async_session.add_all([
+        Message(device_id=4646, client_id=1, timestamp=t0, sensor="température", value="21.5", unit="°C",
+                payload='quote " backslash \\ tab \t ünïcode ✓'),
+        Message(device_id=4646, client_id=1, timestamp=t0 + timedelta(seconds=1), payload="nulls"),
+        Message(device_id=4646, client_id=1, timestamp=t0 + timedelta(seconds=2), payload="third"),
+    ])
+    await async_session.commit()
+
+    r: Response = await client.get(
+        PATH, params={"since": "01.06.2034", "device_id": 4646, "limit": 2, "total_mode": "exact"}
+    )
+    assert r.status_code == 200, r.text
+
+    rows = (await async_session.execute(
+        select(Message).where(Message.device_id == 4646).order_by(Message.timestamp, Message.id)
+    )).scalars().all()
+    expected = PaginatedMessages(
+        total=3, total_mode="exact", limit=2, offset=0, has_more=True,
+        next_cursor=r.json()["next_cursor"],
+        items=[MessageResponse.model_validate(m) for m in rows[:2]],
+    )
+    assert r.content == JSONResponse(expected.model_dump(mode="json")).body
+
+
+def test_fast_json_fallback_matches_orjson(monkeypatch):
+    import app.helpers.fast_json as fast_json
+
+    value = {
+        "ts": [datetime(2034, 6, 1, 7, 0, 0, 250000, tzinfo=timezone.utc), datetime(2034, 6, 1, 7, 0, 0)],
+        "text": 'ü ✓ " \\ \t', "none": None, "n": 3, "flag": True,
+    }
+    fast = fast_json.dumps(value)
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.dumps(value) == fast
+
+
+def test_fast_json_fallback_formats_floats_like_orjson(monkeypatch):
+    pytest.importorskip("orjson")
+    import app.helpers.fast_json as fast_json
+
+    value = {
+        "floats": [1e16, -1.25e22, 1e-7, 1.25e-5, -1e-5, 1e-4, 0.1, 1e15, -0.0, 5e-324, float("nan")],
+        "nested": [{"avg": 21.5, "min": 1e-6}],
+    }
+    fast = fast_json.dumps(value)
+    assert b'"floats":[1e16,-1.25e22,1e-7,0.0000125,-0.00001,0.0001,0.1,1000000000000000.0,-0.0,5e-324,null]' in fast
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.dumps(value) == fast
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from app.helpers import mirror_codec
+from app.helpers.mirror_codec import VERSION_TUPLE, decode_message, encode_message
+
+MESSAGE = {
+    "message_id": "m-1", "device_id": "501", "client_id": "50", "sensor": "temp", "value": "21.5",
+    "unit": "C", "timestamp": "01.01.2025 10:00:00", "id": "42", "payload": "saved from consumer",
+}
+
+
+def test_json_codec_is_the_legacy_format():
+    raw = encode_message(MESSAGE, "json")
+    assert json.loads(raw) == MESSAGE
+    assert decode_message(raw.decode()) == MESSAGE
+
+
+def test_tuple_codec_round_trips_with_integer_ids():
+    raw = encode_message(MESSAGE, "tuple")
+
+    assert raw[0] == VERSION_TUPLE
+    assert b"sensor" not in raw
+    assert len(raw) < len(encode_message(MESSAGE, "json"))
+    assert decode_message(raw) == {**MESSAGE, "id": 42, "device_id": 501, "client_id": 50}
+
+
+def test_msgpack_codec_requires_msgpack(monkeypatch):
+    monkeypatch.setattr(mirror_codec, "msgpack", None)
+    with pytest.raises(ValueError):
+        encode_message(MESSAGE, "msgpack")
+    with pytest.raises(RuntimeError):
+        decode_message(bytes((mirror_codec.VERSION_MSGPACK,)) + b"\x90")
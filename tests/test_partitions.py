@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+
+from app.helpers.partitions import (
+    apply_retention,
+    ensure_partitions,
+    next_period,
+    partition_name,
+    period_start,
+)
+from app.models.message_model import Message
+
+
+def test_period_bounds_and_names():
+    ts = datetime(2026, 12, 17, 23, 30, tzinfo=timezone.utc)
+
+    month = period_start(ts, "month")
+    assert month == datetime(2026, 12, 1, tzinfo=timezone.utc)
+    assert next_period(month, "month") == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partition_name(month, "month") == "messages_p2026_12"
+
+    day = period_start(ts, "day")
+    assert next_period(day, "day") == datetime(2026, 12, 18, tzinfo=timezone.utc)
+    assert partition_name(day, "day") == "messages_p2026_12_17"
+
+
+@pytest.mark.asyncio
+async def test_partition_jobs_are_noops_without_partitioning(async_engine):
+    async with async_engine.begin() as conn:
+        assert await ensure_partitions(conn, interval="month", ahead=2) == []
+        assert await apply_retention(conn, keep_days=30, mode="drop") == []
+
+
+async def _insert_at(conn, *timestamps):
+    await conn.execute(insert(Message), [
+        {"device_id": 1, "client_id": 1, "timestamp": ts, "payload": "p"} for ts in timestamps
+    ])
+
+
+async def _rows_per_partition(conn):
+    result = await conn.execute(text("SELECT tableoid::regclass::text, count(*) FROM messages GROUP BY 1"))
+    return dict(result.all())
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_moves_parked_rows_and_drains_default(pg_engine):
+    now = datetime(2026, 12, 17, tzinfo=timezone.utc)
+    async with pg_engine.begin() as conn:
+        await _insert_at(conn, now, now, datetime(2024, 1, 5, tzinfo=timezone.utc))
+        assert await _rows_per_partition(conn) == {"messages_default": 3}
+
+        created = await ensure_partitions(conn, interval="month", ahead=1, now=now)
+
+        assert created == ["messages_p2026_12", "messages_p2027_01", "messages_p2024_01"]
+        assert await _rows_per_partition(conn) == {"messages_p2026_12": 2, "messages_p2024_01": 1}
+        assert await ensure_partitions(conn, interval="month", ahead=1, now=now) == []
+
+        assert await apply_retention(conn, keep_days=365, mode="drop", now=now) == ["messages_p2024_01"]
+        assert await _rows_per_partition(conn) == {"messages_p2026_12": 2}
+
+
+@pytest.mark.asyncio
+async def test_partition_creation_blocks_inserts_until_attached(pg_engine):
+    now = datetime(2026, 12, 17, tzinfo=timezone.utc)
+    async with pg_engine.connect() as creator, pg_engine.connect() as writer:
+        await creator.begin()
+        await ensure_partitions(creator, interval="month", ahead=0, now=now)
+        # the parent stays locked against inserts from the row move to the end of the transaction
+        held = await creator.execute(text(
+            "SELECT mode FROM pg_locks WHERE pid = pg_backend_pid() AND relation = 'messages'::regclass"
+        ))
+        assert "ShareRowExclusiveLock" in held.scalars().all()
+
+        await writer.execute(text("SET lock_timeout = '200ms'"))
+        with pytest.raises(DBAPIError, match="lock timeout"):
+            await _insert_at(writer, now)
+        await writer.rollback()
+
+        await creator.commit()
+        await _insert_at(writer, now)
+        await writer.commit()
+        assert await _rows_per_partition(writer) == {"messages_p2026_12": 1}
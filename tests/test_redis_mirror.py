@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.helpers import redis_mirror
+from app.helpers.redis_mirror import RedisMirrorBuffer
+
+
+@pytest.fixture()
+def pipelines(monkeypatch):
+    sent = []
+
+    async def fake_get_redis():
+        return None
+
+    async def fake_mirror(r, messages):
+        sent.append(list(messages))
+
+    monkeypatch.setattr(redis_mirror, "get_redis", fake_get_redis)
+    monkeypatch.setattr(redis_mirror, "mirror_messages_to_redis", fake_mirror)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_buffer_coalesces_messages_into_one_pipeline(pipelines):
+    buffer = RedisMirrorBuffer(max_delay=0.02, max_batch=100)
+    buffer.start()
+
+    for i in range(5):
+        buffer.add([{"id": str(i)}])
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.05)
+
+    assert pipelines == [[{"id": str(i)} for i in range(5)]]
+    await buffer.close()
+    assert buffer.stats.as_dict() == {"mirrored": 5, "dropped": 0, "flushes": 1, "avg_batch_size": 5.0}
+
+
+@pytest.mark.asyncio
+async def test_buffer_splits_at_max_batch_and_flushes_on_close(pipelines):
+    buffer = RedisMirrorBuffer(max_delay=10.0, max_batch=3)
+    buffer.start()
+
+    buffer.add([{"id": str(i)} for i in range(7)])
+    await buffer.close()
+
+    assert [len(batch) for batch in pipelines] == [3, 3, 1]
+    assert buffer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_buffer_drops_failed_flush(monkeypatch):
+    async def broken_get_redis():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis_mirror, "get_redis", broken_get_redis)
+    buffer = RedisMirrorBuffer(max_delay=0.001, max_batch=10)
+    buffer.start()
+
+    buffer.add([{"id": "1"}, {"id": "2"}])
+    await buffer.close()
+
+    assert buffer.stats.dropped == 2
+    assert buffer.stats.flushes == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from app.helpers import redis_client
+
+
+@pytest.mark.asyncio
+async def test_shared_client_lifecycle_and_metrics():
+    await redis_client.close_redis()
+    assert redis_client.redis_pool_metrics() is None
+
+    client = redis_client.init_redis()
+    assert redis_client.init_redis() is client
+    assert await redis_client.get_redis() is client
+
+    metrics = redis_client.redis_pool_metrics()
+    assert metrics["max_connections"] == redis_client.settings.REDIS_MAX_CONNECTIONS
+    assert (metrics["in_use"], metrics["idle"]) == (0, 0)
+
+    await redis_client.close_redis()
+    assert redis_client.redis_pool_metrics() is None
+    assert await redis_client.get_redis() is not client
+    await redis_client.close_redis()
+
+
+def test_pool_counts_through_public_redis_py_hooks():
+    """The counting pool overrides these; a redis-py release that renames them must fail here."""
+    import redis.asyncio as redis
+
+    for name in ("make_connection", "get_connection", "release"):
+        assert callable(getattr(redis.BlockingConnectionPool, name, None)), name
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_follow_checkouts(monkeypatch):
+    pool = redis_client.CountingConnectionPool.from_url("redis://localhost:6399/0", max_connections=2, timeout=0.1)
+
+    async def connected(connection):
+        return None
+
+    monkeypatch.setattr(pool, "ensure_connection", connected)  # no server needed
+    monkeypatch.setattr(redis_client, "_pool", pool)
+
+    first = await pool.get_connection()
+    second = await pool.get_connection()
+    assert redis_client.redis_pool_metrics()["connections"] == 2
+    assert (redis_client.redis_pool_metrics()["in_use"], redis_client.redis_pool_metrics()["idle"]) == (2, 0)
+
+    await pool.release(first)
+    assert await pool.get_connection() is first  # reused, not created
+    await pool.release(first)
+    await pool.release(second)
+    metrics = redis_client.redis_pool_metrics()
+    assert (metrics["connections"], metrics["in_use"], metrics["idle"]) == (2, 0, 2)
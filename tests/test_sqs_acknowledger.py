@@ -0,0 +1,128 @@
+import asyncio
+import json
+import uuid
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.sqs.acknowledger import SQSAcknowledger
+
+
+class FakeDeleteBatch:
+    """
+    Records delete_message_batch calls and fails selected receipts once.
+    """
+
+    def __init__(self, fail_once=(), sender_fault=()):
+        self.calls = []
+        self.fail_once = set(fail_once)
+        self.sender_fault = set(sender_fault)
+
+    async def __call__(self, entries):
+        self.calls.append([e["ReceiptHandle"] for e in entries])
+        ok, failed = [], []
+        for e in entries:
+            receipt = e["ReceiptHandle"]
+            if receipt in self.sender_fault:
+                failed.append({"Id": e["Id"], "SenderFault": True, "Code": "ReceiptHandleIsInvalid"})
+            elif receipt in self.fail_once:
+                self.fail_once.discard(receipt)
+                failed.append({"Id": e["Id"], "SenderFault": False, "Code": "InternalError"})
+            else:
+                ok.append({"Id": e["Id"]})
+        return {"Successful": ok, "Failed": failed}
+
+
+@pytest.mark.asyncio
+async def test_flushes_full_batches_of_ten():
+    delete = FakeDeleteBatch()
+    acker = SQSAcknowledger(delete, max_delay=10.0, max_retries=3)
+    acker.start()
+
+    for i in range(25):
+        acker.ack(f"r{i}")
+    await asyncio.sleep(0.05)
+
+    assert [len(c) for c in delete.calls] == [10, 10]
+    assert acker.pending == 5
+
+    await acker.close()
+    assert [len(c) for c in delete.calls] == [10, 10, 5]
+    assert acker.stats.acked == 25
+
+
+@pytest.mark.asyncio
+async def test_flushes_partial_batch_on_deadline():
+    delete = FakeDeleteBatch()
+    acker = SQSAcknowledger(delete, max_delay=0.05, max_retries=3)
+    acker.start()
+
+    acker.ack("only-one")
+    await asyncio.sleep(0.2)
+
+    assert delete.calls == [["only-one"]]
+    stats = acker.stats.as_dict()
+    assert stats["acked"] == 1
+    assert stats["max_ack_latency_ms"] >= 50
+    await acker.close()
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_failures_and_drops_sender_faults():
+    delete = FakeDeleteBatch(fail_once={"r1"}, sender_fault={"bad"})
+    acker = SQSAcknowledger(delete, max_delay=0.01, max_retries=3)
+    acker.start()
+
+    for receipt in ("r0", "r1", "bad"):
+        acker.ack(receipt)
+    await asyncio.sleep(0.1)
+    await acker.close()
+
+    assert delete.calls[1] == ["r1"]
+    assert acker.stats.acked == 2
+    assert acker.stats.retried == 1
+    assert acker.stats.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_consumer_acks_with_delete_message_batch(monkeypatch):
+    """
+    End to end with moto: processed messages are removed via delete_message_batch.
+    """
+    from app.config.settings import get_settings
+    from app.sqs.sqs_consumer import SQSConsumer
+
+    with mock_aws():
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        queue_url = sqs.create_queue(QueueName=f"ack-{uuid.uuid4().hex}")["QueueUrl"]
+        for i in range(12):
+            sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1, "value": i}))
+
+        monkeypatch.setenv("SQS_QUEUE_URL", queue_url)
+        monkeypatch.setenv("SQS_ENDPOINT_URL", "https://sqs.us-east-1.amazonaws.com")
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setenv("SQS_WAIT_TIME_SECONDS", "1")
+        monkeypatch.setenv("SQS_POLL_INTERVAL", "0.05")
+        monkeypatch.setenv("SQS_ACK_MAX_DELAY_MS", "20")
+
+        async def fake_process(self, body):
+            return None
+
+        monkeypatch.setattr(SQSConsumer, "_process_message", fake_process, raising=True)
+        delete_single = []
+
+        consumer = SQSConsumer(get_settings(), sessionmaker=None)
+        consumer._sqs.delete_message = lambda **kw: delete_single.append(kw)
+        await consumer.start()
+        await asyncio.sleep(1.0)
+        await consumer.shutdown()
+
+        attrs = sqs.get_queue_attributes(
+            QueueUrl=queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )["Attributes"]
+        assert attrs["ApproximateNumberOfMessages"] == "0"
+        assert attrs["ApproximateNumberOfMessagesNotVisible"] == "0"
+        assert delete_single == []
+        assert consumer.metrics()["ack"]["acked"] == 12
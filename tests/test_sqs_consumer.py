@@ -45,34 +45,49 @@ def env_config(monkeypatch, queue_url, region):
     monkeypatch.setenv("SQS_THREAD_POOL_SIZE", "2")
     monkeypatch.setenv("SQS_VISIBILITY_TIMEOUT", "5")
     monkeypatch.setenv("AWS_REGION", region)
+    monkeypatch.setenv("SQS_ENDPOINT_URL", f"https://sqs.{region}.amazonaws.com")
     monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
 
 
 @pytest.mark.asyncio
 async def test_process_and_delete_success(moto_sqs, queue_url, env_config, monkeypatch):
     """
-    Verifies that one or more messages are polled, processed, and deleted.
+    Verifies that decodable messages are polled, processed, and deleted, while an
+    undecodable one is rejected before processing and left in the queue.
     """
-    moto_sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"ok": 1}))
+    from app.config.settings import get_settings
+
+    moto_sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1}))
+    moto_sqs.send_message(
+        QueueUrl=queue_url,
+        MessageBody=_xml("m1", 2, 1),
+        MessageAttributes={"ContentType": {"DataType": "String", "StringValue": "application/xml"}},
+    )
     moto_sqs.send_message(QueueUrl=queue_url, MessageBody="raw-body")
 
     processed = []
 
-    async def fake_process(self, body):
-        processed.append(body)
+    async def fake_process(self, summary):
+        processed.append(summary)
 
     monkeypatch.setattr(SQSConsumer, "_process_message", fake_process, raising=True)
 
-    consumer = SQSConsumer()
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
     await consumer.start()
     await asyncio.sleep(0.8)
     await consumer.shutdown()
 
     attrs = moto_sqs.get_queue_attributes(
-        QueueUrl=queue_url, AttributeNames=["ApproximateNumberOfMessages"]
+        QueueUrl=queue_url, AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"]
     )["Attributes"]
-    assert attrs["ApproximateNumberOfMessages"] == "0"
-    assert len(processed) == 2
+    assert int(attrs["ApproximateNumberOfMessages"]) + int(attrs["ApproximateNumberOfMessagesNotVisible"]) == 1
+    assert sorted(s.device_id for s in processed) == ["1", "2"]
+
+    metrics = consumer.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["codecs"]["json/v1"]["decoded"] == 1
+    assert metrics["codecs"]["xml/v1"]["decoded"] == 1
+    assert metrics["codecs"]["unknown"]["rejected"] == 1
 
 
 
@@ -81,20 +96,354 @@ async def test_graceful_shutdown(moto_sqs, queue_url, env_config, monkeypatch):
     """
     Verifies the consumer shuts down cleanly while tasks are in flight.
     """
+    from app.config.settings import get_settings
+
     for i in range(5):
-        moto_sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"i": i}))
+        moto_sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1, "value": i}))
 
     seen = []
 
-    async def slow(self, body):
-        seen.append(body)
+    async def slow(self, summary):
+        seen.append(summary)
         await asyncio.sleep(0.1)
 
     monkeypatch.setattr(SQSConsumer, "_process_message", slow, raising=True)
 
-    consumer = SQSConsumer()
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
     await consumer.start()
     await asyncio.sleep(0.3)
     await consumer.shutdown()
 
     assert len(seen) >= 1
+
+
+XML_TMPL = (
+    '<Message xmlns="urn:example:device-message">'
+    "<Header><MessageID>{mid}</MessageID><DeviceID>{device}</DeviceID>"
+    "<ClientID>{client}</ClientID><Timestamp>2025-09-03T14:30:00Z</Timestamp></Header>"
+    "<Body><Sensor>temp</Sensor><Value>21.5</Value><Unit>C</Unit></Body>"
+    "</Message>"
+)
+
+
+def _xml(mid, device, client):
+    return XML_TMPL.format(mid=mid, device=device, client=client)
+
+
+@pytest.fixture
+def consumer_settings(monkeypatch):
+    """
+    Settings for SQSConsumer tests that never talk to SQS.
+    """
+    from app.config.settings import get_settings
+
+    monkeypatch.setenv("SQS_ENDPOINT_URL", "https://sqs.us-east-1.amazonaws.com")
+    monkeypatch.setenv("SQS_BATCH_MODE", "true")
+    monkeypatch.setenv("SQS_BATCH_SIZE", "3")
+    monkeypatch.setenv("SQS_BATCH_WINDOW_MS", "10000")
+    return get_settings()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_single_commit_isolates_failures(consumer_settings, async_engine, monkeypatch):
+    """
+    A batch is committed once; unparsable and failing messages are isolated
+    and only the good receipts are returned for deletion.
+    """
+    from sqlalchemy import select
+    from sqlalchemy.exc import SQLAlchemyError
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.models.message_model import Message
+    import app.sqs.sqs_consumer as consumer_module
+
+    commits = []
+
+    class CountingSession(AsyncSession):
+        async def commit(self):
+            commits.append(1)
+            await super().commit()
+
+    sessionmaker = async_sessionmaker(bind=async_engine, class_=CountingSession, expire_on_commit=False)
+
+    real_save = consumer_module.save_message
+    real_bulk_save = consumer_module.save_messages
+
+    async def flaky_save(session, *, summary, commit=True):
+        if summary.device_id == "666":
+            raise SQLAlchemyError("simulated insert failure")
+        return await real_save(session, summary=summary, commit=commit)
+
+    async def flaky_bulk_save(session, summaries, *, commit=True):
+        if any(s.device_id == "666" for s in summaries):
+            raise SQLAlchemyError("simulated insert failure")
+        return await real_bulk_save(session, summaries, commit=commit)
+
+    mirrored = []
+
+    async def fake_mirror(r, messages):
+        mirrored.append(messages)
+
+    monkeypatch.setattr(consumer_module, "save_message", flaky_save)
+    monkeypatch.setattr(consumer_module, "save_messages", flaky_bulk_save)
+    monkeypatch.setattr(consumer_module, "mirror_messages_to_redis", fake_mirror)
+
+    consumer = SQSConsumer(consumer_settings, sessionmaker)
+    items = consumer._unpack_batch([
+        {"ReceiptHandle": "r-ok-1", "Body": _xml("m1", 501, 50)},
+        {"ReceiptHandle": "r-raw", "Body": "raw-body"},
+        {"ReceiptHandle": "r-bad", "Body": _xml("m2", 666, 50)},
+        {"ReceiptHandle": "r-ok-2", "Body": _xml("m3", 502, 51)},
+    ])
+    assert [receipt for receipt, _ in items] == ["r-ok-1", "r-bad", "r-ok-2"]  # raw body rejected up front
+
+    done = await consumer._process_batch(items)
+
+    assert done == ["r-ok-1", "r-ok-2"]
+    assert len(commits) == 1
+    assert len(mirrored) == 1  # one pipeline for the whole batch
+    assert [m["device_id"] for m in mirrored[0]] == ["501", "502"]
+
+    async with sessionmaker() as session:
+        rows = (await session.execute(select(Message.device_id).where(Message.device_id.in_([501, 502, 666])))).scalars().all()
+    assert sorted(rows) == [501, 502]
+
+
+@pytest.mark.asyncio
+async def test_buffer_batch_flushes_full_batches(consumer_settings, monkeypatch):
+    """
+    With a long window, only full batches of SQS_BATCH_SIZE are handed to the pool.
+    """
+    consumer = SQSConsumer(consumer_settings, sessionmaker=None)
+    consumer._loop = asyncio.get_running_loop()
+
+    submitted = []
+    monkeypatch.setattr(consumer, "_dispatch_batch", submitted.append)
+
+    consumer._buffer_batch([{"ReceiptHandle": str(i), "Body": ""} for i in range(7)])
+
+    assert [len(b) for b in submitted] == [3, 3]
+    assert len(consumer._pending) == 1
+    assert consumer._batch_time_left() > 0
+
+
+@pytest.mark.asyncio
+async def test_polling_pauses_at_max_in_flight(consumer_settings, monkeypatch):
+    """
+    Once SQS_MAX_IN_FLIGHT messages are unfinished the consumer stops receiving,
+    and resumes only after draining to the low watermark.
+    """
+    monkeypatch.setenv("SQS_BATCH_MODE", "false")
+    monkeypatch.setenv("SQS_MAX_IN_FLIGHT", "4")
+    monkeypatch.setenv("SQS_IN_FLIGHT_LOW_WATERMARK", "1")
+    monkeypatch.setenv("SQS_POLL_INTERVAL", "0.01")
+    from app.config.settings import get_settings
+
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+    consumer._loop = asyncio.get_running_loop()
+
+    requested = []
+    counter = iter(range(1000))
+
+    async def fake_call(method, **kwargs):
+        requested.append(kwargs["MaxNumberOfMessages"])
+        n = kwargs["MaxNumberOfMessages"]
+        return {"Messages": [{"ReceiptHandle": f"r{next(counter)}", "Body": ""} for _ in range(n)]}
+
+    dispatched = []
+    monkeypatch.setattr(consumer, "_sqs_call", fake_call)
+    monkeypatch.setattr(consumer, "_dispatch", dispatched.append)
+
+    task = asyncio.create_task(consumer._run())
+    await asyncio.sleep(0.05)
+
+    assert requested == [4]
+    assert consumer.metrics()["paused"] is True
+    assert consumer.metrics()["in_flight"] == 4
+
+    consumer._release(consumer._receipts(dispatched[:2]))
+    await asyncio.sleep(0.05)
+    assert requested == [4]
+
+    consumer._release(consumer._receipts(dispatched[2:3]))
+    await asyncio.sleep(0.05)
+    consumer._stop.set()
+    await task
+
+    assert requested[:2] == [4, 3]
+    assert consumer.metrics()["pauses"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_flushes_the_pending_batch_when_pausing(consumer_settings, monkeypatch):
+    """
+    Buffered batch messages count as in flight; pausing dispatches them instead of
+    waiting for a window that only the (paused) loop can close.
+    """
+    monkeypatch.setenv("SQS_MAX_IN_FLIGHT", "4")
+    monkeypatch.setenv("SQS_IN_FLIGHT_LOW_WATERMARK", "3")
+    monkeypatch.setenv("SQS_POLL_INTERVAL", "0.01")
+    from app.config.settings import get_settings
+
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+    consumer._loop = asyncio.get_running_loop()
+    counter = iter(range(1000))
+
+    async def fake_call(method, **kwargs):
+        n = kwargs["MaxNumberOfMessages"]
+        return {"Messages": [{"ReceiptHandle": f"r{next(counter)}", "Body": ""} for _ in range(n)]}
+
+    submitted = []
+    monkeypatch.setattr(consumer, "_sqs_call", fake_call)
+    monkeypatch.setattr(consumer, "_dispatch_batch", submitted.append)
+
+    task = asyncio.create_task(consumer._run())
+    await asyncio.sleep(0.05)
+
+    assert [len(b) for b in submitted] == [3, 1]  # the partial batch went out although its window is open
+    assert consumer._pending == []
+    assert consumer.metrics()["paused"] is True
+
+    for batch in submitted:
+        consumer._release(consumer._receipts(batch))
+    await asyncio.sleep(0.05)
+    consumer._stop.set()
+    await task
+
+    assert len(submitted) > 2  # resumed
+
+
+def test_batch_size_above_the_low_watermark_is_rejected(consumer_settings, monkeypatch):
+    from app.config.settings import get_settings
+
+    monkeypatch.setenv("SQS_BATCH_SIZE", "60")
+    monkeypatch.setenv("SQS_IN_FLIGHT_LOW_WATERMARK", "50")
+    with pytest.raises(RuntimeError, match="SQS_BATCH_SIZE"):
+        get_settings()
+
+
+@pytest.mark.asyncio
+async def test_runs_configured_number_of_pollers(consumer_settings, monkeypatch):
+    """
+    SQS_POLLERS receive loops long-poll in parallel and _scale_to retires them.
+    """
+    monkeypatch.setenv("SQS_BATCH_MODE", "false")
+    monkeypatch.setenv("SQS_POLLERS", "3")
+    from app.config.settings import get_settings
+
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+    concurrent, peak = [0], [0]
+
+    async def fake_call(method, **kwargs):
+        concurrent[0] += 1
+        peak[0] = max(peak[0], concurrent[0])
+        await asyncio.sleep(0.02)
+        concurrent[0] -= 1
+        return {}
+
+    monkeypatch.setattr(consumer, "_sqs_call", fake_call)
+    await consumer.start()
+    await asyncio.sleep(0.05)
+    assert peak[0] == 3
+    assert consumer.metrics()["pollers"] == 3
+
+    consumer._scale_to(1)
+    await asyncio.sleep(0.1)
+    assert consumer.metrics()["pollers"] == 1
+    assert concurrent[0] <= 1
+
+    await consumer.shutdown()
+    assert consumer.metrics()["empty_receives"] == consumer.metrics()["receives"] > 0
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_retired_pollers(consumer_settings, monkeypatch):
+    """A loop retired mid-receive still dispatches what it got before shutdown returns."""
+    monkeypatch.setenv("SQS_BATCH_MODE", "false")
+    monkeypatch.setenv("SQS_POLLERS", "2")
+    from app.config.settings import get_settings
+
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+
+    async def fake_call(method, **kwargs):
+        name = asyncio.current_task().get_name()
+        await asyncio.sleep(0.3 if name.endswith("-1") else 0.01)  # loop 1 is the one retired
+        return {"Messages": [{"ReceiptHandle": name, "Body": ""}]} if name.endswith("-1") else {}
+
+    dispatched = []
+    monkeypatch.setattr(consumer, "_sqs_call", fake_call)
+    monkeypatch.setattr(consumer, "_dispatch", dispatched.append)
+    await consumer.start()
+    await asyncio.sleep(0.05)
+    consumer._scale_to(1)
+
+    await consumer.shutdown()
+
+    assert [m["ReceiptHandle"] for m in dispatched] == ["sqs-consumer-loop-1"]
+    assert consumer._retiring == set()
+
+
+@pytest.mark.asyncio
+async def test_desired_pollers_follow_depth_and_empty_rate(consumer_settings, monkeypatch):
+    monkeypatch.setenv("SQS_AUTOSCALE", "true")
+    monkeypatch.setenv("SQS_POLLERS_MIN", "1")
+    monkeypatch.setenv("SQS_POLLERS_MAX", "5")
+    monkeypatch.setenv("SQS_AUTOSCALE_MESSAGES_PER_POLLER", "100")
+    from app.config.settings import get_settings
+
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+    consumer._pollers = [(None, asyncio.Event()) for _ in range(2)]
+
+    assert consumer._desired_pollers(depth=350, empty_rate=0.0) == 4
+    assert consumer._desired_pollers(depth=10_000, empty_rate=0.0) == 5
+    assert consumer._desired_pollers(depth=150, empty_rate=0.1) == 2
+    assert consumer._desired_pollers(depth=0, empty_rate=0.9) == 1
+    assert consumer._desired_pollers(depth=150, empty_rate=0.9) == 2
+
+    consumer._paused = True
+    assert consumer._desired_pollers(depth=10_000, empty_rate=0.0) == 2
+
+
+@pytest.mark.asyncio
+async def test_process_batch_drops_only_the_message_with_a_bad_id(consumer_settings, async_engine, monkeypatch):
+    """A non-numeric device id leaves that message in the queue; the rest of the batch is saved."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.models.messageSummary import MessageSummary
+    import app.sqs.sqs_consumer as consumer_module
+
+    async def fake_mirror(r, messages):
+        pass
+
+    monkeypatch.setattr(consumer_module, "mirror_messages_to_redis", fake_mirror)
+    sessionmaker = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    consumer = SQSConsumer(consumer_settings, sessionmaker)
+
+    def summary(mid, device):
+        return MessageSummary(message_id=mid, device_id=device, client_id="52", sensor="t", value="1", unit="C", timestamp="")
+
+    done = await consumer._process_batch([
+        ("r-ok", summary("m10", "503")),
+        ("r-bad-id", summary("m11", "abc")),
+    ])
+
+    assert done == ["r-ok"]
+
+
+def test_unpack_batch_isolates_bad_messages(consumer_settings, monkeypatch):
+    """Rejected and crashing bodies are dropped one by one; the rest of the batch is decoded."""
+    consumer = SQSConsumer(consumer_settings, sessionmaker=None)
+    real_decode = consumer._decoder.decode
+
+    def decode(msg):
+        if msg["Body"] == "boom":
+            raise RuntimeError("decoder bug")
+        return real_decode(msg)
+
+    monkeypatch.setattr(consumer._decoder, "decode", decode)
+    items = consumer._unpack_batch([
+        {"ReceiptHandle": "r-ts", "Body": '{"device_id": 1, "client_id": 1, "timestamp": 123}'},
+        {"ReceiptHandle": "r-id", "Body": '{"device_id": "abc", "client_id": 1}'},
+        {"ReceiptHandle": "r-boom", "Body": "boom"},
+        {"ReceiptHandle": "r-ok", "Body": _xml("m20", 504, 53)},
+    ])
+
+    assert [receipt for receipt, _ in items] == ["r-ok"]
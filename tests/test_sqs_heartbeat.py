@@ -0,0 +1,165 @@
+import asyncio
+import json
+import uuid
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.sqs.heartbeat import VisibilityHeartbeat
+
+
+class FakeChangeVisibilityBatch:
+    """
+    Records change_message_visibility_batch calls; selected receipts fail as stale.
+    """
+
+    def __init__(self, stale=()):
+        self.calls = []
+        self.stale = set(stale)
+
+    async def __call__(self, entries):
+        self.calls.append([(e["ReceiptHandle"], e["VisibilityTimeout"]) for e in entries])
+        ok, failed = [], []
+        for e in entries:
+            if e["ReceiptHandle"] in self.stale:
+                failed.append({"Id": e["Id"], "SenderFault": True, "Code": "ReceiptHandleIsInvalid"})
+            else:
+                ok.append({"Id": e["Id"]})
+        return {"Successful": ok, "Failed": failed}
+
+
+@pytest.mark.asyncio
+async def test_extends_only_leases_close_to_expiry_in_batches_of_ten():
+    change = FakeChangeVisibilityBatch()
+    heartbeat = VisibilityHeartbeat(change, visibility_timeout=30, interval=5.0, max_processing=300)
+
+    heartbeat.track(f"r{i}" for i in range(12))
+    await heartbeat.beat()
+    assert change.calls == []  # 30s left, more than two intervals
+
+    for lease in heartbeat._leases.values():
+        lease.visible_at -= 25
+    await heartbeat.beat()
+
+    assert [len(c) for c in change.calls] == [10, 2]
+    assert {timeout for call in change.calls for _, timeout in call} == {30}
+    assert heartbeat.stats.extended == 12
+
+    change.calls.clear()
+    await heartbeat.beat()
+    assert change.calls == []  # freshly extended
+
+
+@pytest.mark.asyncio
+async def test_releases_messages_past_max_processing():
+    change = FakeChangeVisibilityBatch()
+    heartbeat = VisibilityHeartbeat(change, visibility_timeout=30, interval=5.0, max_processing=60)
+
+    heartbeat.track(["slow", "fresh"])
+    heartbeat._leases["slow"].received_at -= 61
+    await heartbeat.beat()
+
+    assert change.calls == [[("slow", 0)]]
+    assert heartbeat.tracked == 1
+    assert heartbeat.stats.released == 1
+
+
+@pytest.mark.asyncio
+async def test_released_messages_stop_counting_as_in_flight(monkeypatch):
+    """
+    A message the heartbeat gave up on frees its in-flight slot right away; the
+    stuck handler's later ack and release are no-ops.
+    """
+    from app.config.settings import get_settings
+    from app.sqs.sqs_consumer import SQSConsumer
+
+    monkeypatch.setenv("SQS_ENDPOINT_URL", "https://sqs.us-east-1.amazonaws.com")
+    consumer = SQSConsumer(get_settings(), sessionmaker=None)
+    consumer._loop = asyncio.get_running_loop()
+    change = FakeChangeVisibilityBatch()
+    monkeypatch.setattr(consumer._heartbeat, "_change_visibility_batch", change)
+    acked = []
+    monkeypatch.setattr(consumer._acker, "ack", acked.append)
+
+    consumer._track([{"ReceiptHandle": "stuck"}, {"ReceiptHandle": "busy"}])
+    consumer._heartbeat._leases["stuck"].received_at -= consumer._heartbeat.max_processing + 1
+    await consumer._heartbeat.beat()
+
+    assert change.calls == [[("stuck", 0)]]
+    assert list(consumer._in_flight) == ["busy"]
+    assert consumer.metrics()["abandoned"] == 1
+
+    consumer._ack("stuck")
+    consumer._ack("busy")
+    assert acked == ["busy"]
+
+    consumer._release(["stuck", "busy"])
+    assert consumer.metrics()["in_flight"] == 0
+    assert consumer.metrics()["abandoned"] == 0
+
+
+@pytest.mark.asyncio
+async def test_forgets_stale_receipts_and_finished_messages():
+    change = FakeChangeVisibilityBatch(stale={"gone"})
+    heartbeat = VisibilityHeartbeat(change, visibility_timeout=30, interval=5.0, max_processing=300)
+
+    heartbeat.track(["gone", "done", "busy"])
+    heartbeat.forget(["done"])
+    for lease in heartbeat._leases.values():
+        lease.visible_at -= 25
+    await heartbeat.beat()
+
+    assert [r for r, _ in change.calls[0]] == ["gone", "busy"]
+    assert heartbeat.tracked == 1
+    assert heartbeat.stats.extended == 1
+    assert heartbeat.stats.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_message_is_not_redelivered_while_processing(monkeypatch):
+    """
+    End to end with moto: processing outlives the visibility timeout, yet the
+    message stays invisible to other receivers until it is deleted.
+    """
+    from app.config.settings import get_settings
+    from app.sqs.sqs_consumer import SQSConsumer
+
+    with mock_aws():
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        queue_url = sqs.create_queue(QueueName=f"hb-{uuid.uuid4().hex}")["QueueUrl"]
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"device_id": 1, "client_id": 1, "value": "slow"}))
+
+        monkeypatch.setenv("SQS_QUEUE_URL", queue_url)
+        monkeypatch.setenv("SQS_ENDPOINT_URL", "https://sqs.us-east-1.amazonaws.com")
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setenv("SQS_WAIT_TIME_SECONDS", "1")
+        monkeypatch.setenv("SQS_POLL_INTERVAL", "0.05")
+        monkeypatch.setenv("SQS_VISIBILITY_TIMEOUT", "2")
+        monkeypatch.setenv("SQS_HEARTBEAT_INTERVAL", "0.3")
+        monkeypatch.setenv("SQS_ACK_MAX_DELAY_MS", "20")
+
+        async def slow_process(self, body):
+            await asyncio.sleep(3)
+
+        monkeypatch.setattr(SQSConsumer, "_process_message", slow_process)
+        consumer = SQSConsumer(get_settings(), sessionmaker=None)
+        try:
+            await consumer.start()
+            await asyncio.sleep(2.5)  # past the original visibility timeout
+
+            other = sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=0)
+            assert other.get("Messages", []) == []
+            assert consumer.metrics()["heartbeat"]["extended"] >= 1
+
+            for _ in range(40):
+                if consumer.metrics()["ack"]["acked"] == 1:
+                    break
+                await asyncio.sleep(0.1)
+        finally:
+            await consumer.shutdown()
+
+        assert consumer.metrics()["processed"] == 1
+        attrs = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])["Attributes"]
+        assert attrs["ApproximateNumberOfMessages"] == "0"
+        assert attrs["ApproximateNumberOfMessagesNotVisible"] == "0"